@@ -0,0 +1 @@
+# email-agent-workflow/benchmarks/__init__.py
@@ -0,0 +1,126 @@
+# email-agent-workflow/benchmarks/docx_extract_benchmark.py
+"""
+Streaming DOCX extractor vs python-docx on a large document.
+
+Writes a DOCX with many body paragraphs, a table every few dozen
+paragraphs and a header, then extracts its text twice, each in a fresh
+process: once the old way (python-docx's Document and `doc.paragraphs`)
+and once with the streaming extractor. Prints the time, the peak RSS
+above the process's baseline, and how many segments and characters each
+found; python-docx's paragraph list misses the tables and the header.
+
+Usage: python -m benchmarks.docx_extract_benchmark [paragraphs]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+TABLE_EVERY = 40 # Body paragraphs between tables
+TABLE_SIZE = 4 # Rows and columns per table
+
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/>'
+    '</Relationships>'
+)
+HEADER_XML = f'<w:hdr xmlns:w="{W_NAMESPACE}"><w:p><w:r><w:t>Confidential - internal policy manual</w:t></w:r></w:p></w:hdr>'
+
+
+def paragraph(text: str) -> str:
+    return f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(text)}</w:t></w:r></w:p>"
+
+
+def write_document(path: str, paragraphs: int) -> None:
+    """Streams the document part out, so the generator itself stays small."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as package:
+        package.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        package.writestr("_rels/.rels", PACKAGE_RELS_XML)
+        package.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS_XML)
+        package.writestr("word/header1.xml", HEADER_XML)
+        with package.open("word/document.xml", "w", force_zip64=True) as document:
+            document.write(f'<w:document xmlns:w="{W_NAMESPACE}" xmlns:r="{R_NAMESPACE}"><w:body>'.encode("utf-8"))
+            for index in range(paragraphs):
+                document.write(paragraph(f"Section {index}: employees must follow the policy when handling customer records.").encode("utf-8"))
+                if index % TABLE_EVERY == TABLE_EVERY - 1:
+                    rows = "".join(
+                        "<w:tr>" + "".join(f"<w:tc>{paragraph(f'Cell {index}.{row}.{column}')}</w:tc>" for column in range(TABLE_SIZE)) + "</w:tr>"
+                        for row in range(TABLE_SIZE)
+                    )
+                    document.write(f"<w:tbl>{rows}</w:tbl>".encode("utf-8"))
+            document.write(b'<w:sectPr><w:headerReference w:type="default" r:id="rId1"/></w:sectPr></w:body></w:document>')
+
+
+def extract_python_docx(path: str):
+    from docx import Document # Requires python-docx
+    with open(path, "rb") as stream:
+        texts = [paragraph.text for paragraph in Document(stream).paragraphs]
+    return len(texts), len("\n".join(texts))
+
+
+def extract_streaming(path: str):
+    from email_workflow_agent.subagents.tools.docx_extract import iter_docx_segments
+    with open(path, "rb") as stream:
+        texts = [segment.text for segment in iter_docx_segments(stream)]
+    return len(texts), len("\n".join(texts))
+
+
+def child(mode: str, path: str) -> None:
+    # Imported up front: import cost and memory aren't part of the measurement
+    if mode == "python-docx":
+        import docx # noqa: F401
+        extract = extract_python_docx
+    else:
+        from email_workflow_agent.subagents.tools import docx_extract # noqa: F401
+        extract = extract_streaming
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Kilobytes on Linux
+    started = time.perf_counter()
+    segments, chars = extract(path)
+    elapsed = time.perf_counter() - started
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - baseline
+    print(elapsed, growth, segments, chars)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:4])
+        return
+
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "manual.docx")
+        write_document(path, paragraphs)
+        print(f"{paragraphs} paragraphs, {paragraphs // TABLE_EVERY} tables, {os.path.getsize(path) / 2**20:.1f} MiB DOCX")
+        for mode in ("python-docx", "streaming"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.docx_extract_benchmark", "--child", mode, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            elapsed, growth, segments, chars = output.strip().splitlines()[-1].split()
+            print(f"  {mode:11s}: {float(elapsed):6.2f}s  peak RSS +{int(growth) / 2**20:7.1f} MiB  {int(segments):7d} segments  {int(chars):9d} chars")
+
+
+if __name__ == "__main__":
+    main()
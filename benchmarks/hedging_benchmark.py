@@ -0,0 +1,61 @@
+# email-agent-workflow/benchmarks/hedging_benchmark.py
+"""
+Hedged translation requests against the offline fake backend.
+
+2% of backend calls stall for two seconds. Translates the same stream of
+segment batches with hedging off and on, and compares tail latency and
+how many extra requests hedging cost.
+
+Usage: python -m benchmarks.hedging_benchmark
+"""
+import asyncio
+import random
+import time
+
+from email_workflow_agent.fake_backend import FakeThrottlingBackend
+from email_workflow_agent.rate_limiter import AdaptiveRateLimiter
+from email_workflow_agent.subagents.tools.translation_client import TranslationClient
+
+BATCHES = 2000
+CONCURRENCY = 20
+
+
+async def run_scenario(hedging: bool) -> dict:
+    random.seed(3)
+    client = TranslationClient(
+        rate_limiter=AdaptiveRateLimiter("bench", requests_per_minute=600_000, initial_concurrency=64, max_concurrency=64),
+        hedging=hedging,
+    )
+    client.fake_backend = FakeThrottlingBackend(
+        requests_per_second=10_000, max_concurrency=1000, latency_per_inflight_seconds=0.0,
+        stall_probability=0.02, stall_seconds=2.0,
+    )
+    latencies = []
+    gate = asyncio.Semaphore(CONCURRENCY)
+
+    async def one_batch(i: int):
+        async with gate:
+            started = time.perf_counter()
+            await client.translate_batch([f"Paragraph {i}."], "French")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one_batch(i) for i in range(BATCHES)))
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        **client.metrics_snapshot(),
+    }
+
+
+async def main():
+    for hedging in (False, True):
+        result = await run_scenario(hedging)
+        print(f"\n=== hedging {'on' if hedging else 'off'} ===")
+        print(f"  p50={result['p50_ms']:.0f}ms  p99={result['p99_ms']:.0f}ms  max={result['max_ms']:.0f}ms")
+        print(f"  hedge rate={result['hedge_rate']:.1%}  hedge win rate={result['hedge_win_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
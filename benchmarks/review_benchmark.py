@@ -0,0 +1,59 @@
+# email-agent-workflow/benchmarks/review_benchmark.py
+"""
+Single-pass vs chunked map-reduce review of a long document against the
+offline stub model.
+
+Builds a policy manual of aligned original/translated paragraphs, a few
+of them left untranslated, and reviews it once in a single model call
+and then in chunks with increasing parallelism. Reports wall time and
+whether every run found the same edits.
+
+Usage: python -m benchmarks.review_benchmark [paragraphs] [chunk_chars]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Measure the review itself, not the production request quota
+os.environ.setdefault("MODEL_REQUESTS_PER_MINUTE", "600000")
+os.environ.setdefault("MODEL_TOKENS_PER_MINUTE", "1e9")
+os.environ.setdefault("MODEL_MAX_CONCURRENCY", "64")
+
+from email_workflow_agent.model_router import ModelRouter, DEFAULT_ROUTING_RULES  # noqa: E402
+from email_workflow_agent.subagents.review_agent.chunked_review import ChunkedReviewer, align_segments  # noqa: E402
+
+STUB_TIERS = {"fast": "stub-fast", "standard": "stub-standard", "large": "stub-large"}
+
+
+def build_manual(paragraphs: int, seed: int = 3) -> tuple:
+    rng = random.Random(seed)
+    original, translated = [], []
+    for index in range(paragraphs):
+        sentence = f"Section {index}: employees must follow policy {rng.randint(1, 99)} when handling customer records. " * 3
+        original.append(sentence.strip())
+        # One paragraph in fifty is left untranslated
+        translated.append(sentence.strip() if rng.random() < 0.02 else f"Section {index} : les employés doivent suivre la politique.")
+    return original, translated
+
+
+async def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chunk_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 6000
+    pairs = align_segments(*build_manual(paragraphs))
+    total_chars = sum(len(original) + len(translated) for _, original, translated in pairs)
+    print(f"{paragraphs} paragraphs, {total_chars} chars, chunks of {chunk_chars} chars")
+
+    reference = None
+    for label, chunk, parallel in [("single pass", total_chars, 1), ("chunked x1", chunk_chars, 1), ("chunked x4", chunk_chars, 4), ("chunked x16", chunk_chars, 16)]:
+        reviewer = ChunkedReviewer(router=ModelRouter(rules=list(DEFAULT_ROUTING_RULES), tiers=STUB_TIERS), chunk_chars=chunk, max_parallel=parallel)
+        started = time.perf_counter()
+        plan, failed = await reviewer.review(pairs)
+        elapsed = time.perf_counter() - started
+        reference = reference if reference is not None else plan
+        print(f"  {label:12s}: {elapsed:6.2f}s  {reviewer.chunks:4d} chunks  {len(plan)} edits  same edits: {plan == reference}  failed chunks: {failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
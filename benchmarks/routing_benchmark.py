@@ -0,0 +1,78 @@
+# email-agent-workflow/benchmarks/routing_benchmark.py
+"""
+Routing benchmark against the offline stub model.
+
+Replays a mixed workload (classification, replies, short and long
+translations, quality checks with varying confidence) through the model
+router, and compares it with sending every step to a single tier.
+
+Usage: python -m benchmarks.routing_benchmark
+"""
+import asyncio
+import os
+import random
+import time
+
+# Measure the routing itself, not the production request quota
+os.environ.setdefault("MODEL_REQUESTS_PER_MINUTE", "600000")
+os.environ.setdefault("MODEL_TOKENS_PER_MINUTE", "1e9")
+os.environ.setdefault("MODEL_MAX_CONCURRENCY", "64") # Above the per-model pools, which are what is compared
+
+from google.adk.models import LlmRequest  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from email_workflow_agent.model_router import ModelRouter, RoutingRule, DEFAULT_ROUTING_RULES  # noqa: E402
+
+STUB_TIERS = {"fast": "stub-fast", "standard": "stub-standard", "large": "stub-large"}
+
+
+def build_workload(seed: int = 7) -> list:
+    """(step_kind, input_chars, prior confidence) tuples resembling a busy inbox."""
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(200):
+        workload.append(("classify", rng.randint(200, 1500), None))
+        workload.append(("reply", rng.randint(100, 400), None))
+    for _ in range(60):
+        workload.append(("translate", rng.choice([1500, 4000, 8000, 60000]), None))
+        workload.append(("quality_check", rng.choice([1500, 8000]), rng.uniform(0.5, 1.0)))
+    for _ in range(40):
+        workload.append(("tool_call", rng.randint(100, 800), None))
+    rng.shuffle(workload)
+    return workload
+
+
+async def run_workload(router: ModelRouter, workload: list) -> float:
+    async def one_call(step_kind: str, input_chars: int, confidence):
+        llm = router.llm_for(step_kind)
+        request = LlmRequest(
+            model=router.choose(step_kind, input_chars, confidence),
+            contents=[types.Content(role="user", parts=[types.Part(text="x" * input_chars)])],
+        )
+        async for _ in llm.generate_content_async(request):
+            pass
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call(*step) for step in workload))
+    return time.perf_counter() - started
+
+
+async def main():
+    workload = build_workload()
+    scenarios = {
+        "routed": ModelRouter(rules=list(DEFAULT_ROUTING_RULES), tiers=STUB_TIERS),
+        "all-standard": ModelRouter(rules=[RoutingRule(tier="standard")], tiers=STUB_TIERS),
+        "all-large": ModelRouter(rules=[RoutingRule(tier="large")], tiers=STUB_TIERS),
+    }
+
+    print(f"Workload: {len(workload)} model calls")
+    for name, router in scenarios.items():
+        elapsed = await run_workload(router, workload)
+        print(f"\n=== {name}: {elapsed:.2f}s wall ===")
+        metrics = router.metrics_snapshot()
+        for model, stats in sorted(metrics["latency"].items()):
+            print(f"  {model:14s} calls={stats['calls']:4d}  p50={stats['p50_s'] * 1000:7.1f}ms  p95={stats['p95_s'] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+# email-agent-workflow/benchmarks/startup_benchmark.py
+"""
+Cold-start benchmark for short-lived workers.
+
+Measures, in fresh interpreters, how long `import email_workflow_agent`
+and `import main` take, how long warming the parser libraries takes on
+top of the package import, and prints a per-module breakdown from
+`python -X importtime`.
+
+Usage: python -m benchmarks.startup_benchmark [--runs 5] [--top 20]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ONLY = "import email_workflow_agent"
+IMPORT_MAIN = "import main"
+IMPORT_AND_WARM = (
+    "import email_workflow_agent; "
+    "from email_workflow_agent.subagents.tools import warm_parser_libraries; "
+    "warm_parser_libraries()"
+)
+TIMED = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+
+def time_snippet(code: str, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMED.format(code=code)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def import_time_breakdown(top: int) -> list:
+    """(cumulative_us, self_us, module) for the slowest top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_ONLY],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        indent = len(module) - len(module.lstrip())
+        if indent <= 3: # Top-level and first-level imports only
+            rows.append((int(cumulative_us), int(self_us), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    for label, code in (("import", IMPORT_ONLY), ("import main", IMPORT_MAIN), ("import + warm parsers", IMPORT_AND_WARM)):
+        samples = time_snippet(code, args.runs)
+        print(f"{label:24s} median {statistics.median(samples) * 1000:8.1f} ms   min {min(samples) * 1000:8.1f} ms   ({args.runs} runs)")
+
+    print(f"\nSlowest imports (cumulative, from -X importtime):")
+    for cumulative_us, self_us, module in import_time_breakdown(args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {module}")
+
+
+if __name__ == "__main__":
+    main()
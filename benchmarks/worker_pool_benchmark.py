@@ -0,0 +1,63 @@
+# email-agent-workflow/benchmarks/worker_pool_benchmark.py
+"""
+Worker pool scaling benchmark.
+
+Queues CPU-bound jobs that stand in for the extraction, redaction and DOCX
+work of an email, and drains the queue with 1, 2, 4, ... worker processes.
+Throughput should grow roughly linearly until the cores run out.
+
+Usage: python -m benchmarks.worker_pool_benchmark [jobs] [max_workers]
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+
+from email_workflow_agent.work_queue import WorkQueue
+from email_workflow_agent.worker_pool import run_worker, supervise
+
+DATE_PATTERN = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+
+
+async def cpu_bound_job(paragraphs: int) -> None:
+    """Builds a document, redacts it and re-joins it: pure-Python work that holds the GIL."""
+    text = "\n".join(f"Paragraph {i} was signed on 2024-01-{i % 28 + 1:02d} by party {i}." for i in range(paragraphs))
+    redacted = DATE_PATTERN.sub(lambda match: f"__DATE_{hash(match.group(0)) % 1000}__", text)
+    "\n".join(segment.upper() for segment in redacted.split("\n"))
+
+
+def benchmark_worker(worker_index: int) -> None:
+    queue = WorkQueue(db_path=os.environ["BENCHMARK_QUEUE_DB"])
+    asyncio.run(run_worker(cpu_bound_job, queue=queue, exit_when_idle=True))
+
+
+def run(jobs: int, num_workers: int) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["BENCHMARK_QUEUE_DB"] = os.path.join(directory, "queue.db")
+        queue = WorkQueue(db_path=os.environ["BENCHMARK_QUEUE_DB"])
+        for _ in range(jobs):
+            queue.enqueue({"paragraphs": 20000})
+        started = time.perf_counter()
+        supervise(benchmark_worker, num_workers, queue=queue, stop_when_drained=True)
+        elapsed = time.perf_counter() - started
+        assert queue.counts().get("done") == jobs, queue.counts()
+    return elapsed
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    print(f"{jobs} jobs, {os.cpu_count()} cores")
+    baseline = None
+    num_workers = 1
+    while num_workers <= max_workers:
+        elapsed = run(jobs, num_workers)
+        baseline = baseline or elapsed
+        print(f"  {num_workers:3d} workers: {elapsed:6.2f}s  {jobs / elapsed:6.1f} jobs/s  speedup x{baseline / elapsed:.2f}")
+        num_workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,88 @@
 # email-agent-workflow/email_workflow_agent/agent.py
 import asyncio
 import logging
-from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents import BaseAgent, LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
-from google.adk.events import Event
-from typing import AsyncGenerator
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from pydantic import PrivateAttr
 from typing_extensions import override # Requires typing_extensions installed
 
 # Import sub-agents
 from .subagents.classifier_agent.agent import classifier_agent
+from .subagents.classifier_agent.batcher import CLASSIFIER_BATCHING, classification_batcher
 from .subagents.reply_agent.agent import initial_reply_agent
-from .subagents.translation_agent.agent import translation_workflow_agent
-from .subagents.review_agent.agent import review_workflow_agent
-from .subagents.sender_agent.agent import email_sender_agent
-from .tools.tools import download_attachments_tool, extract_text_tool # Import necessary initial tools
+# Branch agents are only built on first use (see EmailWorkflowOrchestrator._lazy_agent)
+from .subagents.translation_agent.agent import create_translation_workflow_agent
+from .subagents.review_agent.agent import create_review_workflow_agent
+from .subagents.sender_agent.agent import create_email_sender_agent
+from .subagents.tools.sensitive_vault import sensitive_vault
+from .result_index import result_index, combine_attachment_hashes
+from .checkpoints import checkpoint_store
+from .model_router import model_router
+from .rate_limiter import current_tenant
+from .deadlines import StageTimeout, current_deadline, email_deadline, run_stage_with_deadline
+from .flight_recorder import flight_recorder
 
 logger = logging.getLogger(__name__)
 
+# Workflow stages in execution order, and the state keys each one produces.
+# A checkpoint is recorded after each stage so an interrupted session can resume.
+WORKFLOW_STAGES = ["classify", "reply", "download", "extract", "branch", "send"]
+STAGE_OUTPUT_KEYS = {
+    "classify": ["email_type"],
+    "reply": ["initial_reply_text"],
+    "download": ["attachment_artifacts", "attachment_hashes", "original_file_format"],
+    "extract": [
+        "extracted_text", "original_file_format", "detected_languages", "source_language",
+        "document_pairs", "translated_text", "target_language", "review_document_artifact",
+    ],
+    "branch": [
+        "translated_text", "translated_texts", "translation_quality_feedback",
+        "translated_document_artifact", "translated_document_artifacts", "translation_reuse", "streamed_documents",
+        "review_edit_instructions", "review_edit_plan", "edited_document_artifact", "result_cache_hit",
+    ],
+}
+
+# Minimal LlmAgent wrappers that run the initial tools (Step 3-4) from the orchestrator.
+# Built once on first use and reused, instead of once per email; like the branches,
+# they import their tools only then.
+def create_download_agent() -> LlmAgent:
+    from .subagents.tools.tools import download_attachments_tool
+
+    return LlmAgent(
+        name="DownloadAgent",
+        model=model_router.llm_for("tool_call"), # Fast tier; maybe even a non-LLM agent could run tools?
+        before_model_callback=model_router.callback_for("tool_call"),
+        instruction="Run the download_attachments_tool.",
+        tools=[download_attachments_tool],
+        description="Internal agent to download attachments tool."
+    )
+
+
+def create_extract_agent() -> LlmAgent:
+    from .subagents.tools.tools import extract_text_tool
+
+    return LlmAgent(
+        name="ExtractAgent",
+        model=model_router.llm_for("tool_call"), # Fast tier
+        before_model_callback=model_router.callback_for("tool_call"),
+        instruction="Run the extract_text_tool on artifacts listed in state.",
+        tools=[extract_text_tool],
+        description="Internal agent to extract text tool."
+    )
+
+
+# Factories for the agents the orchestrator builds lazily, keyed by attribute name
+LAZY_AGENT_FACTORIES = {
+    "translation_workflow_agent": create_translation_workflow_agent,
+    "review_workflow_agent": create_review_workflow_agent,
+    "email_sender_agent": create_email_sender_agent,
+    "download_agent": create_download_agent,
+    "extract_agent": create_extract_agent,
+}
+
 # Define a Custom Agent to handle the conditional workflow
 class EmailWorkflowOrchestrator(BaseAgent):
     """
@@ -28,11 +94,10 @@ class EmailWorkflowOrchestrator(BaseAgent):
     # Define agents and tools as instance attributes for Pydantic (implicitly used by BaseAgent)
     classifier_agent: LlmAgent
     initial_reply_agent: LlmAgent
-    translation_workflow_agent: SequentialAgent
-    review_workflow_agent: SequentialAgent
-    email_sender_agent: SequentialAgent
-    download_attachments_tool: object # Use object or BaseTool/FunctionTool type hint
-    extract_text_tool: object
+    # Branch and helper agents are built from these factories on first use,
+    # so short-lived workers only pay for the branches they actually run
+    agent_factories: Dict[str, Callable[[], BaseAgent]]
+    _lazy_agents: Dict[str, BaseAgent] = PrivateAttr(default_factory=dict)
 
     # Pydantic config - arbitrary_types_allowed is often needed for Agent type hints
     model_config = {"arbitrary_types_allowed": True}
@@ -42,41 +107,176 @@ class EmailWorkflowOrchestrator(BaseAgent):
         name: str,
         classifier_agent: LlmAgent,
         initial_reply_agent: LlmAgent,
-        translation_workflow_agent: SequentialAgent,
-        review_workflow_agent: SequentialAgent,
-        email_sender_agent: SequentialAgent,
-        download_attachments_tool: object, # Tools also passed in
-        extract_text_tool: object,
+        agent_factories: Dict[str, Callable[[], BaseAgent]],
         # Pass sub_agents list to the BaseAgent constructor for framework introspection
-        # Include only direct children that this orchestrator calls at the top level
-        # (Classifier, Reply, Sender, and the two branch workflows)
+        # Include only direct children that exist up front (Classifier, Reply);
+        # lazily built agents are appended when first used
         sub_agents: list[BaseAgent] # Type hint for the list
     ):
         super().__init__(
             name=name,
             classifier_agent=classifier_agent,
             initial_reply_agent=initial_reply_agent,
-            translation_workflow_agent=translation_workflow_agent,
-            review_workflow_agent=review_workflow_agent,
-            email_sender_agent=email_sender_agent,
-            download_attachments_tool=download_attachments_tool,
-            extract_text_tool=extract_text_tool,
+            agent_factories=agent_factories,
             sub_agents=sub_agents
         )
 
+    def _lazy_agent(self, key: str) -> BaseAgent:
+        """Returns the agent for `key`, building it and attaching it to the tree on first use."""
+        agent = self._lazy_agents.get(key)
+        if agent is None:
+            logger.info(f"[{self.name}] Building {key} on first use.")
+            agent = self.agent_factories[key]()
+            agent.parent_agent = self
+            self.sub_agents.append(agent)
+            self._lazy_agents[key] = agent
+        return agent
+
+    @property
+    def translation_workflow_agent(self) -> BaseAgent:
+        return self._lazy_agent("translation_workflow_agent")
+
+    @property
+    def review_workflow_agent(self) -> BaseAgent:
+        return self._lazy_agent("review_workflow_agent")
+
+    @property
+    def email_sender_agent(self) -> BaseAgent:
+        return self._lazy_agent("email_sender_agent")
+
+    @property
+    def download_agent(self) -> BaseAgent:
+        return self._lazy_agent("download_agent")
+
+    @property
+    def extract_agent(self) -> BaseAgent:
+        return self._lazy_agent("extract_agent")
+
     @override
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """
+        Runs the workflow under the flight recorder, which dumps the timeline of slow sessions,
+        and within the email's deadline. A stage that runs out of time is cancelled and the
+        workflow ends with a partial-failure event; the checkpoints of the stages that finished
+        are kept, so a redelivery resumes from the stage that timed out.
+        """
+        flight_recorder.start_session(ctx.session.id)
+        deadline_token = current_deadline.set(email_deadline(ctx.session.state))
+        status = "incomplete"
+        try:
+            if ctx.session.state.get("workflow_failure"):
+                # A redelivery of a failed run: the outcome is decided by this run alone
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    actions=EventActions(state_delta={"workflow_failure": None}),
+                )
+            async for event in self._run_workflow(ctx):
+                yield event
+            status = "returned"
+        except StageTimeout as timeout:
+            status = "timed_out"
+            logger.error(f"[{self.name}] {timeout}. Workflow stopped.")
+            flight_recorder.record(ctx.session.id, "stage_timeout", timeout.stage)
+            yield self._partial_failure_event(ctx, timeout)
+        finally:
+            try:
+                current_deadline.reset(deadline_token)
+            except ValueError:
+                pass # Closed from another context; that context never saw the value
+            flight_recorder.end_session(ctx.session.id, status)
+
+    def _partial_failure_event(self, ctx: InvocationContext, timeout: StageTimeout) -> Event:
+        """Final event of a workflow stopped by its deadline: what ran out of time and what was done."""
+        completed_stages = [checkpoint["stage"] for checkpoint in checkpoint_store.load(ctx.app_name, ctx.user_id, ctx.session.id)]
+        workflow_failure = {
+            "reason": "deadline_exceeded",
+            "stage": timeout.stage,
+            "budget_seconds": round(timeout.budget_seconds, 3),
+            "elapsed_seconds": round(timeout.elapsed_seconds, 3),
+            "completed_stages": completed_stages,
+        }
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(parts=[types.Part(text=f"Workflow stopped: stage '{timeout.stage}' ran out of time. Completed stages: {', '.join(completed_stages) or 'none'}.")]),
+            actions=EventActions(state_delta={"workflow_failure": workflow_failure}),
+        )
+
+    def _failed_workflow_event(self, ctx: InvocationContext, stage: str, message: str) -> Event:
+        """
+        Final event of a workflow that can't go on. Its checkpoints and sensitive values are
+        dropped, since a resume would only fail the same way, and the failure is recorded in
+        state['workflow_failure'].
+        """
+        checkpoint_store.clear(ctx.app_name, ctx.user_id, ctx.session.id)
+        sensitive_vault.evict_session(ctx.app_name, ctx.user_id, ctx.session.id)
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(parts=[types.Part(text=message)]),
+            actions=EventActions(state_delta={"workflow_failure": {"reason": "stage_failed", "stage": stage, "message": message}}),
+        )
+
+    def _within_budget(self, stage: str, events: AsyncGenerator[Event, None]) -> AsyncGenerator[Event, None]:
+        """The events of a stage, which is cancelled if it runs past its share of the email's remaining time."""
+        return run_stage_with_deadline(stage, events, WORKFLOW_STAGES[WORKFLOW_STAGES.index(stage):])
+
+    async def _classify_in_batch(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        email_type = await classification_batcher.classify(
+            ctx.session.state.get("email_subject"), ctx.session.state.get("email_body")
+        )
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={"email_type": email_type}),
+        )
+
+    async def _run_workflow(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Implements the custom orchestration logic."""
         logger.info(f"[{self.name}] Starting email workflow orchestration.")
 
+        # Per-tenant quotas: every model and backend call below counts against the sender's domain
+        sender_email = ctx.session.state.get("email_sender_email") or ""
+        current_tenant.set(sender_email.rpartition("@")[2].lower() or "default")
+
         # Ensure initial email data is in state (assuming main.py put it there)
         # You might want to add validation here
 
+        # --- Resume from Checkpoints ---
+        # A session with checkpoints was interrupted part-way (e.g. the worker died).
+        # Skip the stages it already completed and restore any of their state keys
+        # the session store lost, so only the unfinished stages run again.
+        completed_checkpoints = checkpoint_store.load(ctx.app_name, ctx.user_id, ctx.session.id)
+        completed_stages = {checkpoint["stage"] for checkpoint in completed_checkpoints}
+        if completed_checkpoints:
+            restored_state = {}
+            for checkpoint in completed_checkpoints:
+                for key, value in checkpoint["state"].items():
+                    if value is not None and ctx.session.state.get(key) is None:
+                        restored_state[key] = value
+            logger.info(f"[{self.name}] Resuming session after stage '{completed_checkpoints[-1]['stage']}' ({len(restored_state)} state keys restored).")
+            if restored_state:
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    actions=EventActions(state_delta=restored_state),
+                )
+
         # --- Step 1: Classify Email ---
-        logger.info(f"[{self.name}] Running Email Classifier Agent.")
-        # The classifier reads state['email_subject'] and state['email_body']
-        async for event in self.classifier_agent.run_async(ctx):
-            yield event # Yield events from sub-agent
+        if "classify" not in completed_stages:
+            flight_recorder.record(ctx.session.id, "stage_start", "classify")
+            if CLASSIFIER_BATCHING:
+                # Shares one model call with the other emails arriving right now
+                logger.info(f"[{self.name}] Classifying email in a micro-batch.")
+                async for event in self._within_budget("classify", self._classify_in_batch(ctx)):
+                    yield event
+            else:
+                logger.info(f"[{self.name}] Running Email Classifier Agent.")
+                # The classifier reads state['email_subject'] and state['email_body']
+                async for event in self._within_budget("classify", self.classifier_agent.run_async(ctx)):
+                    yield event # Yield events from sub-agent
+            self._checkpoint(ctx, "classify")
 
         email_type = ctx.session.state.get("email_type")
         logger.info(f"[{self.name}] Email classified as: {email_type}")
@@ -84,6 +284,7 @@ class EmailWorkflowOrchestrator(BaseAgent):
         # Check if classification happened successfully
         if email_type not in ["translation", "review"]:
              logger.warning(f"[{self.name}] Unknown email type '{email_type}'. Ending workflow.")
+             checkpoint_store.clear(ctx.app_name, ctx.user_id, ctx.session.id)
              # Optionally generate a final "cannot process" response
              yield Event(
                  author=self.name,
@@ -92,16 +293,18 @@ class EmailWorkflowOrchestrator(BaseAgent):
              return # Stop workflow
 
         # --- Step 2: Generate Initial Reply ---
-        logger.info(f"[{self.name}] Running Initial Reply Agent.")
-        # The reply agent reads state['email_sender_email'] and state['email_type']
-        async for event in self.initial_reply_agent.run_async(ctx):
-            yield event # Yield events from sub-agent
+        if "reply" not in completed_stages:
+            flight_recorder.record(ctx.session.id, "stage_start", "reply")
+            logger.info(f"[{self.name}] Running Initial Reply Agent.")
+            # The reply agent reads state['email_sender_email'] and state['email_type']
+            async for event in self._within_budget("reply", self.initial_reply_agent.run_async(ctx)):
+                yield event # Yield events from sub-agent
+            self._checkpoint(ctx, "reply")
 
         initial_reply_text = ctx.session.state.get("initial_reply_text")
         logger.info(f"[{self.name}] Initial reply generated (saved to state).")
 
         # --- Step 3: Download Attachments (using a Tool) ---
-        logger.info(f"[{self.name}] Downloading attachments.")
         # This tool needs the initial attachments list from state
         # It will save them as Artifacts and update state with artifact names/versions
         # Run tool directly from CustomAgent using tool_context.actions.run_tool
@@ -113,118 +316,205 @@ class EmailWorkflowOrchestrator(BaseAgent):
         # Let's make a minimal LlmAgent wrapper for these initial tools for clarity.
 
         # Re-architecting Step 3-4 slightly for better ADK patterns within CustomAgent:
-        # Use temporary LlmAgents to run the tools and yield events.
-
-        download_agent = LlmAgent(
-            name="DownloadAgent",
-            model="gemini-2.0-flash", # Minimal model, maybe even a non-LLM agent could run tools?
-            instruction="Run the download_attachments_tool.",
-            tools=[download_attachments_tool],
-            description="Internal agent to download attachments tool."
-        )
-        extract_agent = LlmAgent(
-            name="ExtractAgent",
-            model="gemini-2.0-flash", # Minimal model
-            instruction="Run the extract_text_tool on artifacts listed in state.",
-            tools=[extract_text_tool],
-            description="Internal agent to extract text tool."
-        )
+        # Use minimal LlmAgents (see create_download_agent) to run the tools and yield events.
 
-        logger.info(f"[{self.name}] Running Download Agent.")
-        async for event in download_agent.run_async(ctx):
-             yield event # Yield events from download tool
+        if "download" not in completed_stages:
+            flight_recorder.record(ctx.session.id, "stage_start", "download")
+            logger.info(f"[{self.name}] Running Download Agent.")
+            async for event in self._within_budget("download", self.download_agent.run_async(ctx)):
+                 yield event # Yield events from download tool
 
         attachment_artifacts = ctx.session.state.get("attachment_artifacts")
         if not attachment_artifacts:
             logger.error(f"[{self.name}] Failed to download attachments. Aborting workflow.")
-            yield Event(
-                 author=self.name,
-                 content=types.Content(parts=[types.Part(text="Failed to download attachments. Workflow ended.")])
-             )
+            yield self._failed_workflow_event(ctx, "download", "Failed to download attachments. Workflow ended.")
             return
+        if "download" not in completed_stages:
+            self._checkpoint(ctx, "download")
 
         # --- Step 4: Extract Text (using a Tool) ---
-        logger.info(f"[{self.name}] Running Extract Text Agent.")
-        # This tool reads artifact names from state, loads artifacts, extracts text, updates state
-        async for event in extract_agent.run_async(ctx):
-             yield event # Yield events from extract tool
+        if "extract" not in completed_stages:
+            flight_recorder.record(ctx.session.id, "stage_start", "extract")
+            logger.info(f"[{self.name}] Running Extract Text Agent.")
+            # This tool reads artifact names from state, loads artifacts, extracts text, updates state
+            async for event in self._within_budget("extract", self.extract_agent.run_async(ctx)):
+                 yield event # Yield events from extract tool
 
         extracted_text = ctx.session.state.get("extracted_text")
         if not extracted_text:
              logger.error(f"[{self.name}] Failed to extract text from attachments. Aborting workflow.")
-             yield Event(
-                 author=self.name,
-                 content=types.Content(parts=[types.Part(text="Failed to extract text from attachments. Workflow ended.")])
-             )
+             yield self._failed_workflow_event(ctx, "extract", "Failed to extract text from attachments. Workflow ended.")
              return
+        if "extract" not in completed_stages:
+            self._checkpoint(ctx, "extract")
 
-        # --- Step 5: Conditional Workflow Branching ---
-        if email_type == "translation":
-            logger.info(f"[{self.name}] Routing to Translation Workflow.")
-            async for event in self.translation_workflow_agent.run_async(ctx):
-                yield event # Yield events from the entire translation sequence
-
-            final_document_artifact = ctx.session.state.get("translated_document_artifact") # Get result from state
-            # Check if translation succeeded
-            if not final_document_artifact:
-                 logger.error(f"[{self.name}] Translation workflow failed. Aborting.")
-                 yield Event(
-                     author=self.name,
-                     content=types.Content(parts=[types.Part(text="Translation workflow failed. Cannot send email.")])
-                 )
-                 return
+        if "branch" not in completed_stages:
+            flight_recorder.record(ctx.session.id, "stage_start", "branch")
+            async for event in self._within_budget("branch", self._run_branch(ctx, email_type)):
+                yield event
+            output_state_key = "translated_document_artifact" if email_type == "translation" else "edited_document_artifact"
+            if not ctx.session.state.get(output_state_key):
+                return # Branch failed; the failure event (which drops the checkpoints) has already been yielded
+            self._checkpoint(ctx, "branch")
 
-        elif email_type == "review":
-            logger.info(f"[{self.name}] Routing to Review Workflow.")
-            async for event in self.review_workflow_agent.run_async(ctx):
-                yield event # Yield events from the entire review sequence
-
-            final_document_artifact = ctx.session.state.get("edited_document_artifact") # Get result from state
-            # Check if review succeeded
-            if not final_document_artifact:
-                 logger.error(f"[{self.name}] Review workflow failed. Aborting.")
-                 yield Event(
-                     author=self.name,
-                     content=types.Content(parts=[types.Part(text="Review workflow failed. Cannot send email.")])
-                 )
-                 return
-        else:
-             # This case should already be handled, but as a safeguard:
-             logger.error(f"[{self.name}] Workflow reached branching with unhandled type: {email_type}. Aborting.")
-             yield Event(
-                 author=self.name,
-                 content=types.Content(parts=[types.Part(text=f"Internal error: Unknown email type '{email_type}' at branching step. Workflow ended.")])
-             )
-             return
-
-        # --- Step 6: Send Final Email ---
+        # --- Step 7: Send Final Email ---
+        flight_recorder.record(ctx.session.id, "stage_start", "send")
         logger.info(f"[{self.name}] Running Email Sender Agent.")
         # The sender agent reads email sender, initial reply text, and final document artifact from state
-        async for event in self.email_sender_agent.run_async(ctx):
+        async for event in self._within_budget("send", self.email_sender_agent.run_async(ctx)):
             yield event # Yield events from the sender tool
+        flight_recorder.record(ctx.session.id, "stage_end", "send")
 
+        # Workflow is complete; nothing left to resume
+        checkpoint_store.clear(ctx.app_name, ctx.user_id, ctx.session.id)
+        # The email is sent, so the placeholder mapping is no longer needed
+        sensitive_vault.evict_session(ctx.app_name, ctx.user_id, ctx.session.id)
         logger.info(f"[{self.name}] Workflow finished successfully.")
         # The very last event from the sender agent will be the final response.
 
+    async def _run_branch(self, ctx: InvocationContext, email_type: str) -> AsyncGenerator[Event, None]:
+        """Runs the translation or review branch, reusing a cached result when possible."""
+        # --- Step 5: Result Deduplication ---
+        # Identical attachment bytes with the same email type and target languages
+        # produce the same documents, so reuse a finished result if one exists.
+        # Concurrent duplicates wait here for the first session to finish.
+        output_state_key = "translated_document_artifact" if email_type == "translation" else "edited_document_artifact"
+        target_language = None
+        if email_type == "translation":
+            target_languages = ctx.session.state.get("target_languages") or [ctx.session.state.get("target_language")]
+            target_language = ",".join(sorted(str(language).lower() for language in target_languages if language)) or None
+        content_hash = combine_attachment_hashes(ctx.session.state.get("attachment_hashes", {}))
+        result_key = None
+        owns_result_key = False
+
+        if content_hash:
+            result_key = result_index.make_key(content_hash, email_type, target_language)
+            cached_result = await result_index.acquire(result_key)
+            if cached_result is not None:
+                linked_artifacts = await self._link_cached_result(ctx, cached_result)
+                if linked_artifacts is None:
+                    # Cached artifact is gone (e.g. its session was deleted); recompute.
+                    result_index.invalidate(result_key)
+                    owns_result_key = await result_index.acquire(result_key) is None
+            else:
+                linked_artifacts = None
+                owns_result_key = True
+        else:
+            linked_artifacts = None
+
+        try:
+            if linked_artifacts is not None:
+                logger.info(f"[{self.name}] Reusing {len(linked_artifacts)} cached {email_type} result(s). Skipping to sender.")
+                state_delta = {output_state_key: linked_artifacts[0], "result_cache_hit": True}
+                if email_type == "translation":
+                    state_delta["translated_document_artifacts"] = linked_artifacts
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    actions=EventActions(state_delta=state_delta),
+                )
+
+            # --- Step 6: Conditional Workflow Branching ---
+            elif email_type == "translation":
+                logger.info(f"[{self.name}] Routing to Translation Workflow.")
+                async for event in self.translation_workflow_agent.run_async(ctx):
+                    yield event # Yield events from the entire translation sequence
+
+                final_document_artifact = ctx.session.state.get("translated_document_artifact") # Get result from state
+                # Check if translation succeeded
+                if not final_document_artifact:
+                     logger.error(f"[{self.name}] Translation workflow failed. Aborting.")
+                     yield self._failed_workflow_event(ctx, "branch", "Translation workflow failed. Cannot send email.")
+                     return
+
+            elif email_type == "review":
+                logger.info(f"[{self.name}] Routing to Review Workflow.")
+                async for event in self.review_workflow_agent.run_async(ctx):
+                    yield event # Yield events from the entire review sequence
+
+                final_document_artifact = ctx.session.state.get("edited_document_artifact") # Get result from state
+                # Check if review succeeded
+                if not final_document_artifact:
+                     logger.error(f"[{self.name}] Review workflow failed. Aborting.")
+                     yield self._failed_workflow_event(ctx, "branch", "Review workflow failed. Cannot send email.")
+                     return
+            else:
+                 # This case should already be handled, but as a safeguard:
+                 logger.error(f"[{self.name}] Workflow reached branching with unhandled type: {email_type}. Aborting.")
+                 yield self._failed_workflow_event(ctx, "branch", f"Internal error: Unknown email type '{email_type}' at branching step. Workflow ended.")
+                 return
+
+            if owns_result_key:
+                final_document_artifact = ctx.session.state.get(output_state_key)
+                if isinstance(final_document_artifact, dict) and final_document_artifact.get("artifact_name"):
+                    final_artifacts = [final_document_artifact]
+                    if email_type == "translation":
+                        final_artifacts = ctx.session.state.get("translated_document_artifacts") or final_artifacts
+                    result_index.publish(result_key, {
+                        "app_name": ctx.app_name,
+                        "user_id": ctx.user_id,
+                        "session_id": ctx.session.id,
+                        "artifacts": [dict(artifact) for artifact in final_artifacts],
+                    })
+                    owns_result_key = False
+        finally:
+            # Branch failed or was cancelled: let a waiting duplicate take over.
+            if owns_result_key:
+                result_index.release(result_key)
+
+    def _checkpoint(self, ctx: InvocationContext, stage: str) -> None:
+        """Records a durable checkpoint holding the state keys `stage` produced."""
+        produced_state = {key: ctx.session.state.get(key) for key in STAGE_OUTPUT_KEYS[stage]}
+        state_bytes = checkpoint_store.record(
+            ctx.app_name, ctx.user_id, ctx.session.id, stage, WORKFLOW_STAGES.index(stage), produced_state
+        )
+        flight_recorder.record(ctx.session.id, "stage_end", stage, payload_bytes=state_bytes)
+
+    async def _link_cached_result(self, ctx: InvocationContext, cached_result: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Links the cached output artifacts from another session into this session.
+        Returns the artifact details for state, or None if any can't be loaded.
+        """
+        if ctx.artifact_service is None:
+            return None
+
+        linked_artifacts = []
+        for cached_artifact in cached_result.get("artifacts", []):
+            try:
+                artifact_part = await ctx.artifact_service.load_artifact(
+                    app_name=cached_result["app_name"],
+                    user_id=cached_result["user_id"],
+                    session_id=cached_result["session_id"],
+                    filename=cached_artifact["artifact_name"],
+                    version=cached_artifact.get("artifact_version"),
+                )
+                if artifact_part is None:
+                    return None
+
+                # Saving the loaded Part re-references the same data under this session
+                version = await ctx.artifact_service.save_artifact(
+                    app_name=ctx.app_name,
+                    user_id=ctx.user_id,
+                    session_id=ctx.session.id,
+                    filename=cached_artifact["artifact_name"],
+                    artifact=artifact_part,
+                )
+            except Exception as e:
+                logger.warning(f"[{self.name}] Could not link cached artifact '{cached_artifact.get('artifact_name')}': {e}")
+                return None
+            linked_artifacts.append({**cached_artifact, "artifact_version": version})
+
+        return linked_artifacts or None
+
 # Instantiate the custom orchestrator agent and its sub-agents/tools
 # Tools needed for the Orchestrator's logic (Download, Extract) are passed directly
 root_agent = EmailWorkflowOrchestrator(
     name="EmailWorkflowOrchestrator",
     classifier_agent=classifier_agent,
     initial_reply_agent=initial_reply_agent,
-    translation_workflow_agent=translation_workflow_agent,
-    review_workflow_agent=review_workflow_agent,
-    email_sender_agent=email_sender_agent,
-    download_attachments_tool=download_attachments_tool, # Pass the tool instance
-    extract_text_tool=extract_text_tool, # Pass the tool instance
+    agent_factories=LAZY_AGENT_FACTORIES,
     sub_agents=[
         classifier_agent,
         initial_reply_agent,
-        translation_workflow_agent,
-        review_workflow_agent,
-        email_sender_agent,
-        # Also include the temporary agents used for download/extract for introspection
-        LlmAgent(name="DownloadAgent_tmp", model="gemini-2.0-flash", tools=[download_attachments_tool]),
-        LlmAgent(name="ExtractAgent_tmp", model="gemini-2.0-flash", tools=[extract_text_tool]),
     ]
-)
\ No newline at end of file
+)
@@ -0,0 +1,99 @@
+# email-agent-workflow/email_workflow_agent/checkpoints.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding stage checkpoints. Keep it next to the session database
+# so a restarted worker sees both.
+CHECKPOINT_DB_PATH = os.getenv("WORKFLOW_CHECKPOINT_DB", "workflow_checkpoints.db")
+
+
+class CheckpointStore:
+    """
+    Durable record of the workflow stages each session has completed.
+
+    One row per (session, stage) holding the state keys that stage produced.
+    The orchestrator writes a row after each stage and deletes the session's
+    rows once the final email is sent, so any session with rows left over
+    belongs to a workflow that was interrupted.
+    """
+
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the package never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Sensitive values used to be kept here unencrypted; they now live in sensitive_store
+            conn.execute("DROP TABLE IF EXISTS sensitive_values")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS stage_checkpoints (
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    state_json TEXT NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id, stage)
+                )"""
+            )
+            self._conn = conn
+        return self._conn
+
+    def record(self, app_name: str, user_id: str, session_id: str, stage: str, seq: int, state: Dict[str, Any]) -> int:
+        """Records that `stage` completed and produced the given state values. Returns the stored size in bytes."""
+        state_json = json.dumps(state, default=str)
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO stage_checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, stage, seq, state_json, time.time()),
+            )
+        logger.info(f"[Checkpoint] Session {session_id[:8]} completed stage '{stage}'.")
+        return len(state_json)
+
+    def load(self, app_name: str, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """Returns the completed stages of a session in completion order."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT stage, seq, state_json FROM stage_checkpoints "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq",
+                (app_name, user_id, session_id),
+            ).fetchall()
+        return [{"stage": stage, "seq": seq, "state": json.loads(state_json)} for stage, seq, state_json in rows]
+
+    def clear(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Drops a session's checkpoints once its workflow has finished."""
+        with self._lock:
+            self._db().execute(
+                "DELETE FROM stage_checkpoints WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            )
+
+    def unfinished_sessions(self, app_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lists sessions that have checkpoints but never finished, oldest first."""
+        query = (
+            "SELECT app_name, user_id, session_id, MAX(seq), MAX(completed_at) FROM stage_checkpoints "
+            + ("WHERE app_name = ? " if app_name else "")
+            + "GROUP BY app_name, user_id, session_id ORDER BY MAX(completed_at)"
+        )
+        with self._lock:
+            rows = self._db().execute(query, (app_name,) if app_name else ()).fetchall()
+        return [
+            {"app_name": row[0], "user_id": row[1], "session_id": row[2], "last_seq": row[3], "updated_at": row[4]}
+            for row in rows
+        ]
+
+
+# Shared by every orchestrator run in this process
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,165 @@
+# email-agent-workflow/email_workflow_agent/deadlines.py
+import asyncio
+import contextvars
+import logging
+import os
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Time one email may take from the start of its run; 0 turns deadlines off.
+# Can be set per email with state['deadline_seconds'].
+EMAIL_DEADLINE_SECONDS = float(os.getenv("EMAIL_DEADLINE_SECONDS", "900"))
+
+# Relative share of the remaining time each stage gets. A stage may use its
+# share of whatever is left when it starts, so time saved by a fast stage
+# goes to the ones after it.
+STAGE_BUDGET_WEIGHTS = {
+    "classify": 1.0,
+    "reply": 1.0,
+    "download": 2.0,
+    "extract": 2.0,
+    "branch": 12.0,
+    "send": 2.0,
+}
+DEFAULT_STAGE_WEIGHT = 1.0
+
+# Deadline (event loop time) of the email, and within a stage of that stage.
+# Like current_tenant, it follows the task into every sub-agent, tool and gather() child.
+current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("current_deadline", default=None)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised by a call that won't start (or retry) because the current deadline has passed or is too close."""
+
+
+class StageTimeout(Exception):
+    """Raised when a workflow stage ran out of its time budget and was cancelled."""
+
+    def __init__(self, stage: str, budget_seconds: float, elapsed_seconds: float):
+        super().__init__(f"Stage '{stage}' exceeded its {budget_seconds:.1f}s budget after {elapsed_seconds:.1f}s")
+        self.stage = stage
+        self.budget_seconds = budget_seconds
+        self.elapsed_seconds = elapsed_seconds
+
+
+def email_deadline(state) -> Optional[float]:
+    """Event loop time by which the email's run must finish, or None if deadlines are off."""
+    seconds = float(state.get("deadline_seconds") or EMAIL_DEADLINE_SECONDS)
+    return asyncio.get_running_loop().time() + seconds if seconds > 0 else None
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds until the current deadline, or None if there is none."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def check_deadline(operation: str) -> None:
+    """Raises DeadlineExceeded if the current deadline has passed, so no new call is started."""
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"No time left for {operation}")
+
+
+def stage_budget(stage: str, remaining_stages: List[str], remaining: float) -> float:
+    """The part of `remaining` seconds that `stage` gets, by its weight among the stages still to run."""
+    total_weight = sum(STAGE_BUDGET_WEIGHTS.get(name, DEFAULT_STAGE_WEIGHT) for name in remaining_stages) or 1.0
+    return max(0.0, remaining * STAGE_BUDGET_WEIGHTS.get(stage, DEFAULT_STAGE_WEIGHT) / total_weight)
+
+
+class DeadlineMetrics:
+    """Per-stage run, timeout and elapsed-time counters, shared by every workflow in the process."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def _stage(self, stage: str) -> Dict[str, float]:
+        if stage not in self._stages:
+            self._stages[stage] = {"runs": 0, "timeouts": 0, "elapsed_total_s": 0.0, "elapsed_max_s": 0.0, "budget_min_s": float("inf")}
+        return self._stages[stage]
+
+    def record(self, stage: str, elapsed_seconds: float, budget_seconds: float, timed_out: bool) -> None:
+        metrics = self._stage(stage)
+        metrics["runs"] += 1
+        metrics["timeouts"] += int(timed_out)
+        metrics["elapsed_total_s"] += elapsed_seconds
+        metrics["elapsed_max_s"] = max(metrics["elapsed_max_s"], elapsed_seconds)
+        metrics["budget_min_s"] = min(metrics["budget_min_s"], budget_seconds)
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            stage: {**metrics, "elapsed_avg_s": metrics["elapsed_total_s"] / metrics["runs"] if metrics["runs"] else 0.0}
+            for stage, metrics in self._stages.items()
+        }
+
+
+async def run_stage_with_deadline(
+    stage: str,
+    events: AsyncIterator[T],
+    remaining_stages: List[str],
+) -> AsyncGenerator[T, None]:
+    """
+    Passes on the events of one workflow stage within its time budget.
+
+    The budget is the stage's share (among `remaining_stages`) of the time
+    left before the email's deadline in current_deadline; without one the
+    events pass straight through. The stage's own deadline replaces it in
+    current_deadline for the stage's sub-agents and tools, and is enforced by
+    cancelling the stage: the CancelledError runs through the in-flight
+    model and backend calls, so their connections, pool slots and rate
+    limiter permits are released. Only the waits for the next event are
+    timed, never the consumer's handling of an event. Raises StageTimeout.
+    """
+    outer_deadline = current_deadline.get()
+    if outer_deadline is None:
+        async for event in events:
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    budget = stage_budget(stage, remaining_stages, outer_deadline - started)
+    stage_deadline = started + budget
+    token = current_deadline.set(stage_deadline)
+    timed_out = False
+    try:
+        iterator = events.__aiter__()
+        while True:
+            timeout = asyncio.timeout_at(stage_deadline)
+            try:
+                async with timeout:
+                    event = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                if not timeout.expired():
+                    raise # Not ours; a call inside the stage timed out on its own
+                timed_out = True
+            except DeadlineExceeded as e:
+                logger.warning(f"[Deadline] Stage '{stage}' gave up: {e}")
+                timed_out = True
+            if timed_out:
+                await _close(iterator)
+                raise StageTimeout(stage, budget, loop.time() - started)
+            yield event
+    finally:
+        deadline_metrics.record(stage, loop.time() - started, budget, timed_out)
+        try:
+            current_deadline.reset(token)
+        except ValueError:
+            pass # Closed from another context (e.g. garbage collected); that context never saw the value
+
+
+async def _close(iterator: AsyncIterator[Any]) -> None:
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+# Shared by every workflow in this process
+deadline_metrics = DeadlineMetrics()
@@ -0,0 +1,77 @@
+# email-agent-workflow/email_workflow_agent/fake_backend.py
+import asyncio
+import collections
+import os
+import random
+import time
+from typing import Optional
+
+from .rate_limiter import RateLimitedError
+
+
+class FakeThrottlingBackend:
+    """
+    Offline stand-in for a quota-limited API, used to exercise the rate
+    limiters without network access.
+
+    Answers 429 (RateLimitedError) when more than `requests_per_second`
+    calls arrive within one second or more than `max_concurrency` are in
+    flight. Accepted calls take longer the more calls are in flight, like
+    a backend under load. A `stall_probability` fraction of calls stalls
+    for `stall_seconds`, to reproduce a slow tail.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        max_concurrency: int,
+        base_latency_seconds: float = 0.01,
+        latency_per_inflight_seconds: float = 0.005,
+        stall_probability: float = 0.0,
+        stall_seconds: float = 2.0,
+    ):
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.base_latency_seconds = base_latency_seconds
+        self.latency_per_inflight_seconds = latency_per_inflight_seconds
+        self.stall_probability = stall_probability
+        self.stall_seconds = stall_seconds
+        self._recent = collections.deque()
+        self._inflight = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    async def call(self) -> None:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.requests_per_second or self._inflight >= self.max_concurrency:
+            self.rejected += 1
+            retry_after = 1.0 - (now - self._recent[0]) if self._recent else None
+            raise RateLimitedError("429 Too Many Requests (fake backend)", retry_after=retry_after)
+
+        self._recent.append(now)
+        self._inflight += 1
+        self.accepted += 1
+        try:
+            latency = self.base_latency_seconds + self.latency_per_inflight_seconds * self._inflight
+            if self.stall_probability and random.random() < self.stall_probability:
+                latency += self.stall_seconds
+            await asyncio.sleep(latency)
+        finally:
+            self._inflight -= 1
+
+
+def fake_backend_from_env(prefix: str) -> Optional[FakeThrottlingBackend]:
+    """
+    Builds a fake backend from <prefix>_FAKE_RPS, <prefix>_FAKE_CONCURRENCY and
+    <prefix>_FAKE_STALL_PROBABILITY, or returns None if <prefix>_FAKE_RPS isn't set.
+    """
+    requests_per_second = os.getenv(f"{prefix}_FAKE_RPS")
+    if not requests_per_second:
+        return None
+    return FakeThrottlingBackend(
+        requests_per_second=float(requests_per_second),
+        max_concurrency=int(os.getenv(f"{prefix}_FAKE_CONCURRENCY", "8")),
+        stall_probability=float(os.getenv(f"{prefix}_FAKE_STALL_PROBABILITY", "0")),
+    )
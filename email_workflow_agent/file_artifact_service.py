@@ -0,0 +1,193 @@
+# email-agent-workflow/email_workflow_agent/file_artifact_service.py
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import quote, unquote
+
+from google.adk.artifacts import BaseArtifactService
+from google.adk.artifacts.base_artifact_service import ArtifactVersion, ensure_part
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Root directory of the shared artifact store (set it to enable the store)
+ARTIFACT_DIR = os.getenv("WORKFLOW_ARTIFACT_DIR")
+
+
+def _path_segment(name: str, label: str) -> str:
+    """
+    One directory name of the store. Quoting takes care of separators; "",
+    "." and ".." are rejected, since they would point at the directory
+    itself or its parent.
+    """
+    segment = quote(name, safe="")
+    if segment in ("", ".", ".."):
+        raise ValueError(f"Invalid {label} for the artifact store: {name!r}")
+    return segment
+
+
+class FileArtifactService(BaseArtifactService):
+    """
+    Artifact store on a filesystem shared by every worker process on the box
+    (or a network mount), so any worker can load what another one saved.
+
+    Layout: <root>/<app>/<user>/sessions/<session>/<filename>/<version>, or
+    <root>/<app>/<user>/user/<filename>/<version> for "user:" artifacts.
+    Each version has a <version>.mime file beside it, and a
+    <version>.metadata.json file if it was saved with custom metadata.
+    Versions are claimed with an exclusive create, so two processes never
+    write the same version, and data is written to a temp file and renamed
+    into place, so readers never see a partial artifact.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _artifact_dir(self, app_name: str, user_id: str, session_id: Optional[str], filename: str) -> str:
+        if filename.startswith("user:"):
+            scope = ("user",)
+        elif session_id is None:
+            raise ValueError("Session ID must be provided for session-scoped artifacts.")
+        else:
+            scope = ("sessions", _path_segment(session_id, "session_id"))
+        return os.path.join(
+            self.root_dir, _path_segment(app_name, "app_name"), _path_segment(user_id, "user_id"), *scope, _path_segment(filename, "filename")
+        )
+
+    def _versions(self, artifact_dir: str) -> List[int]:
+        try:
+            names = os.listdir(artifact_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: Union[types.Part, Dict[str, Any]],
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        artifact = ensure_part(artifact)
+        if artifact.inline_data is not None:
+            data, mime_type = artifact.inline_data.data, artifact.inline_data.mime_type or "application/octet-stream"
+        elif artifact.text is not None:
+            data, mime_type = artifact.text.encode("utf-8"), "text/plain"
+        else:
+            raise ValueError("FileArtifactService can only store inline data or text artifacts.")
+        return await asyncio.to_thread(self._write_version, artifact_dir, data, mime_type, custom_metadata)
+
+    def _write_version(self, artifact_dir: str, data: bytes, mime_type: str, custom_metadata: Optional[Dict[str, Any]] = None) -> int:
+        os.makedirs(artifact_dir, exist_ok=True)
+        while True:
+            existing = self._versions(artifact_dir)
+            claimed = [int(name[:-5]) for name in os.listdir(artifact_dir) if name.endswith(".mime")]
+            version = max(existing + claimed, default=-1) + 1
+            try:
+                # Claim the version number; another process may have just taken it
+                with open(os.path.join(artifact_dir, f"{version}.mime"), "x", encoding="utf-8") as mime_file:
+                    mime_file.write(mime_type)
+                break
+            except FileExistsError:
+                continue
+        if custom_metadata:
+            # Written before the data, so it's there once the version is visible
+            with open(os.path.join(artifact_dir, f"{version}.metadata.json"), "w", encoding="utf-8") as metadata_file:
+                json.dump(custom_metadata, metadata_file)
+        fd, temp_path = tempfile.mkstemp(dir=artifact_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, os.path.join(artifact_dir, str(version)))
+        return version
+
+    async def load_artifact(
+        self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, version: Optional[int] = None
+    ) -> Optional[types.Part]:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        versions = self._versions(artifact_dir)
+        if not versions:
+            return None
+        version = versions[-1] if version is None else version
+        if version not in versions:
+            return None
+        return await asyncio.to_thread(self._read_version, artifact_dir, version)
+
+    def _read_version(self, artifact_dir: str, version: int) -> types.Part:
+        with open(os.path.join(artifact_dir, f"{version}.mime"), encoding="utf-8") as mime_file:
+            mime_type = mime_file.read()
+        with open(os.path.join(artifact_dir, str(version)), "rb") as data_file:
+            data = data_file.read()
+        return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None) -> List[str]:
+        user_root = os.path.join(self.root_dir, _path_segment(app_name, "app_name"), _path_segment(user_id, "user_id"))
+        scope_dirs = [os.path.join(user_root, "user")]
+        if session_id is not None:
+            scope_dirs.insert(0, os.path.join(user_root, "sessions", _path_segment(session_id, "session_id")))
+        keys = []
+        for scope_dir in scope_dirs:
+            if os.path.isdir(scope_dir):
+                keys.extend(unquote(name) for name in os.listdir(scope_dir) if self._versions(os.path.join(scope_dir, name)))
+        return sorted(keys)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None) -> None:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        await asyncio.to_thread(self._delete_dir, artifact_dir)
+
+    @staticmethod
+    def _delete_dir(artifact_dir: str) -> None:
+        if not os.path.isdir(artifact_dir):
+            return
+        for name in os.listdir(artifact_dir):
+            os.remove(os.path.join(artifact_dir, name))
+        os.rmdir(artifact_dir)
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None) -> List[int]:
+        return self._versions(self._artifact_dir(app_name, user_id, session_id, filename))
+
+    async def list_artifact_versions(
+        self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None
+    ) -> List[ArtifactVersion]:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        return await asyncio.to_thread(
+            lambda: [self._version_info(artifact_dir, version) for version in self._versions(artifact_dir)]
+        )
+
+    async def get_artifact_version(
+        self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, version: Optional[int] = None
+    ) -> Optional[ArtifactVersion]:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        versions = self._versions(artifact_dir)
+        if not versions:
+            return None
+        version = versions[-1] if version is None else version
+        if version not in versions:
+            return None
+        return await asyncio.to_thread(self._version_info, artifact_dir, version)
+
+    @staticmethod
+    def _version_info(artifact_dir: str, version: int) -> ArtifactVersion:
+        data_path = os.path.join(artifact_dir, str(version))
+        with open(os.path.join(artifact_dir, f"{version}.mime"), encoding="utf-8") as mime_file:
+            mime_type = mime_file.read()
+        try:
+            with open(os.path.join(artifact_dir, f"{version}.metadata.json"), encoding="utf-8") as metadata_file:
+                custom_metadata = json.load(metadata_file)
+        except FileNotFoundError:
+            custom_metadata = {}
+        return ArtifactVersion(
+            version=version,
+            canonical_uri=pathlib.Path(os.path.abspath(data_path)).as_uri(),
+            custom_metadata=custom_metadata,
+            create_time=os.path.getmtime(data_path),
+            mime_type=mime_type,
+        )
@@ -0,0 +1,225 @@
+# email-agent-workflow/email_workflow_agent/flight_recorder.py
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from typing import Any, Deque, Dict, List, Optional
+
+from .process_memory import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+# A session slower than this, or whose RSS grew by more than this, gets its timeline dumped
+FLIGHT_RECORDER_LATENCY_SECONDS = float(os.getenv("FLIGHT_RECORDER_LATENCY_SECONDS", "120"))
+FLIGHT_RECORDER_MEMORY_BYTES = int(os.getenv("FLIGHT_RECORDER_MEMORY_MB", "512")) * 1024 * 1024
+FLIGHT_RECORDER_DIR = os.getenv("FLIGHT_RECORDER_DIR", "flight_recordings")
+# Optional, heavier diagnostics included in dumps
+FLIGHT_RECORDER_TRACEMALLOC = os.getenv("FLIGHT_RECORDER_TRACEMALLOC", "0") == "1"
+FLIGHT_RECORDER_SAMPLE_STACKS = os.getenv("FLIGHT_RECORDER_SAMPLE_STACKS", "0") == "1"
+STACK_SAMPLE_INTERVAL_SECONDS = 0.05
+# How often open sessions are checked, so one stuck inside a single await is still caught
+FLIGHT_RECORDER_WATCHDOG_SECONDS = float(os.getenv("FLIGHT_RECORDER_WATCHDOG_SECONDS", "5"))
+
+
+class _SessionRecording:
+    def __init__(self, max_records: int):
+        self.started_at = time.time()
+        self.started_monotonic = time.monotonic()
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        self.records: Deque[Dict[str, Any]] = collections.deque(maxlen=max_records)
+        self.dumped = False
+
+
+class StackSampler:
+    """
+    Background thread that samples the event loop thread's stack every
+    `interval_seconds`, keeping the most recent samples in a ring buffer.
+    """
+
+    def __init__(self, interval_seconds: float = STACK_SAMPLE_INTERVAL_SECONDS, max_samples: int = 20000):
+        self.interval_seconds = interval_seconds
+        self.samples: Deque[tuple] = collections.deque(maxlen=max_samples)
+        self._target_thread_id = threading.main_thread().ident
+        self._thread = threading.Thread(target=self._run, name="flight-recorder-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval_seconds)
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is not None:
+                stack = tuple(f"{entry.filename}:{entry.lineno} {entry.name}" for entry in traceback.extract_stack(frame, limit=25))
+                self.samples.append((time.monotonic(), stack))
+
+    def top_stacks(self, since: float, limit: int = 15) -> List[Dict[str, Any]]:
+        counts = collections.Counter(stack for sampled_at, stack in list(self.samples) if sampled_at >= since)
+        return [{"samples": count, "stack": list(stack)} for stack, count in counts.most_common(limit)]
+
+
+class FlightRecorder:
+    """
+    Always-on, per-session ring buffer of workflow stage and tool timings,
+    payload sizes and memory readings.
+
+    Cheap enough to leave on: each record is a dict appended to a bounded
+    deque. When a session runs longer than `latency_threshold_seconds`
+    or grows RSS by more than `memory_threshold_bytes`, its timeline is
+    written to `dump_dir`, with sampled stacks and tracemalloc top
+    allocations if those are enabled. Thresholds are checked on every
+    record and by a watchdog thread every `watchdog_interval_seconds`, so
+    a session stuck inside a single await is dumped while it still runs.
+    """
+
+    def __init__(
+        self,
+        latency_threshold_seconds: float = FLIGHT_RECORDER_LATENCY_SECONDS,
+        memory_threshold_bytes: int = FLIGHT_RECORDER_MEMORY_BYTES,
+        dump_dir: str = FLIGHT_RECORDER_DIR,
+        max_records_per_session: int = 512,
+        max_sessions: int = 1000,
+        trace_allocations: bool = FLIGHT_RECORDER_TRACEMALLOC,
+        sample_stacks: bool = FLIGHT_RECORDER_SAMPLE_STACKS,
+        watchdog_interval_seconds: float = FLIGHT_RECORDER_WATCHDOG_SECONDS,
+    ):
+        self.latency_threshold_seconds = latency_threshold_seconds
+        self.memory_threshold_bytes = memory_threshold_bytes
+        self.dump_dir = dump_dir
+        self.max_records_per_session = max_records_per_session
+        self.max_sessions = max_sessions
+        self.trace_allocations = trace_allocations
+        self.sample_stacks = sample_stacks
+        self.watchdog_interval_seconds = watchdog_interval_seconds
+        self._sessions: "collections.OrderedDict[str, _SessionRecording]" = collections.OrderedDict()
+        # Guards the sessions and their dumped flags: the watchdog thread reads both
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self.dumps = 0
+
+    def _ensure_profilers(self) -> None:
+        # Started on the first session, so importing the package stays free of side effects
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        if self.sample_stacks and self._sampler is None:
+            self._sampler = StackSampler()
+        if self.watchdog_interval_seconds > 0 and self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="flight-recorder-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.watchdog_interval_seconds)
+            self.check_open_sessions()
+
+    def check_open_sessions(self) -> List[str]:
+        """Dumps every open session that crossed a threshold and was not dumped yet. Returns the dump paths."""
+        with self._lock:
+            open_sessions = list(self._sessions.items())
+        rss = current_rss_bytes()
+        paths = []
+        for session_id, recording in open_sessions:
+            if rss is not None and (recording.peak_rss is None or rss > recording.peak_rss):
+                recording.peak_rss = rss
+            path = self._dump_if_exceeded(session_id, recording)
+            if path:
+                paths.append(path)
+        return paths
+
+    def start_session(self, session_id: str) -> None:
+        self._ensure_profilers()
+        with self._lock:
+            self._sessions[session_id] = _SessionRecording(self.max_records_per_session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self.record(session_id, "session_start", "workflow")
+
+    def record(self, session_id: str, kind: str, name: str, payload_bytes: Optional[int] = None) -> None:
+        """Adds one timeline entry (e.g. stage_start/stage_end, tool_start/tool_end) for a session."""
+        recording = self._sessions.get(session_id)
+        if recording is None:
+            return
+        rss = current_rss_bytes()
+        if rss is not None and (recording.peak_rss is None or rss > recording.peak_rss):
+            recording.peak_rss = rss
+        recording.records.append({
+            "t_s": round(time.monotonic() - recording.started_monotonic, 4),
+            "kind": kind,
+            "name": name,
+            "payload_bytes": payload_bytes,
+            "rss_bytes": rss,
+        })
+        self._dump_if_exceeded(session_id, recording)
+
+    def end_session(self, session_id: str, status: str) -> Optional[str]:
+        """Closes a session's recording; dumps it if it crossed a threshold. Returns the dump path, if any."""
+        self.record(session_id, "session_end", status)
+        with self._lock:
+            recording = self._sessions.pop(session_id, None)
+        if recording is None:
+            return None
+        reason = self._threshold_exceeded(recording)
+        if reason:
+            # Dumped again at the end even if it was dumped mid-run, so the file has the full timeline
+            return self._dump(session_id, recording, reason, finished=True)
+        return None
+
+    def _dump_if_exceeded(self, session_id: str, recording: _SessionRecording) -> Optional[str]:
+        """Dumps a running session the first time it is over a threshold."""
+        with self._lock:
+            reason = None if recording.dumped else self._threshold_exceeded(recording)
+            if reason is None:
+                return None
+            recording.dumped = True # Claimed here, so a record and the watchdog don't both dump it
+        return self._dump(session_id, recording, reason, finished=False)
+
+    def _threshold_exceeded(self, recording: _SessionRecording) -> Optional[str]:
+        elapsed = time.monotonic() - recording.started_monotonic
+        if elapsed > self.latency_threshold_seconds:
+            return f"latency {elapsed:.1f}s > {self.latency_threshold_seconds:g}s"
+        if recording.start_rss is not None and recording.peak_rss is not None:
+            growth = recording.peak_rss - recording.start_rss
+            if growth > self.memory_threshold_bytes:
+                return f"RSS grew {growth / 2**20:.0f} MiB > {self.memory_threshold_bytes / 2**20:.0f} MiB"
+        return None
+
+    def _dump(self, session_id: str, recording: _SessionRecording, reason: str, finished: bool) -> Optional[str]:
+        recording.dumped = True
+        dump = {
+            "session_id": session_id,
+            "reason": reason,
+            "finished": finished,
+            "started_at": recording.started_at,
+            "elapsed_s": round(time.monotonic() - recording.started_monotonic, 3),
+            "start_rss_bytes": recording.start_rss,
+            "peak_rss_bytes": recording.peak_rss,
+            "timeline": list(recording.records),
+        }
+        if self._sampler is not None:
+            dump["top_stacks"] = self._sampler.top_stacks(since=recording.started_monotonic)
+        if tracemalloc.is_tracing():
+            dump["top_allocations"] = [
+                {"where": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[:20]
+            ]
+
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f"{session_id}-{int(time.time())}{'' if finished else '-running'}.json")
+            with open(path, "w", encoding="utf-8") as dump_file:
+                json.dump(dump, dump_file, indent=2, default=str)
+        except OSError as e:
+            logger.error(f"[FlightRecorder] Could not write dump for session {session_id[:8]}: {e}")
+            return None
+        self.dumps += 1
+        logger.warning(f"[FlightRecorder] Session {session_id[:8]} over threshold ({reason}); timeline written to {path}.")
+        return path
+
+
+# Shared by the orchestrator and the tool callbacks in this process
+flight_recorder = FlightRecorder()
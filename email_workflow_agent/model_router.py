@@ -0,0 +1,254 @@
+# email-agent-workflow/email_workflow_agent/model_router.py
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional
+
+from pydantic import PrivateAttr
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+from .deadlines import check_deadline
+from .rate_limiter import RATE_LIMIT_MAX_RETRIES, is_rate_limited, model_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# --- Model Tiers ---
+# Every agent used to hardcode "gemini-2.0-flash". Steps now name a tier via
+# the routing rules below, and each tier maps to a concrete model here.
+MODEL_TIERS = {
+    "fast": os.getenv("MODEL_TIER_FAST", "gemini-2.0-flash-lite"),
+    "standard": os.getenv("MODEL_TIER_STANDARD", "gemini-2.0-flash"),
+    "large": os.getenv("MODEL_TIER_LARGE", "gemini-2.5-pro"),
+}
+DEFAULT_TIER = "standard"
+
+# Max concurrent requests per model, so a burst of long translations on the
+# large model can't starve the cheap classification calls (and vice versa).
+TIER_CONCURRENCY = {
+    "fast": int(os.getenv("MODEL_CONCURRENCY_FAST", "16")),
+    "standard": int(os.getenv("MODEL_CONCURRENCY_STANDARD", "8")),
+    "large": int(os.getenv("MODEL_CONCURRENCY_LARGE", "2")),
+}
+DEFAULT_CONCURRENCY = 4
+
+# State key where a step can leave its confidence (0.0-1.0) for the next step
+STEP_CONFIDENCE_KEY = "step_confidence"
+
+
+@dataclass
+class RoutingRule:
+    """
+    One routing rule. A rule matches when every condition it sets holds;
+    the first matching rule wins.
+
+    step_kinds: step kinds the rule applies to (None = any step)
+    min_input_chars / max_input_chars: bounds on the request's input size
+    below_confidence: matches only if the prior step's confidence is below this
+    tier: tier (key of MODEL_TIERS) or concrete model name to use
+    """
+    tier: str
+    step_kinds: Optional[List[str]] = None
+    min_input_chars: Optional[int] = None
+    max_input_chars: Optional[int] = None
+    below_confidence: Optional[float] = None
+
+    def matches(self, step_kind: str, input_chars: int, confidence: Optional[float]) -> bool:
+        if self.step_kinds is not None and step_kind not in self.step_kinds:
+            return False
+        if self.min_input_chars is not None and input_chars < self.min_input_chars:
+            return False
+        if self.max_input_chars is not None and input_chars > self.max_input_chars:
+            return False
+        if self.below_confidence is not None and (confidence is None or confidence >= self.below_confidence):
+            return False
+        return True
+
+
+# Default rules: trivial steps go to the fast tier, long translations and
+# low-confidence reviews to the large one, everything else to standard.
+DEFAULT_ROUTING_RULES = [
+    RoutingRule(tier="fast", step_kinds=["classify", "reply", "tool_call"]),
+    RoutingRule(tier="large", step_kinds=["translate"], min_input_chars=20000),
+    RoutingRule(tier="large", step_kinds=["quality_check", "review", "edit"], below_confidence=0.7),
+    RoutingRule(tier="fast", step_kinds=["quality_check"], max_input_chars=2000),
+    RoutingRule(tier="standard"),
+]
+
+
+def load_routing_rules(path: Optional[str] = os.getenv("MODEL_ROUTING_RULES")) -> List[RoutingRule]:
+    """Loads routing rules from a JSON file (a list of RoutingRule fields), or the defaults."""
+    if not path:
+        return list(DEFAULT_ROUTING_RULES)
+    with open(path, "r", encoding="utf-8") as f:
+        return [RoutingRule(**rule) for rule in json.load(f)]
+
+
+# Rough characters per token, for charging requests against the tokens-per-minute quota
+CHARS_PER_TOKEN = 4
+
+
+def request_input_chars(llm_request: LlmRequest) -> int:
+    """Counts the text characters a request sends to the model."""
+    total = 0
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                total += len(part.text)
+            elif part.function_call and part.function_call.args:
+                total += len(json.dumps(part.function_call.args, default=str))
+            elif part.function_response and part.function_response.response:
+                total += len(json.dumps(part.function_response.response, default=str))
+    return total
+
+
+class _LatencyStats:
+    """Rolling latency window for one model."""
+
+    def __init__(self, window: int = 512):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {"calls": self.calls, "errors": self.errors, "p50_s": percentile(0.50), "p95_s": percentile(0.95), "max_s": ordered[-1] if ordered else 0.0}
+
+
+class ModelRouter:
+    """
+    Chooses the model for each LLM step and runs calls through per-model
+    concurrency pools with latency tracking.
+
+    Agents get two pieces from the router:
+    - `llm_for(step_kind)`: the agent's model, a RoutedLlm that calls whichever
+      model the request was routed to inside that model's pool.
+    - `callback_for(step_kind)`: a before_model_callback that applies the
+      routing rules (step kind, input size, prior-step confidence).
+    """
+
+    def __init__(self, rules: Optional[List[RoutingRule]] = None, tiers: Optional[Dict[str, str]] = None):
+        self.rules = rules if rules is not None else load_routing_rules()
+        self.tiers = dict(tiers if tiers is not None else MODEL_TIERS)
+        self._pools: Dict[str, asyncio.Semaphore] = {}
+        self._latency: Dict[str, _LatencyStats] = {}
+        self._llms: Dict[str, BaseLlm] = {}
+        self.route_counts: Dict[str, int] = {}
+
+    # --- Routing ---
+
+    def _match(self, step_kind: str, input_chars: int, confidence: Optional[float]) -> str:
+        for rule in self.rules:
+            if rule.matches(step_kind, input_chars, confidence):
+                return self.tiers.get(rule.tier, rule.tier)
+        return self.tiers[DEFAULT_TIER]
+
+    def choose(self, step_kind: str, input_chars: int = 0, confidence: Optional[float] = None) -> str:
+        """Returns the model name for a step according to the routing rules."""
+        model = self._match(step_kind, input_chars, confidence)
+        route = f"{step_kind}->{model}"
+        self.route_counts[route] = self.route_counts.get(route, 0) + 1
+        return model
+
+    def llm_for(self, step_kind: str) -> "RoutedLlm":
+        # The agent's default model; each request is re-routed by callback_for()
+        llm = RoutedLlm(model=self._match(step_kind, 0, None), step_kind=step_kind)
+        llm._router = self
+        return llm
+
+    def callback_for(self, step_kind: str) -> Callable:
+        async def route_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+            confidence = callback_context.state.get(STEP_CONFIDENCE_KEY)
+            input_chars = request_input_chars(llm_request)
+            llm_request.model = self.choose(step_kind, input_chars, confidence)
+            logger.debug(f"[ModelRouter] {callback_context.agent_name} ({step_kind}, {input_chars} chars, confidence {confidence}) -> {llm_request.model}")
+            return None # Continue with the (re-routed) model call
+        return route_model
+
+    # --- Pools and Latency ---
+
+    def _tier_of(self, model: str) -> Optional[str]:
+        for tier, tier_model in self.tiers.items():
+            if tier_model == model:
+                return tier
+        return None
+
+    def pool(self, model: str) -> asyncio.Semaphore:
+        if model not in self._pools:
+            self._pools[model] = asyncio.Semaphore(TIER_CONCURRENCY.get(self._tier_of(model), DEFAULT_CONCURRENCY))
+        return self._pools[model]
+
+    def latency(self, model: str) -> _LatencyStats:
+        if model not in self._latency:
+            self._latency[model] = _LatencyStats()
+        return self._latency[model]
+
+    def delegate(self, model: str) -> BaseLlm:
+        """The concrete LLM client for a model name (one per model, reused)."""
+        if model not in self._llms:
+            if model.startswith("stub-"):
+                # The offline stub registers itself with the LLM registry when imported
+                from . import stub_model  # noqa: F401
+            self._llms[model] = LLMRegistry.new_llm(model)
+        return self._llms[model]
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "routes": dict(self.route_counts),
+            "latency": {model: stats.snapshot() for model, stats in self._latency.items()},
+        }
+
+
+class RoutedLlm(BaseLlm):
+    """
+    LLM used as every routed agent's `model`. Calls the model chosen by the
+    router's before_model_callback (llm_request.model) within that model's
+    concurrency pool and the process-wide model rate limiter, and records
+    its latency. A 429 before any output is retried after a backoff.
+    """
+
+    step_kind: str = "default"
+    _router: Optional[ModelRouter] = PrivateAttr(default=None)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        router = self._router or model_router
+        model = llm_request.model or self.model
+        llm_request.model = model
+        stats = router.latency(model)
+
+        estimated_tokens = request_input_chars(llm_request) // CHARS_PER_TOKEN
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            check_deadline(f"model call to {model}") # A cancelled stage would throw the answer away
+            yielded = False
+            try:
+                async with router.pool(model), model_rate_limiter.permit(tokens=estimated_tokens):
+                    started = time.monotonic()
+                    stats.calls += 1
+                    try:
+                        async for response in router.delegate(model).generate_content_async(llm_request, stream=stream):
+                            yielded = True
+                            yield response
+                    except Exception:
+                        stats.errors += 1
+                        raise
+                    finally:
+                        stats.samples.append(time.monotonic() - started)
+                return
+            except Exception as e:
+                # Only retry if nothing was passed on yet; a partial stream can't be replayed
+                if yielded or not is_rate_limited(e) or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                await model_rate_limiter.backoff(attempt, e)
+
+
+# Shared by every agent in this process
+model_router = ModelRouter()
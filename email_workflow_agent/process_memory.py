@@ -0,0 +1,14 @@
+# email-agent-workflow/email_workflow_agent/process_memory.py
+import os
+from typing import Optional
+
+# No imports beyond the standard library: the tools' import chain reaches this module
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
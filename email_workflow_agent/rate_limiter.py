@@ -0,0 +1,210 @@
+# email-agent-workflow/email_workflow_agent/rate_limiter.py
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from .deadlines import DeadlineExceeded, remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+# Tenant the current workflow is running for (set by the orchestrator).
+# Context variables follow the task into every agent, tool and gather() child.
+current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar("current_tenant", default="default")
+
+
+class RateLimitedError(Exception):
+    """Raised by a backend (or the fake one) when it answers 429 / RESOURCE_EXHAUSTED."""
+
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for our own RateLimitedError and for 429 errors from the google-genai / HTTP clients."""
+    if isinstance(error, RateLimitedError):
+        return True
+    for attribute in ("code", "status_code", "status"):
+        if getattr(error, attribute, None) in (429, "RESOURCE_EXHAUSTED"):
+            return True
+    return False
+
+
+class TokenBucket:
+    """Refills `rate_per_second` units per second up to `capacity`; acquire() waits for enough units."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._available = capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(self.capacity, self._available + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Requests larger than the bucket would never fit; they wait for a full bucket instead
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock() # Created lazily so it binds to the running event loop
+        async with self._lock: # First come, first served
+            self._refill()
+            while self._available < amount:
+                await asyncio.sleep((amount - self._available) / self.rate_per_second)
+                self._refill()
+            self._available -= amount
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide limiter for one backend (e.g. the Gemini API or the translation API).
+
+    Each call takes one request from a requests-per-minute bucket and its
+    estimated tokens from a tokens-per-minute bucket, plus one request from
+    its tenant's bucket when the tenant has a quota. Concurrency is adjusted
+    AIMD-style: +1/limit after each fast success, halved on a 429, and cut
+    by 10% when latency goes above `latency_target_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        latency_target_seconds: float = 10.0,
+        tenant_requests_per_minute: Optional[Dict[str, float]] = None,
+        default_tenant_requests_per_minute: Optional[float] = None,
+    ):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6) if tokens_per_minute else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target_seconds = latency_target_seconds
+        self.tenant_requests_per_minute = dict(tenant_requests_per_minute or {})
+        self.default_tenant_requests_per_minute = default_tenant_requests_per_minute
+        self._tenant_buckets: Dict[str, TokenBucket] = {}
+        self._concurrency_limit = float(initial_concurrency)
+        self._inflight = 0
+        self._slot_freed: Optional[asyncio.Condition] = None
+        self.calls = 0
+        self.throttled = 0
+        self.slow = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(self.min_concurrency, int(self._concurrency_limit))
+
+    def _tenant_bucket(self, tenant: str) -> Optional[TokenBucket]:
+        requests_per_minute = self.tenant_requests_per_minute.get(tenant, self.default_tenant_requests_per_minute)
+        if not requests_per_minute:
+            return None
+        if tenant not in self._tenant_buckets:
+            self._tenant_buckets[tenant] = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))
+        return self._tenant_buckets[tenant]
+
+    @asynccontextmanager
+    async def permit(self, tokens: int = 0, tenant: Optional[str] = None) -> AsyncIterator[None]:
+        """Waits for quota and a concurrency slot, then holds the slot for one backend call."""
+        tenant = tenant or current_tenant.get()
+        tenant_bucket = self._tenant_bucket(tenant)
+        if tenant_bucket is not None:
+            await tenant_bucket.acquire() # Per-tenant first, so one tenant can't drain the shared buckets
+        await self.request_bucket.acquire()
+        if self.token_bucket is not None and tokens:
+            await self.token_bucket.acquire(tokens)
+
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(lambda: self._inflight < self.concurrency_limit)
+            self._inflight += 1
+
+        started = time.monotonic()
+        self.calls += 1
+        try:
+            yield
+        except BaseException as e:
+            if is_rate_limited(e):
+                self.throttled += 1
+                self._decrease(0.5)
+                logger.warning(f"[RateLimiter:{self.name}] Throttled; concurrency limit now {self.concurrency_limit}.")
+            raise
+        else:
+            if time.monotonic() - started > self.latency_target_seconds:
+                self.slow += 1
+                self._decrease(0.9)
+            else:
+                self._concurrency_limit = min(self.max_concurrency, self._concurrency_limit + 1 / self._concurrency_limit)
+        finally:
+            async with self._slot_freed:
+                self._inflight -= 1
+                self._slot_freed.notify_all()
+
+    def _decrease(self, factor: float) -> None:
+        self._concurrency_limit = max(float(self.min_concurrency), self._concurrency_limit * factor)
+
+    async def backoff(self, attempt: int, error: BaseException) -> None:
+        """
+        Sleeps before retrying a throttled call: the backend's retry-after, else exponential.
+        Raises DeadlineExceeded instead if the retry would start after the current deadline.
+        """
+        retry_after = getattr(error, "retry_after", None)
+        delay = retry_after if retry_after else min(30.0, 0.5 * 2 ** attempt)
+        remaining = remaining_seconds()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded(f"{self.name} retry in {delay:.1f}s would miss the deadline ({remaining:.1f}s left)") from error
+        await asyncio.sleep(delay)
+
+    def metrics_snapshot(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "slow": self.slow,
+            "concurrency_limit": self.concurrency_limit,
+            "inflight": self._inflight,
+        }
+
+
+# Retries after a 429 before the error is passed on
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4"))
+
+
+def _tenant_quotas(env_name: str) -> Dict[str, float]:
+    # Format: "tenant=requests_per_minute,tenant2=..."
+    quotas = {}
+    for item in filter(None, os.getenv(env_name, "").split(",")):
+        tenant, _, requests_per_minute = item.partition("=")
+        quotas[tenant.strip()] = float(requests_per_minute)
+    return quotas
+
+
+# Shared by every LlmAgent (through RoutedLlm) in this process
+model_rate_limiter = AdaptiveRateLimiter(
+    "model",
+    requests_per_minute=float(os.getenv("MODEL_REQUESTS_PER_MINUTE", "60")),
+    tokens_per_minute=float(os.getenv("MODEL_TOKENS_PER_MINUTE", "1000000")),
+    max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", "16")),
+    latency_target_seconds=float(os.getenv("MODEL_LATENCY_TARGET_SECONDS", "20")),
+    tenant_requests_per_minute=_tenant_quotas("MODEL_TENANT_REQUESTS_PER_MINUTE"),
+)
+
+# Shared by the translation and quality-check backends in this process
+translation_rate_limiter = AdaptiveRateLimiter(
+    "translation",
+    requests_per_minute=float(os.getenv("TRANSLATION_REQUESTS_PER_MINUTE", "300")),
+    tokens_per_minute=float(os.getenv("TRANSLATION_CHARS_PER_MINUTE", "2000000")),
+    max_concurrency=int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "8")),
+    latency_target_seconds=float(os.getenv("TRANSLATION_LATENCY_TARGET_SECONDS", "10")),
+    tenant_requests_per_minute=_tenant_quotas("TRANSLATION_TENANT_REQUESTS_PER_MINUTE"),
+)
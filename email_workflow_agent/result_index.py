@@ -0,0 +1,124 @@
+# email-agent-workflow/email_workflow_agent/result_index.py
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever a change to the agents, tools or prompts would make
+# previously produced documents stale. Old entries then simply stop matching.
+PIPELINE_VERSION = "1"
+
+# Key type: (attachment content hash, email_type, target language, pipeline version)
+ResultKey = Tuple[str, str, str, str]
+
+
+def hash_attachment_bytes(data: bytes) -> str:
+    """Returns the content hash used to identify identical attachment bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def combine_attachment_hashes(attachment_hashes: Dict[str, str]) -> Optional[str]:
+    """
+    Combines the per-file hashes of an email into one content hash.
+    Filenames are ignored on purpose: the same bytes sent under another
+    name are still the same job. Returns None if there are no hashes.
+    """
+    if not attachment_hashes:
+        return None
+    if len(attachment_hashes) == 1:
+        return next(iter(attachment_hashes.values()))
+    digest = hashlib.sha256()
+    for content_hash in sorted(attachment_hashes.values()):
+        digest.update(content_hash.encode("ascii"))
+    return digest.hexdigest()
+
+
+class ResultIndex:
+    """
+    Process-wide index of finished workflow outputs, keyed by
+    (attachment content hash, email_type, target language, pipeline version).
+
+    Entries only reference the output artifact (app, user, session, filename,
+    version); the bytes stay in the ArtifactService. Concurrent duplicates are
+    coalesced: the first caller of `acquire` for a key owns the computation,
+    later callers wait for it to `publish` or `release` the key.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: Dict[ResultKey, Dict[str, Any]] = {}
+        self._inflight: Dict[ResultKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(content_hash: str, email_type: str, target_language: Optional[str]) -> ResultKey:
+        return (content_hash, email_type, (target_language or "").lower(), PIPELINE_VERSION)
+
+    def get(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    async def acquire(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached entry for `key`, waiting for an in-flight computation
+        of the same key if there is one. Returns None if the caller now owns the
+        computation and must call `publish` or `release` when done.
+        """
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                self.misses += 1
+                self._inflight[key] = asyncio.get_running_loop().create_future()
+                return None
+
+            # Another session is computing the same result; wait for it.
+            # shield() so a cancelled waiter does not cancel the shared future.
+            self.coalesced += 1
+            logger.info(f"[ResultIndex] Waiting on in-flight computation for {key[0][:12]}.")
+            await asyncio.shield(pending)
+            # Loop: either the entry was published, or the owner failed and
+            # one of the waiters takes over the computation.
+
+    def publish(self, key: ResultKey, entry: Dict[str, Any]) -> None:
+        """Stores a finished result and wakes any waiters."""
+        if len(self._entries) >= self.max_entries and key not in self._entries:
+            # Drop the oldest entry (dicts keep insertion order).
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = entry
+        self._wake(key)
+        logger.info(f"[ResultIndex] Published result for {key[0][:12]} ({key[1]}, {key[2] or '-'}).")
+
+    def release(self, key: ResultKey) -> None:
+        """Gives up ownership of `key` without a result (e.g. the branch failed)."""
+        self._wake(key)
+
+    def invalidate(self, key: ResultKey) -> None:
+        """Removes an entry whose artifact can no longer be loaded."""
+        self._entries.pop(key, None)
+
+    def invalidate_session(self, app_name: str, user_id: str, session_id: str) -> List[ResultKey]:
+        """Removes every entry whose output artifact lives in the given session."""
+        stale = [
+            key for key, entry in self._entries.items()
+            if (entry.get("app_name"), entry.get("user_id"), entry.get("session_id")) == (app_name, user_id, session_id)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return stale
+
+    def _wake(self, key: ResultKey) -> None:
+        pending = self._inflight.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+
+# Shared by every orchestrator run in this process
+result_index = ResultIndex()
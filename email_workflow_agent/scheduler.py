@@ -0,0 +1,244 @@
+# email-agent-workflow/email_workflow_agent/scheduler.py
+import asyncio
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Rough extracted-characters-per-byte ratios used when the text has not been
+# extracted yet. DOCX is zipped XML, PDFs carry fonts and images.
+CHARS_PER_BYTE = {
+    ".docx": 0.6,
+    ".pdf": 0.1,
+    ".txt": 1.0,
+}
+DEFAULT_CHARS_PER_BYTE = 0.5
+
+# Lower rank is scheduled first under the "sla" policy
+SLA_CLASS_RANK = {"urgent": 0, "standard": 1, "bulk": 2}
+
+# Upper bounds (in characters) of the size buckets used for metrics
+SIZE_BUCKETS = [("xs", 10_000), ("s", 100_000), ("m", 1_000_000), ("l", 10_000_000)]
+LARGEST_BUCKET = "xl"
+
+
+class SchedulerOverloaded(Exception):
+    """Raised for a job that was shed because the queue is over budget."""
+
+
+def size_bucket(chars: int) -> str:
+    for bucket, upper_bound in SIZE_BUCKETS:
+        if chars < upper_bound:
+            return bucket
+    return LARGEST_BUCKET
+
+
+def estimate_attachment_chars(attachment: Any) -> int:
+    """
+    Estimates the extracted character count of one attachment.
+
+    Accepts the same shapes main.py passes as `initial_attachments`: a filename
+    or path, or a dict with "filename" and optionally "bytes", "size" or an
+    already known "extracted_char_count".
+    """
+    if isinstance(attachment, dict):
+        if attachment.get("extracted_char_count") is not None:
+            return int(attachment["extracted_char_count"])
+        filename = attachment.get("filename", "")
+        if attachment.get("bytes") is not None:
+            size = len(attachment["bytes"])
+        else:
+            size = int(attachment.get("size") or 0)
+    else:
+        filename = str(attachment)
+        size = os.path.getsize(filename) if os.path.isfile(filename) else 0
+
+    ratio = CHARS_PER_BYTE.get(os.path.splitext(filename)[1].lower(), DEFAULT_CHARS_PER_BYTE)
+    return int(size * ratio)
+
+
+def estimate_job_chars(body: str, attachments: List[Any]) -> int:
+    """Estimated characters a workflow will push through the models."""
+    return len(body or "") + sum(estimate_attachment_chars(a) for a in attachments or [])
+
+
+@dataclass
+class _Job:
+    seq: int
+    cost_chars: int
+    sla_class: str
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    deferred: bool = False
+
+    @property
+    def bucket(self) -> str:
+        return size_bucket(self.cost_chars)
+
+
+class WorkflowScheduler:
+    """
+    Size-aware scheduler in front of the workflow runner.
+
+    Jobs are ordered by shortest expected job ("sjf") or by SLA class ("sla"),
+    with waiting jobs aged so large documents and bulk jobs are not starved
+    forever. Admission control caps the total estimated characters in flight:
+    jobs that don't fit are deferred, and once the queue itself is over budget
+    the largest queued job of the lowest SLA class is shed. When the job at the
+    head of the queue doesn't fit, nothing behind it is admitted until it has
+    started, so the capacity it waits for isn't taken by a stream of small jobs.
+    """
+
+    def __init__(
+        self,
+        run_workflow: Callable[..., Awaitable[Any]],
+        policy: str = os.getenv("SCHEDULER_POLICY", "sjf"),
+        max_inflight_chars: int = int(os.getenv("SCHEDULER_MAX_INFLIGHT_CHARS", "2000000")),
+        max_queued_chars: int = int(os.getenv("SCHEDULER_MAX_QUEUED_CHARS", "20000000")),
+        max_concurrency: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "8")),
+        aging_chars_per_second: float = 5000.0,
+        sla_promotion_seconds: float = 60.0,
+    ):
+        if policy not in ("sjf", "sla"):
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.run_workflow = run_workflow
+        self.policy = policy
+        self.max_inflight_chars = max_inflight_chars
+        self.max_queued_chars = max_queued_chars
+        self.max_concurrency = max_concurrency
+        self.aging_chars_per_second = aging_chars_per_second
+        self.sla_promotion_seconds = sla_promotion_seconds # Waiting this long counts as one SLA class higher
+
+        self._queue: List[_Job] = []
+        self._running: Dict[int, _Job] = {}
+        self._inflight_chars = 0
+        self._seq = itertools.count()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._tasks = set() # Keep references so running jobs aren't garbage collected
+
+    # --- Submission ---
+
+    def submit(self, sender_email: str, subject: str, body: str, attachments: list, sla_class: str = "standard", **workflow_kwargs) -> asyncio.Future:
+        """
+        Queues one email for the workflow. Returns a future resolved with the
+        workflow's result, or failed with SchedulerOverloaded if it was shed.
+        Extra keyword arguments are passed through to the workflow unchanged.
+        """
+        cost_chars = estimate_job_chars(body, attachments)
+        job = _Job(
+            seq=next(self._seq),
+            cost_chars=cost_chars,
+            sla_class=sla_class if sla_class in SLA_CLASS_RANK else "standard",
+            kwargs={"sender_email": sender_email, "subject": subject, "body": body, "attachments": attachments, **workflow_kwargs},
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._queue.append(job)
+        logger.info(f"[Scheduler] Queued job {job.seq} ({cost_chars} est. chars, bucket {job.bucket}, {job.sla_class}).")
+
+        self._shed_if_over_budget()
+        self._dispatch()
+        return job.future
+
+    # --- Scheduling ---
+
+    def _priority(self, job: _Job, now: float) -> tuple:
+        waited = now - job.enqueued_at
+        if self.policy == "sla":
+            return (SLA_CLASS_RANK[job.sla_class] - waited / self.sla_promotion_seconds, job.seq)
+        return (job.cost_chars - self.aging_chars_per_second * waited, job.seq)
+
+    def _shed_if_over_budget(self) -> None:
+        queued_chars = sum(job.cost_chars for job in self._queue)
+        while queued_chars > self.max_queued_chars and len(self._queue) > 1:
+            victim = max(self._queue, key=lambda job: (SLA_CLASS_RANK[job.sla_class], job.cost_chars))
+            self._queue.remove(victim)
+            queued_chars -= victim.cost_chars
+            self._bucket_metrics(victim.bucket)["shed"] += 1
+            logger.warning(f"[Scheduler] Queue over budget; shedding job {victim.seq} ({victim.cost_chars} est. chars).")
+            victim.future.set_exception(SchedulerOverloaded(f"Job {victim.seq} shed: queue over {self.max_queued_chars} chars."))
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        for job in sorted(self._queue, key=lambda job: self._priority(job, now)):
+            if len(self._running) >= self.max_concurrency:
+                break
+            fits = self._inflight_chars + job.cost_chars <= self.max_inflight_chars
+            # A job larger than the whole budget may only run alone
+            if not fits and not (job.cost_chars > self.max_inflight_chars and not self._running):
+                if not job.deferred:
+                    job.deferred = True
+                    self._bucket_metrics(job.bucket)["deferred"] += 1
+                # Reserve the capacity for the head job: admit nothing else until it has started
+                break
+            self._queue.remove(job)
+            self._start(job, now)
+
+    def _start(self, job: _Job, now: float) -> None:
+        self._running[job.seq] = job
+        self._inflight_chars += job.cost_chars
+        metrics = self._bucket_metrics(job.bucket)
+        queue_wait = now - job.enqueued_at
+        metrics["started"] += 1
+        metrics["queue_wait_total_s"] += queue_wait
+        metrics["queue_wait_max_s"] = max(metrics["queue_wait_max_s"], queue_wait)
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job) -> None:
+        started = time.monotonic()
+        try:
+            result = await self.run_workflow(**job.kwargs)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            service_time = time.monotonic() - started
+            metrics = self._bucket_metrics(job.bucket)
+            metrics["completed"] += 1
+            metrics["service_total_s"] += service_time
+            metrics["service_max_s"] = max(metrics["service_max_s"], service_time)
+            self._running.pop(job.seq, None)
+            self._inflight_chars -= job.cost_chars
+            self._dispatch()
+
+    # --- Metrics ---
+
+    def _bucket_metrics(self, bucket: str) -> Dict[str, float]:
+        if bucket not in self._metrics:
+            self._metrics[bucket] = {
+                "started": 0, "completed": 0, "deferred": 0, "shed": 0,
+                "queue_wait_total_s": 0.0, "queue_wait_max_s": 0.0,
+                "service_total_s": 0.0, "service_max_s": 0.0,
+            }
+        return self._metrics[bucket]
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Queue-wait and service-time metrics per size bucket, plus current load."""
+        buckets = {}
+        for bucket, metrics in self._metrics.items():
+            snapshot = dict(metrics)
+            snapshot["queue_wait_avg_s"] = metrics["queue_wait_total_s"] / metrics["started"] if metrics["started"] else 0.0
+            snapshot["service_avg_s"] = metrics["service_total_s"] / metrics["completed"] if metrics["completed"] else 0.0
+            buckets[bucket] = snapshot
+        return {
+            "policy": self.policy,
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "inflight_chars": self._inflight_chars,
+            "buckets": buckets,
+        }
+
+    async def drain(self) -> None:
+        """Waits until every queued and running job has finished."""
+        while self._queue or self._running:
+            pending = [job.future for job in list(self._running.values()) + self._queue]
+            await asyncio.wait(pending)
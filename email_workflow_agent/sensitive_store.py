@@ -0,0 +1,140 @@
+# email-agent-workflow/email_workflow_agent/sensitive_store.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the sessions' sensitive values, kept apart from the
+# checkpoint and session databases so those can be shared more widely
+SENSITIVE_VAULT_DB_PATH = os.getenv("SENSITIVE_VAULT_DB", "sensitive_vault.db")
+# Fernet key (cryptography.fernet.Fernet.generate_key()) shared by every worker.
+# Without it, values are kept in process memory only and a resumed session
+# can't restore its placeholders (the tool call fails instead).
+SENSITIVE_VAULT_KEY = os.getenv("SENSITIVE_VAULT_KEY")
+
+
+class SensitiveValueStore:
+    """
+    Durable, encrypted copy of each session's sensitive data vault
+    (placeholder -> value), so a resumed or redelivered session can still
+    restore its placeholders.
+
+    Values are encrypted with Fernet under `key` before they are written;
+    placeholders, which give nothing away, are stored as they are. Every
+    save refreshes the session's `last_used_at`, and delete_expired()
+    drops the sessions nobody has used for a while, including those of a
+    worker that died before it could clean up.
+    """
+
+    def __init__(self, db_path: str = SENSITIVE_VAULT_DB_PATH, key: Optional[str] = SENSITIVE_VAULT_KEY):
+        self.db_path = db_path
+        self._key = key
+        self._fernet = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled_reason: Optional[str] = None if key else "SENSITIVE_VAULT_KEY is not set"
+
+    @property
+    def enabled(self) -> bool:
+        """False if there is no key (or no cryptography library): nothing is stored then."""
+        self._cipher()
+        return self._disabled_reason is None
+
+    def _cipher(self):
+        # Loaded on first use, like the database, so importing the package stays light
+        if self._fernet is None and self._disabled_reason is None:
+            try:
+                from cryptography.fernet import Fernet # Requires cryptography
+                self._fernet = Fernet(self._key)
+            except ImportError:
+                self._disabled_reason = "the cryptography library is not installed"
+            except ValueError as e:
+                self._disabled_reason = f"SENSITIVE_VAULT_KEY is not a valid Fernet key ({e})"
+            if self._disabled_reason is not None:
+                logger.warning(f"[SensitiveStore] Sensitive values are not persisted: {self._disabled_reason}.")
+        return self._fernet
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sensitive_values (
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    placeholder TEXT NOT NULL,
+                    encrypted_value BLOB NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id, placeholder)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sensitive_values_last_used ON sensitive_values (last_used_at)")
+            self._conn = conn
+        return self._conn
+
+    def record_sensitive_values(self, app_name: str, user_id: str, session_id: str, values: Dict[str, str]) -> None:
+        """Adds placeholder -> value pairs to a session's stored vault and marks the session as used."""
+        fernet = self._cipher()
+        if fernet is None:
+            return
+        now = time.time()
+        rows = [
+            (app_name, user_id, session_id, placeholder, fernet.encrypt(value.encode("utf-8")), now)
+            for placeholder, value in values.items()
+        ]
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany("INSERT OR REPLACE INTO sensitive_values VALUES (?, ?, ?, ?, ?, ?)", rows)
+            db.execute(
+                "UPDATE sensitive_values SET last_used_at = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (now, app_name, user_id, session_id),
+            )
+            db.execute("COMMIT")
+
+    def load_sensitive_values(self, app_name: str, user_id: str, session_id: str) -> Dict[str, str]:
+        """Returns a session's stored vault as {placeholder: value}."""
+        fernet = self._cipher()
+        if fernet is None:
+            return {}
+        from cryptography.fernet import InvalidToken
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT placeholder, encrypted_value FROM sensitive_values WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            ).fetchall()
+        values = {}
+        for placeholder, encrypted_value in rows:
+            try:
+                values[placeholder] = fernet.decrypt(encrypted_value).decode("utf-8")
+            except InvalidToken:
+                # Stored under another key: the placeholder can't be restored, which restore() reports
+                logger.error(f"[SensitiveStore] Can't decrypt {placeholder} of session {session_id[:8]}; was SENSITIVE_VAULT_KEY changed?")
+        return values
+
+    def clear_sensitive_values(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Drops a session's stored vault once nothing will restore its placeholders again."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._db().execute(
+                "DELETE FROM sensitive_values WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            )
+
+    def delete_expired(self, ttl_seconds: float) -> int:
+        """Drops the vaults of sessions not used for `ttl_seconds`. Returns the number of values deleted."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            cursor = self._db().execute("DELETE FROM sensitive_values WHERE last_used_at < ?", (time.time() - ttl_seconds,))
+        return cursor.rowcount
+
+
+# Shared by the sensitive data vault of this process
+sensitive_value_store = SensitiveValueStore()
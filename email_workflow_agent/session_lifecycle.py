@@ -0,0 +1,258 @@
+# email-agent-workflow/email_workflow_agent/session_lifecycle.py
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+
+from .process_memory import current_rss_bytes
+from .result_index import result_index
+from .subagents.tools.attachment_handles import attachment_from_part, attachment_spool, handle_part
+from .subagents.tools.sensitive_vault import sensitive_vault
+
+logger = logging.getLogger(__name__)
+
+# Completed sessions (and their artifacts) are kept this long, then deleted or archived
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+# If set, sessions are written here (session JSON + artifact files) before deletion
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR")
+# Event parts larger than this are moved to the attachment spool before the event is stored
+EVENT_OFFLOAD_THRESHOLD_BYTES = int(os.getenv("EVENT_OFFLOAD_THRESHOLD_BYTES", str(64 * 1024)))
+# Above this resident set size, completed sessions are evicted before their TTL (0 disables)
+PROCESS_MEMORY_BUDGET_BYTES = int(os.getenv("PROCESS_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024
+
+OFFLOADED_PAYLOAD_PREFIX = "event_payloads/"
+JSON_MIME_TYPE = "application/json"
+
+# Key type: (user_id, session_id)
+SessionKey = Tuple[str, str]
+
+
+class EventOffloadingMixin:
+    """
+    Session service mixin that keeps large payloads out of stored events.
+
+    Function-call args, function responses and text parts above the
+    threshold are written to the attachment spool on disk, saved as a
+    session artifact holding only the spool handle (so not even an
+    in-memory artifact service keeps the payload), and replaced by a small
+    reference before the event is stored. The caller's event object is
+    left untouched (the tool still runs with the full args); the stored
+    copy is what later history and persistence see. state_delta is never
+    offloaded, since session state is rebuilt from it.
+    """
+
+    def __init__(self, *args, artifact_service=None, offload_threshold_bytes: int = EVENT_OFFLOAD_THRESHOLD_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offload_artifact_service = artifact_service
+        self.offload_threshold_bytes = offload_threshold_bytes
+        self.offloaded_payloads = 0
+        self.offloaded_bytes = 0
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if self.offload_artifact_service is not None and not event.partial and self._oversized_parts(event):
+            event = event.model_copy(deep=True)
+            await self._offload_parts(session, event)
+        return await super().append_event(session, event)
+
+    def _oversized_parts(self, event: Event) -> bool:
+        if not event.content or not event.content.parts:
+            return False
+        return any(payload_size > self.offload_threshold_bytes for _, _, payload_size in self._payloads(event))
+
+    @staticmethod
+    def _payloads(event: Event):
+        """Yields (part index, payload kind, size in bytes) for each offloadable part."""
+        for index, part in enumerate(event.content.parts):
+            if part.function_call and part.function_call.args:
+                yield index, "function_call", len(json.dumps(part.function_call.args, default=str))
+            elif part.function_response and part.function_response.response:
+                yield index, "function_response", len(json.dumps(part.function_response.response, default=str))
+            elif part.text:
+                yield index, "text", len(part.text)
+
+    async def _offload_parts(self, session: Session, event: Event) -> None:
+        for index, kind, payload_size in list(self._payloads(event)):
+            if payload_size <= self.offload_threshold_bytes:
+                continue
+            part = event.content.parts[index]
+            if kind == "function_call":
+                payload = json.dumps(part.function_call.args, default=str)
+            elif kind == "function_response":
+                payload = json.dumps(part.function_response.response, default=str)
+            else:
+                payload = json.dumps({"text": part.text})
+
+            filename = f"{OFFLOADED_PAYLOAD_PREFIX}{event.id}_{index}.json"
+            handle = await asyncio.to_thread(attachment_spool.write_chunks, [payload.encode("utf-8")], JSON_MIME_TYPE)
+            version = await self.offload_artifact_service.save_artifact(
+                app_name=session.app_name,
+                user_id=session.user_id,
+                session_id=session.id,
+                filename=filename,
+                artifact=handle_part(handle),
+            )
+            reference = {"offloaded_artifact": filename, "artifact_version": version, "bytes": payload_size}
+            if kind == "function_call":
+                part.function_call.args = reference
+            elif kind == "function_response":
+                part.function_response.response = reference
+            else:
+                part.text = f"[{payload_size} chars offloaded to artifact '{filename}' v{version}]"
+            self.offloaded_payloads += 1
+            self.offloaded_bytes += payload_size
+        logger.debug(f"[SessionLifecycle] Offloaded large parts of event {event.id} in session {session.id[:8]}.")
+
+
+class OffloadingInMemorySessionService(EventOffloadingMixin, InMemorySessionService):
+    pass
+
+
+def __getattr__(name: str):
+    # DatabaseSessionService needs sqlalchemy (the google-adk[db] extra), so it's
+    # only imported when a database-backed service is actually asked for
+    if name == "OffloadingDatabaseSessionService":
+        from google.adk.sessions import DatabaseSessionService
+
+        service_class = globals()[name] = type(name, (EventOffloadingMixin, DatabaseSessionService), {"__module__": __name__})
+        return service_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class SessionRetention:
+    """
+    Deletes (or archives, then deletes) completed sessions and their
+    artifacts once they are older than `ttl_seconds`.
+
+    When the process's resident memory exceeds `memory_budget_bytes`,
+    completed sessions are evicted early, oldest first, until roughly the
+    overshoot has been released. Sessions still running are never touched.
+    """
+
+    def __init__(
+        self,
+        session_service,
+        artifact_service,
+        app_name: str,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        memory_budget_bytes: int = PROCESS_MEMORY_BUDGET_BYTES,
+        archive_dir: Optional[str] = SESSION_ARCHIVE_DIR,
+    ):
+        self.session_service = session_service
+        self.artifact_service = artifact_service
+        self.app_name = app_name
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.archive_dir = archive_dir
+        # Completed sessions in completion order: key -> (completed_at, estimated bytes)
+        self._completed: "OrderedDict[SessionKey, Tuple[float, int]]" = OrderedDict()
+        self.expired = 0
+        self.evicted_for_memory = 0
+        self.archived = 0
+
+    async def mark_completed(self, user_id: str, session_id: str) -> None:
+        """Starts the retention clock for a session whose workflow has finished."""
+        session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        estimated_bytes = len(session.model_dump_json()) if session is not None else 0
+        self._completed[(user_id, session_id)] = (time.monotonic(), estimated_bytes)
+
+    async def sweep(self) -> int:
+        """Removes expired sessions, then more if over the memory budget. Returns how many were removed."""
+        removed = 0
+        now = time.monotonic()
+        while self._completed:
+            key, (completed_at, _) = next(iter(self._completed.items()))
+            if now - completed_at < self.ttl_seconds:
+                break
+            await self._remove(key)
+            self.expired += 1
+            removed += 1
+
+        rss = current_rss_bytes()
+        if self.memory_budget_bytes and rss is not None and rss > self.memory_budget_bytes:
+            to_release = rss - self.memory_budget_bytes
+            logger.warning(f"[SessionLifecycle] RSS {rss / 2**20:.0f} MiB over budget; evicting completed sessions early.")
+            while self._completed and to_release > 0:
+                key, (_, estimated_bytes) = next(iter(self._completed.items()))
+                await self._remove(key)
+                to_release -= estimated_bytes
+                self.evicted_for_memory += 1
+                removed += 1
+
+        # Spooled attachments are shared between sessions, so they expire on last use instead
+        await asyncio.to_thread(attachment_spool.sweep)
+        return removed
+
+    async def run_periodically(self, interval_seconds: float = 60.0) -> None:
+        """Background loop for long-running workers."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"[SessionLifecycle] Retention sweep failed: {e}")
+
+    async def _remove(self, key: SessionKey) -> None:
+        user_id, session_id = key
+        self._completed.pop(key, None)
+        if self.archive_dir:
+            await self._archive(user_id, session_id)
+
+        if self.artifact_service is not None:
+            for filename in await self.artifact_service.list_artifact_keys(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            ):
+                if filename.startswith("user:"):
+                    continue # User-scoped artifacts outlive the session
+                await self.artifact_service.delete_artifact(
+                    app_name=self.app_name, user_id=user_id, session_id=session_id, filename=filename
+                )
+        await self.session_service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+
+        # Nothing else may point at what was just deleted
+        result_index.invalidate_session(self.app_name, user_id, session_id)
+        sensitive_vault.evict_session(self.app_name, user_id, session_id)
+        logger.info(f"[SessionLifecycle] Removed session {session_id[:8]} and its artifacts.")
+
+    async def _archive(self, user_id: str, session_id: str) -> None:
+        session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            return
+        session_dir = os.path.join(self.archive_dir, self.app_name, user_id, session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        with open(os.path.join(session_dir, "session.json"), "w", encoding="utf-8") as session_file:
+            session_file.write(session.model_dump_json())
+
+        if self.artifact_service is not None:
+            for filename in await self.artifact_service.list_artifact_keys(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            ):
+                if filename.startswith("user:"):
+                    continue
+                artifact_part = await self.artifact_service.load_artifact(
+                    app_name=self.app_name, user_id=user_id, session_id=session_id, filename=filename
+                )
+                attachment = attachment_from_part(artifact_part)
+                if attachment is None:
+                    continue
+                artifact_path = os.path.join(session_dir, "artifacts", filename)
+                os.makedirs(os.path.dirname(artifact_path), exist_ok=True)
+                with open(artifact_path, "wb") as artifact_file:
+                    for chunk in attachment.iter_chunks(): # The file's content, not the handle, for spooled attachments
+                        artifact_file.write(chunk)
+        self.archived += 1
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "completed_sessions_held": len(self._completed),
+            "estimated_bytes_held": sum(estimated_bytes for _, estimated_bytes in self._completed.values()),
+            "expired": self.expired,
+            "evicted_for_memory": self.evicted_for_memory,
+            "archived": self.archived,
+            "rss_bytes": current_rss_bytes(),
+        }
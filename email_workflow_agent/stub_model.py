@@ -0,0 +1,89 @@
+# email-agent-workflow/email_workflow_agent/stub_model.py
+import asyncio
+import json
+import re
+from typing import AsyncGenerator, List
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from .fake_backend import fake_backend_from_env
+
+# Simulated latency per model tier: fixed overhead plus a per-1k-character cost.
+# Tier is taken from the model name, e.g. "stub-fast", "stub-large".
+STUB_LATENCY = {
+    "fast": (0.005, 0.001),
+    "standard": (0.020, 0.004),
+    "large": (0.080, 0.010),
+}
+
+# Set STUB_MODEL_FAKE_RPS (and STUB_MODEL_FAKE_CONCURRENCY) to make the stub answer 429s like a real quota
+_stub_quota = fake_backend_from_env("STUB_MODEL")
+
+
+class StubLlm(BaseLlm):
+    """
+    Offline stand-in for Gemini, used by the benchmarks and local runs.
+    Point the model tiers at it with e.g. MODEL_TIER_FAST=stub-fast.
+
+    Responds after a latency that scales with model tier and input size.
+    Classification prompts (single or batched) get a keyword-based answer
+    so the workflow can branch, chunk reviews flag untranslated paragraphs,
+    and everything else gets a short canned text.
+    """
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"stub-.*"]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        prompt = _request_text(llm_request)
+        if _stub_quota is not None:
+            await _stub_quota.call() # Raises RateLimitedError when over quota
+        overhead, per_kchar = STUB_LATENCY.get((llm_request.model or self.model).removeprefix("stub-"), STUB_LATENCY["standard"])
+        await asyncio.sleep(overhead + per_kchar * len(prompt) / 1000)
+
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=_stub_answer(llm_request, prompt))]))
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    texts = []
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                texts.append(part.text)
+    return "\n".join(texts)
+
+
+def classify_text(text: str) -> str:
+    """Keyword classification used by the stub for classifier prompts."""
+    lowered = text.lower()
+    if re.search(r"\breview\b|translation check", lowered):
+        return "review"
+    if re.search(r"\btranslat", lowered):
+        return "translation"
+    return "other"
+
+
+def _stub_answer(llm_request: LlmRequest, prompt: str) -> str:
+    system_instruction = ""
+    if llm_request.config and llm_request.config.system_instruction:
+        system_instruction = str(llm_request.config.system_instruction)
+    if "Email Batch Classifier" in system_instruction:
+        # Numbered emails in, {"labels": [...]} out
+        emails = re.split(r"^Email \d+:\n", prompt, flags=re.MULTILINE)[1:]
+        return json.dumps({"labels": [classify_text(email) for email in emails]})
+    if "Email Classifier" in system_instruction:
+        return classify_text(prompt)
+    if "Translation Chunk Reviewer" in system_instruction:
+        # Flags paragraphs left untranslated (translation identical to the original)
+        pairs = re.findall(r"^Paragraph (\d+):\nOriginal: (.*)\nTranslation: (.*)$", prompt, flags=re.MULTILINE)
+        return json.dumps({"edits": [
+            {"paragraph": int(index), "replacement": f"[needs translation] {translated}", "reason": "Paragraph was not translated."}
+            for index, original, translated in pairs if original.strip() and original == translated
+        ]})
+    return f"Stub response ({len(prompt)} chars in)."
+
+
+LLMRegistry.register(StubLlm)
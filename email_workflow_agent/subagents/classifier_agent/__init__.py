@@ -1,2 +1,3 @@
 # email-agent-workflow/email_workflow_agent/subagents/classifier_agent/__init__.py
-from .agent import classifier_agent
\ No newline at end of file
+from .agent import classifier_agent
+from .batcher import CLASSIFIER_BATCHING, classification_batcher
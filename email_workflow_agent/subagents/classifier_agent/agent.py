@@ -1,13 +1,12 @@
 # email-agent-workflow/email_workflow_agent/subagents/classifier_agent/agent.py
 from google.adk.agents import LlmAgent
-
-# Use a defined model constant or string
-GEMINI_MODEL = "gemini-2.0-flash"
+from ...model_router import model_router
 
 # Define the Email Classifier Agent
 classifier_agent = LlmAgent(
     name="EmailClassifierAgent",
-    model=GEMINI_MODEL,
+    model=model_router.llm_for("classify"), # Routed per request by the central model router
+    before_model_callback=model_router.callback_for("classify"),
     # Instruction to classify email type based on subject and body (read from state)
     instruction="""You are an Email Classifier AI.
     Your task is to determine the type of the email provided in the session state
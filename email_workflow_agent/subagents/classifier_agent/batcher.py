@@ -0,0 +1,156 @@
+# email-agent-workflow/email_workflow_agent/subagents/classifier_agent/batcher.py
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from ...model_router import ModelRouter, model_router
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_LABELS = ("translation", "review", "other")
+
+# Set CLASSIFIER_BATCHING=0 to classify each email with its own model call
+CLASSIFIER_BATCHING = os.getenv("CLASSIFIER_BATCHING", "1") == "1"
+# How long the first pending email waits for others to join its batch
+CLASSIFIER_BATCH_WINDOW_MS = float(os.getenv("CLASSIFIER_BATCH_WINDOW_MS", "5"))
+# A batch is sent as soon as it has this many emails
+CLASSIFIER_BATCH_MAX_SIZE = int(os.getenv("CLASSIFIER_BATCH_MAX_SIZE", "16"))
+
+# Same rules as the classifier agent's instruction, for several emails at once
+BATCH_INSTRUCTION = """You are an Email Batch Classifier AI.
+Your task is to determine the type of each numbered email based on its subject and body content.
+
+Classify each email into one of these types:
+- "translation" if the subject indicates a request for translation (e.g., "Translation Request", "Please translate").
+- "review" if the subject indicates a request for reviewing a translation (e.g., "Request for Review", "Translation Check").
+- "other" for any other type of email.
+
+Respond ONLY with JSON of the form {"labels": ["<type of email 1>", "<type of email 2>", ...]},
+with exactly one label per email, in order.
+"""
+
+
+@dataclass
+class _PendingEmail:
+    subject: str
+    body: str
+    future: asyncio.Future
+
+
+def format_batch_prompt(emails: List[_PendingEmail]) -> str:
+    return "\n\n".join(
+        f"Email {number}:\nSubject: {email.subject}\nBody: {email.body}"
+        for number, email in enumerate(emails, start=1)
+    )
+
+
+class ClassificationBatcher:
+    """
+    Collects the classification requests of concurrent emails and answers
+    them with one structured model call.
+
+    The first pending email opens a batch window of `window_ms`; the batch
+    is sent when the window closes or `max_batch_size` emails have joined,
+    whichever comes first. Each caller gets its own label back. If the model's
+    answer can't be matched to the emails, each email in that batch is
+    classified on its own instead.
+    """
+
+    def __init__(
+        self,
+        router: ModelRouter = model_router,
+        window_ms: float = CLASSIFIER_BATCH_WINDOW_MS,
+        max_batch_size: int = CLASSIFIER_BATCH_MAX_SIZE,
+    ):
+        self.router = router
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._llm = router.llm_for("classify")
+        self._pending: List[_PendingEmail] = []
+        self._window: Optional[asyncio.TimerHandle] = None
+        self._tasks = set() # Keep references so in-flight batches aren't garbage collected
+        self.model_calls = 0
+        self.emails = 0
+        self.fallbacks = 0
+
+    async def classify(self, subject: str, body: str) -> str:
+        """Returns "translation", "review" or "other" for one email."""
+        loop = asyncio.get_running_loop()
+        email = _PendingEmail(subject=subject or "", body=body or "", future=loop.create_future())
+        self._pending.append(email)
+        self.emails += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._window is None:
+            self._window = loop.call_later(self.window_ms / 1000, self._flush)
+        return await email.future
+
+    def _flush(self) -> None:
+        if self._window is not None:
+            self._window.cancel()
+            self._window = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._classify_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _classify_batch(self, batch: List[_PendingEmail]) -> None:
+        try:
+            labels = await self._call_model(batch)
+            if labels is None and len(batch) > 1:
+                # Answer didn't line up with the batch; fall back to one call per email
+                self.fallbacks += 1
+                labels = [((await self._call_model([email])) or ["other"])[0] for email in batch]
+            labels = labels or ["other"] * len(batch)
+            for email, label in zip(batch, labels):
+                if not email.future.done():
+                    email.future.set_result(label)
+        except Exception as e:
+            logger.error(f"[ClassificationBatcher] Batch of {len(batch)} failed: {e}")
+            for email in batch:
+                if not email.future.done():
+                    email.future.set_exception(e)
+
+    async def _call_model(self, batch: List[_PendingEmail]) -> Optional[List[str]]:
+        """One structured model call for the batch. Returns one label per email, or None."""
+        prompt = format_batch_prompt(batch)
+        llm_request = LlmRequest(
+            model=self.router.choose("classify", len(prompt), None),
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(system_instruction=BATCH_INSTRUCTION, response_mime_type="application/json"),
+        )
+        self.model_calls += 1
+        response_text = ""
+        async for response in self._llm.generate_content_async(llm_request):
+            if response.content and response.content.parts and not response.partial:
+                response_text += "".join(part.text or "" for part in response.content.parts)
+
+        try:
+            labels = json.loads(response_text).get("labels")
+        except (ValueError, AttributeError):
+            logger.warning(f"[ClassificationBatcher] Unparseable batch answer: {response_text[:200]!r}")
+            return None
+        if not isinstance(labels, list) or len(labels) != len(batch):
+            logger.warning(f"[ClassificationBatcher] Got {len(labels) if isinstance(labels, list) else 'no'} labels for {len(batch)} emails.")
+            return None
+        return [label if label in CLASSIFICATION_LABELS else "other" for label in (str(label).strip().lower() for label in labels)]
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            "emails": self.emails,
+            "model_calls": self.model_calls,
+            "emails_per_call": self.emails / self.model_calls if self.model_calls else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+
+# Shared by every session in this process, so concurrent emails land in the same batches
+classification_batcher = ClassificationBatcher()
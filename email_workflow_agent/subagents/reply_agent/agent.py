@@ -1,13 +1,12 @@
 # email-agent-workflow/email_workflow_agent/subagents/reply_agent/agent.py
 from google.adk.agents import LlmAgent
-
-# Use a defined model constant or string
-GEMINI_MODEL = "gemini-2.0-flash"
+from ...model_router import model_router
 
 # Define the Initial Reply Agent
 initial_reply_agent = LlmAgent(
     name="InitialReplyAgent",
-    model=GEMINI_MODEL,
+    model=model_router.llm_for("reply"), # Routed per request by the central model router
+    before_model_callback=model_router.callback_for("reply"),
     # Instruction to generate the initial reply based on sender and email type (read from state)
     instruction="""You are an Email Auto-Responder.
     Your task is to generate a standardized initial reply based on the email type.
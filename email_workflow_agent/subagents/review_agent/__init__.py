@@ -1,2 +1,2 @@
 # email-agent-workflow/email_workflow_agent/subagents/review_agent/__init__.py
-from .agent import review_workflow_agent
\ No newline at end of file
+from .agent import create_review_workflow_agent
\ No newline at end of file
@@ -1,29 +1,53 @@
 # email-agent-workflow/email_workflow_agent/subagents/review_agent/agent.py
-from google.adk.agents import SequentialAgent
-# Import specific tools used in this workflow branch
-from ..tools.tools import check_translation_tool, edit_word_doc_tool
+from google.adk.agents import LlmAgent, SequentialAgent
+from ...model_router import model_router
+from ..tools.callbacks import handle_sensitive_before, handle_sensitive_after
 
-# Define the Sequential Workflow for Review Requests
-review_workflow_agent = SequentialAgent(
-    name="ReviewWorkflowAgent",
-    # Order of sub-agents/tools is crucial in SequentialAgent
-    sub_agents=[
-        # LlmAgent to orchestrate quality check using the tool (similar to translation branch)
-        LlmAgent(
-            name="ReviewCheckOrchestrator",
-            model="gemini-2.0-flash", # Model for quality check interpretation
-            instruction="Use the check_translation_tool to identify necessary edits by comparing the extracted original text in state['extracted_text'] with the extracted translated text in state['translated_text'].",
-            tools=[check_translation_tool], # Provide the quality check tool
-            output_key="review_edit_instructions", # Save edit instructions to state
-        ),
-        # LlmAgent to orchestrate document editing using the tool
-        LlmAgent(
-            name="DocumentEditorOrchestrator",
-             model="gemini-2.0-flash", # Model for editing orchestration
-            instruction="Use the edit_word_doc_tool to apply the edit instructions from state['review_edit_instructions'] to the document artifact from state['attachment_artifacts'].", # Note: Needs clearer way to reference original doc artifact
-            tools=[edit_word_doc_tool], # Provide the editing tool
-             output_key="edited_document_artifact", # Save final artifact name to state
-        ),
-    ],
-    description="Handles the process for translation review requests: checks translation, edits document.",
-)
\ No newline at end of file
+
+def create_review_workflow_agent() -> SequentialAgent:
+    """
+    Builds the Sequential Workflow for Review Requests.
+    Called by the orchestrator the first time the branch is needed, so
+    importing the package doesn't construct (or import the tools of) every branch.
+    """
+    # Import specific tools used in this workflow branch
+    from ..tools.tools import review_translation_tool, edit_word_doc_tool
+
+    return SequentialAgent(
+        name="ReviewWorkflowAgent",
+        # Order of sub-agents/tools is crucial in SequentialAgent
+        sub_agents=[
+            # LlmAgent to orchestrate the chunked review using the tool
+            # (the tool reviews chunks of paragraphs concurrently and writes state['review_edit_plan'])
+            LlmAgent(
+                name="ReviewCheckOrchestrator",
+                model=model_router.llm_for("review"), # Escalates when confidence is low
+                before_model_callback=model_router.callback_for("review"),
+                instruction="Use the review_translation_tool to identify necessary edits by comparing the extracted original text in state['extracted_text'] with the extracted translated text in state['translated_text']. Then summarize the planned edits in a few sentences.",
+                tools=[review_translation_tool], # Provide the review tool
+                before_tool_callback=handle_sensitive_before, # Masks sensitive data in both texts
+                after_tool_callback=handle_sensitive_after,   # Restores it in the summary and the edit plan
+                output_key="review_edit_instructions", # Save the summary of the edits to state
+            ),
+            # LlmAgent to orchestrate document editing using the tool
+            LlmAgent(
+                name="DocumentEditorOrchestrator",
+                model=model_router.llm_for("edit"), # Model for editing orchestration
+                before_model_callback=model_router.callback_for("edit"),
+                instruction="Use the edit_word_doc_tool to apply the planned edits to the translated document artifact in state['review_document_artifact'] (or, if that is not set, the first artifact in state['attachment_artifacts']), passing the summary in state['review_edit_instructions'] as edit_instructions. The tool reads the paragraph-addressed plan from state itself.",
+                tools=[edit_word_doc_tool], # Provide the editing tool
+                before_tool_callback=handle_sensitive_before,
+                after_tool_callback=handle_sensitive_after,
+                # No output_key: the tool writes state['edited_document_artifact'] itself
+            ),
+        ],
+        description="Handles the process for translation review requests: reviews the translation in parallel chunks, edits document.",
+    )
+
+
+def __getattr__(name: str):
+    # Keeps `from .agent import review_workflow_agent` working; built on first access
+    if name == "review_workflow_agent":
+        agent = globals()[name] = create_review_workflow_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,185 @@
+# email-agent-workflow/email_workflow_agent/subagents/review_agent/chunked_review.py
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from ...model_router import ModelRouter, model_router
+
+logger = logging.getLogger(__name__)
+
+# Characters of original plus translation reviewed by one model call
+REVIEW_CHUNK_CHARS = int(os.getenv("REVIEW_CHUNK_CHARS", "6000"))
+# Chunks of one document reviewed at the same time
+REVIEW_MAX_PARALLEL_CHUNKS = int(os.getenv("REVIEW_MAX_PARALLEL_CHUNKS", "4"))
+
+CHUNK_REVIEW_INSTRUCTION = """You are a Translation Chunk Reviewer AI.
+You get numbered paragraph pairs from a document: the original and its translation.
+Find translation errors: wrong meaning, omissions, additions, wrong terminology, untranslated text.
+Leave placeholders like __DATE_1__ exactly as they are.
+
+Respond ONLY with JSON of the form
+{"edits": [{"paragraph": <paragraph number>, "replacement": "<corrected translation of the whole paragraph>", "reason": "<short reason>"}]},
+with at most one edit per paragraph and only for paragraphs that need one. Respond {"edits": []} if nothing needs changing.
+"""
+
+# (paragraph index in the translation, original paragraph, translated paragraph)
+AlignedPair = Tuple[int, str, str]
+
+
+def align_segments(original_segments: List[str], translated_segments: List[str]) -> List[AlignedPair]:
+    """
+    Pairs each translated paragraph with its original, by position (the
+    translation keeps one paragraph per original paragraph). If the counts
+    differ, the extra paragraphs are paired with an empty string. Pairs
+    that are empty on both sides are left out.
+    """
+    pairs = []
+    for index in range(max(len(original_segments), len(translated_segments))):
+        original = original_segments[index] if index < len(original_segments) else ""
+        translated = translated_segments[index] if index < len(translated_segments) else ""
+        if original.strip() or translated.strip():
+            pairs.append((index, original, translated))
+    return pairs
+
+
+def chunk_pairs(pairs: List[AlignedPair], max_chars: int = REVIEW_CHUNK_CHARS) -> List[List[AlignedPair]]:
+    """Groups consecutive pairs into chunks of at most `max_chars` (a longer single pair gets its own chunk)."""
+    chunks: List[List[AlignedPair]] = []
+    current: List[AlignedPair] = []
+    current_chars = 0
+    for pair in pairs:
+        pair_chars = len(pair[1]) + len(pair[2])
+        if current and current_chars + pair_chars > max_chars:
+            chunks.append(current)
+            current, current_chars = [], 0
+        current.append(pair)
+        current_chars += pair_chars
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def format_chunk_prompt(chunk: List[AlignedPair]) -> str:
+    return "\n\n".join(
+        f"Paragraph {index}:\nOriginal: {original}\nTranslation: {translated}"
+        for index, original, translated in chunk
+    )
+
+
+def merge_edit_plans(chunk_plans: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merges per-chunk edits into one plan ordered by paragraph, one edit per paragraph."""
+    plan: Dict[int, Dict[str, Any]] = {}
+    for chunk_plan in chunk_plans:
+        for edit in chunk_plan:
+            plan.setdefault(edit["paragraph"], edit)
+    return [plan[paragraph] for paragraph in sorted(plan)]
+
+
+class ChunkedReviewer:
+    """
+    Map-reduce review of a translation: the aligned paragraph pairs are
+    split into chunks, each chunk is reviewed by its own model call (at
+    most `max_parallel` at a time per document), and the per-chunk edits
+    are merged into one paragraph-addressed edit plan.
+
+    Review time then grows with the chunk size rather than the document
+    length, as long as the model tier's pool has room for the chunks.
+    """
+
+    def __init__(
+        self,
+        router: ModelRouter = model_router,
+        chunk_chars: int = REVIEW_CHUNK_CHARS,
+        max_parallel: int = REVIEW_MAX_PARALLEL_CHUNKS,
+    ):
+        self.router = router
+        self.chunk_chars = chunk_chars
+        self.max_parallel = max_parallel
+        self._llm = router.llm_for("review")
+        self.documents = 0
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.edits = 0
+
+    async def review(self, pairs: List[AlignedPair], confidence: Optional[float] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Reviews the aligned pairs. Returns the merged edit plan and how many
+        chunks could not be reviewed (their paragraphs get no edits).
+        Each edit is {"paragraph", "current", "replacement", "reason"}.
+        """
+        chunks = chunk_pairs(pairs, self.chunk_chars)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def review_chunk(chunk: List[AlignedPair]) -> Optional[List[Dict[str, Any]]]:
+            async with semaphore:
+                try:
+                    return await self._review_chunk(chunk, confidence)
+                except Exception as e:
+                    logger.error(f"[ChunkedReviewer] Chunk of paragraphs {chunk[0][0]}-{chunk[-1][0]} failed: {e}")
+                    return None
+
+        chunk_plans = await asyncio.gather(*(review_chunk(chunk) for chunk in chunks))
+        failed = sum(1 for chunk_plan in chunk_plans if chunk_plan is None)
+        plan = merge_edit_plans([chunk_plan for chunk_plan in chunk_plans if chunk_plan])
+
+        self.documents += 1
+        self.chunks += len(chunks)
+        self.failed_chunks += failed
+        self.edits += len(plan)
+        logger.info(f"[ChunkedReviewer] Reviewed {len(pairs)} paragraphs in {len(chunks)} chunks: {len(plan)} edits, {failed} chunks failed.")
+        return plan, failed
+
+    async def _review_chunk(self, chunk: List[AlignedPair], confidence: Optional[float]) -> List[Dict[str, Any]]:
+        """One structured model call for a chunk. Edits for paragraphs outside the chunk are dropped."""
+        prompt = format_chunk_prompt(chunk)
+        llm_request = LlmRequest(
+            model=self.router.choose("review", len(prompt), confidence),
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(system_instruction=CHUNK_REVIEW_INSTRUCTION, response_mime_type="application/json"),
+        )
+        response_text = ""
+        async for response in self._llm.generate_content_async(llm_request):
+            if response.content and response.content.parts and not response.partial:
+                response_text += "".join(part.text or "" for part in response.content.parts)
+
+        try:
+            edits = json.loads(response_text).get("edits")
+        except (ValueError, AttributeError):
+            raise ValueError(f"Unparseable review answer: {response_text[:200]!r}")
+        if not isinstance(edits, list):
+            raise ValueError(f"Review answer has no edit list: {response_text[:200]!r}")
+
+        translations = {index: translated for index, _, translated in chunk}
+        chunk_plan = []
+        for edit in edits:
+            try:
+                paragraph = int(edit["paragraph"])
+                replacement = str(edit["replacement"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if paragraph not in translations or replacement == translations[paragraph]:
+                continue
+            chunk_plan.append({
+                "paragraph": paragraph,
+                "current": translations[paragraph], # Lets the editor check it is editing the text that was reviewed
+                "replacement": replacement,
+                "reason": str(edit.get("reason", "")),
+            })
+        return chunk_plan
+
+    def metrics_snapshot(self) -> dict:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "failed_chunks": self.failed_chunks,
+            "edits": self.edits,
+        }
+
+
+# Shared by every session in this process
+chunked_reviewer = ChunkedReviewer()
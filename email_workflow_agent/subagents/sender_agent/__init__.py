@@ -1,2 +1,2 @@
 # email-agent-workflow/email_workflow_agent/subagents/sender_agent/__init__.py
-from .agent import email_sender_agent
\ No newline at end of file
+from .agent import create_email_sender_agent
\ No newline at end of file
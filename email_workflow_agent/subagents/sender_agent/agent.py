@@ -1,28 +1,46 @@
 # email-agent-workflow/email_workflow_agent/subagents/sender_agent/agent.py
-from google.adk.agents import SequentialAgent
-# Import specific tools used in this workflow branch
-from ..tools.tools import send_email_tool
+from google.adk.agents import LlmAgent, SequentialAgent
+from ...model_router import model_router
 
-# Define the Sequential Workflow for Sending the Final Email
-email_sender_agent = SequentialAgent(
-    name="EmailSenderAgent",
-    # Order: Prepare data, then send
-    sub_agents=[
-        # Minimal LlmAgent to orchestrate email sending tool
-        LlmAgent(
-             name="SendEmailOrchestrator",
-             model="gemini-2.0-flash", # Minimal model
-             instruction="Use the send_email_tool to send the final email. Get recipient from state['email_sender_email'], body from state['initial_reply_text'], and attachment artifact from state['translated_document_artifact'] or state['edited_document_artifact'] depending on email type.", # Instruction needs refinement to pick correct artifact based on type
-             tools=[send_email_tool], # Provide the send email tool
-             # output_key=None, # Don't save sender result to state typically
-        ),
-        # You could add a final confirmation agent here if needed
-        LlmAgent(
-             name="CompletionConfirmer",
-             model="gemini-2.0-flash",
-             instruction="Confirm to the user that the workflow is complete and the email has been sent.",
-             # output_key=None,
-        )
-    ],
-    description="Sends the final email with the processed document.",
-)
\ No newline at end of file
+
+def create_email_sender_agent() -> SequentialAgent:
+    """
+    Builds the Sequential Workflow for Sending the Final Email.
+    Called by the orchestrator the first time the branch is needed, so
+    importing the package doesn't construct (or import the tools of) every branch.
+    """
+    # Import specific tools used in this workflow branch
+    from ..tools.tools import send_email_tool
+
+    return SequentialAgent(
+        name="EmailSenderAgent",
+        # Order: Prepare data, then send
+        sub_agents=[
+            # Minimal LlmAgent to orchestrate email sending tool
+            LlmAgent(
+                 name="SendEmailOrchestrator",
+                 model=model_router.llm_for("tool_call"), # Fast tier
+                 before_model_callback=model_router.callback_for("tool_call"),
+                 instruction="Use the send_email_tool to send the final email. Get recipient from state['email_sender_email'], body from state['initial_reply_text'], and attachment artifact from state['translated_document_artifact'] or state['edited_document_artifact'] depending on email type.", # Instruction needs refinement to pick correct artifact based on type
+                 tools=[send_email_tool], # Provide the send email tool
+                 # output_key=None, # Don't save sender result to state typically
+            ),
+            # You could add a final confirmation agent here if needed
+            LlmAgent(
+                 name="CompletionConfirmer",
+                 model=model_router.llm_for("reply"), # Fast tier
+                 before_model_callback=model_router.callback_for("reply"),
+                 instruction="Confirm to the user that the workflow is complete and the email has been sent.",
+                 # output_key=None,
+            )
+        ],
+        description="Sends the final email with the processed document.",
+    )
+
+
+def __getattr__(name: str):
+    # Keeps `from .agent import email_sender_agent` working; built on first access
+    if name == "email_sender_agent":
+        agent = globals()[name] = create_email_sender_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
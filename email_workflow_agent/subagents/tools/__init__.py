@@ -1,13 +1,28 @@
-      
 # email-agent-workflow/email_workflow_agent/tools/__init__.py
-from .tools import (
-    download_attachments_tool,
-    extract_text_tool,
-    translate_text_tool,
-    check_translation_tool,
-    convert_to_word_tool,
-    edit_word_doc_tool,
-    send_email_tool,
-)
-# Sensitive handling callbacks are assigned *within* tools.py
-# and imported/used there, not necessarily re-exported here.
+# The tools are imported from .tools on first access, so importing a helper
+# module of this package (e.g. sensitive_vault) doesn't load every tool and
+# the libraries behind them.
+_TOOL_EXPORTS = {
+    "download_attachments_tool",
+    "extract_text_tool",
+    "translate_text_tool",
+    "translate_to_languages_tool",
+    "check_translation_tool",
+    "check_translations_tool",
+    "review_translation_tool",
+    "convert_to_word_tool",
+    "convert_translations_to_word_tool",
+    "edit_word_doc_tool",
+    "send_email_tool",
+    "warm_parser_libraries",
+}
+# Sensitive handling callbacks live in callbacks.py and are attached to the
+# LlmAgents that own the tools, not re-exported here.
+
+
+def __getattr__(name: str):
+    if name in _TOOL_EXPORTS:
+        from . import tools
+        value = globals()[name] = getattr(tools, name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,242 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/attachment_handles.py
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from io import BytesIO
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Attachments at least this large are kept on disk and passed around as handles
+LARGE_ATTACHMENT_BYTES = int(os.getenv("LARGE_ATTACHMENT_MB", "8")) * 1024 * 1024
+ATTACHMENT_SPOOL_DIR = os.getenv("ATTACHMENT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "email_workflow_attachments"))
+# Spooled files not opened for this long are deleted by the retention sweep
+ATTACHMENT_SPOOL_TTL_SECONDS = float(os.getenv("ATTACHMENT_SPOOL_TTL_SECONDS", str(24 * 3600)))
+
+# MIME type of the small artifact that stands in for a spooled file
+HANDLE_MIME_TYPE = "application/vnd.email-workflow.attachment-handle+json"
+CHUNK_BYTES = 1024 * 1024
+
+
+class AttachmentHandle:
+    """
+    A spooled attachment: a read-only file named after its content hash.
+    `open()` memory-maps it, so parsers and senders read pages straight
+    from the page cache instead of a private copy of the bytes.
+    """
+
+    def __init__(self, path: str, mime_type: str, size: int, content_hash: str):
+        self.path = path
+        self.mime_type = mime_type
+        self.size = size
+        self.content_hash = content_hash
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"path": self.path, "mime_type": self.mime_type, "size": self.size, "content_hash": self.content_hash}
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[Union[mmap.mmap, BytesIO]]:
+        """Yields a seekable, file-like view of the content (an mmap, or an empty stream for an empty file)."""
+        os.utime(self.path) # Keeps a file in use clear of the spool sweep
+        if self.size == 0:
+            yield BytesIO(b"") # An empty file can't be mapped
+            return
+        with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+    def iter_chunks(self, chunk_bytes: int = CHUNK_BYTES) -> Iterator[memoryview]:
+        """Yields zero-copy slices of the content; each is only valid until the next one is requested."""
+        with self.open() as mapped:
+            if self.size == 0:
+                return
+            view = memoryview(mapped)
+            try:
+                for start in range(0, self.size, chunk_bytes):
+                    chunk = view[start:start + chunk_bytes]
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+                    if hasattr(mapped, "madvise"):
+                        # Streaming reads each page once: unmap it so the file doesn't pile up in
+                        # this process's RSS (the data stays in the page cache)
+                        mapped.madvise(mmap.MADV_DONTNEED, start, min(chunk_bytes, self.size - start))
+            finally:
+                view.release() # The mmap can't close while views of it exist
+
+
+class InlineAttachment:
+    """Small attachments stay inline; this gives them the same interface as AttachmentHandle."""
+
+    def __init__(self, data: bytes, mime_type: str):
+        self.data = data
+        self.mime_type = mime_type
+        self.size = len(data)
+        self.content_hash = hashlib.sha256(data).hexdigest()
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[BytesIO]:
+        yield BytesIO(self.data) # Shares the bytes until written to
+
+    def iter_chunks(self, chunk_bytes: int = CHUNK_BYTES) -> Iterator[memoryview]:
+        view = memoryview(self.data)
+        for start in range(0, self.size, chunk_bytes):
+            yield view[start:start + chunk_bytes]
+
+
+Attachment = Union[AttachmentHandle, InlineAttachment]
+
+
+class AttachmentSpool:
+    """
+    Content-addressed directory of large attachments on local disk.
+
+    Files are written in chunks while being hashed, then renamed to their
+    hash, so the same attachment in several emails is stored once and a
+    file is never seen half-written.
+    """
+
+    def __init__(self, spool_dir: str = ATTACHMENT_SPOOL_DIR, ttl_seconds: float = ATTACHMENT_SPOOL_TTL_SECONDS):
+        self.spool_dir = spool_dir
+        self.ttl_seconds = ttl_seconds
+        self.spooled_files = 0
+        self.spooled_bytes = 0
+        self.deduplicated = 0
+        self.swept = 0
+
+    def temp_path(self) -> str:
+        """A new, empty temporary file in the spool directory, for writers that build a file in place."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spool_dir, prefix=".tmp-")
+        os.close(fd)
+        return path
+
+    def write_chunks(self, chunks: Iterable[bytes], mime_type: str) -> AttachmentHandle:
+        """Writes the concatenated chunks (bytes or memoryviews) to the spool. Blocking; run it in a thread."""
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = self.temp_path()
+        try:
+            with open(temp_path, "wb") as temp_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            return self._store(temp_path, digest.hexdigest(), size, mime_type)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def adopt_file(self, temp_path: str, mime_type: str) -> AttachmentHandle:
+        """Moves a finished file from `temp_path()` into the spool under its hash. Blocking; run it in a thread."""
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "rb") as temp_file:
+                for chunk in iter(lambda: temp_file.read(CHUNK_BYTES), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+            return self._store(temp_path, digest.hexdigest(), size, mime_type)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _store(self, temp_path: str, content_hash: str, size: int, mime_type: str) -> AttachmentHandle:
+        path = os.path.join(self.spool_dir, content_hash)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            os.utime(path)
+            self.deduplicated += 1
+        else:
+            os.replace(temp_path, path)
+            self.spooled_files += 1
+            self.spooled_bytes += size
+        return AttachmentHandle(path, mime_type, size, content_hash)
+
+    def sweep(self) -> int:
+        """Deletes spooled files not opened within the TTL. Returns how many were deleted."""
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue # Deduplicated away or swept by another worker
+        self.swept += removed
+        return removed
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "spooled_files": self.spooled_files,
+            "spooled_bytes": self.spooled_bytes,
+            "deduplicated": self.deduplicated,
+            "swept": self.swept,
+        }
+
+
+def attachment_from_part(part: Optional[types.Part]) -> Optional[Attachment]:
+    """Opens a loaded artifact as an attachment: a handle if it was spooled, inline bytes otherwise."""
+    if part is None or part.inline_data is None:
+        return None
+    if part.inline_data.mime_type == HANDLE_MIME_TYPE:
+        details = json.loads(part.inline_data.data)
+        return AttachmentHandle(details["path"], details["mime_type"], details["size"], details["content_hash"])
+    return InlineAttachment(part.inline_data.data, part.inline_data.mime_type)
+
+
+def handle_part(handle: AttachmentHandle) -> types.Part:
+    """The artifact part that stands for a spooled file; attachment_from_part turns it back into the handle."""
+    return types.Part.from_bytes(data=json.dumps(handle.to_json()).encode("utf-8"), mime_type=HANDLE_MIME_TYPE)
+
+
+async def save_attachment(tool_context, filename: str, chunks: Iterable[bytes], size: int, mime_type: str) -> Tuple[Attachment, int]:
+    """
+    Saves an attachment as an artifact. At LARGE_ATTACHMENT_BYTES and above
+    the content is spooled to disk and the artifact only holds its handle,
+    so neither the artifact service nor the session keeps the bytes.
+    Returns the saved attachment and its artifact version.
+    """
+    if size >= LARGE_ATTACHMENT_BYTES:
+        attachment = await asyncio.to_thread(attachment_spool.write_chunks, chunks, mime_type)
+        part = handle_part(attachment)
+        logger.info(f"[Tool] Spooled '{filename}' ({size} bytes) to {attachment.path}.")
+    else:
+        attachment = InlineAttachment(b"".join(chunks), mime_type)
+        part = types.Part.from_bytes(data=attachment.data, mime_type=mime_type)
+    version = await tool_context.save_artifact(filename=filename, artifact=part)
+    return attachment, version
+
+
+async def save_spooled_attachment(tool_context, filename: str, handle: AttachmentHandle) -> Tuple[Attachment, int]:
+    """
+    Saves a file that was built in the spool (see AttachmentSpool.adopt_file)
+    as an artifact, following the same size rule as save_attachment: a
+    small file is stored inline and its spooled copy is left to the sweep.
+    """
+    if handle.size >= LARGE_ATTACHMENT_BYTES:
+        attachment, part = handle, handle_part(handle)
+    else:
+        with open(handle.path, "rb") as file:
+            attachment = InlineAttachment(file.read(), handle.mime_type)
+        part = types.Part.from_bytes(data=attachment.data, mime_type=attachment.mime_type)
+    version = await tool_context.save_artifact(filename=filename, artifact=part)
+    return attachment, version
+
+
+# Shared by every session in this worker process
+attachment_spool = AttachmentSpool()
@@ -2,53 +2,81 @@
 # email-agent-workflow/email_workflow_agent/tools/callbacks.py
 import re
 import copy
-from typing import Any, Dict, Optional, List
+import logging
+from typing import Any, Dict, Optional
 from google.adk.tools.tool_context import ToolContext
 from google.adk.tools.base_tool import BaseTool # For type hinting in callbacks
+from .sensitive_vault import SessionVault, UnknownPlaceholderError, sensitive_vault
+from ...flight_recorder import flight_recorder
 
-# --- Sensitive Data Handling Callbacks ---
-
-# Key in state to store the mapping from placeholders to sensitive values
-SENSITIVE_MAP_KEY_PREFIX = "sensitive_map_"
+logger = logging.getLogger(__name__)
 
-def identify_and_replace_sensitive_data(text: str, sensitive_map: Dict[str, str]) -> str:
+# --- Sensitive Data Handling Callbacks ---
+# Attached to the LlmAgents that own the tools (before_tool_callback /
+# after_tool_callback): ADK's FunctionTool takes no callbacks of its own.
+# They run for every tool of the agent and act on those listed below.
+
+# Patterns for sensitive values, and the placeholder kind each one gets
+SENSITIVE_PATTERNS = {
+    r"\b(Confidential Info \d+)\b": "CONFIDENTIAL",
+    r"\b(\d{4}-\d{2}-\d{2})\b": "DATE", # Example date pattern
+    # Add more patterns for names, PII, specific terms etc.
+}
+
+# Tool arguments that may contain sensitive data, per tool (FunctionTool names are the function names)
+SENSITIVE_ARGS = {
+    "translate_text": ["text"],
+    "translate_to_languages": ["text"],
+    "check_translation": ["original_text", "translated_text"],
+    "review_translation": ["original_text", "translated_text"],
+}
+
+# Tool response fields that may contain placeholders, per tool
+PLACEHOLDER_RESPONSE_KEYS = {
+    "translate_text": ["translated_text"],
+    "translate_to_languages": ["translated_texts"],
+    "check_translation": ["feedback_text"],
+    "check_translations": ["feedback_text"],
+    "review_translation": ["summary"],
+}
+
+# State keys a tool writes itself that may contain placeholders
+PLACEHOLDER_STATE_KEYS = {
+    "translate_to_languages": ["translated_texts", "translated_text"],
+    "review_translation": ["review_edit_plan"],
+}
+
+def session_vault_for(tool_context: ToolContext) -> SessionVault:
+    session = tool_context._invocation_context.session
+    return sensitive_vault.session(session.app_name, session.user_id, session.id)
+
+def identify_and_replace_sensitive_data(text: str, session_vault: SessionVault) -> str:
     """
     Placeholder logic to identify and replace sensitive data with placeholders.
-    You NEED to customize this based on your sensitive data patterns.
-    This is a simplified example.
+    You NEED to customize SENSITIVE_PATTERNS based on your sensitive data patterns.
+    The session's vault hands out the placeholders, so a value gets the
+    same placeholder every time it appears in the session.
     """
-    # Example: Replace dummy sensitive patterns
-    patterns = {
-        r"\b(Confidential Info \d+)\b": "__CONFIDENTIAL_{count}__",
-        r"\b(\d{4}-\d{2}-\d{2})\b": "__DATE_{count}__", # Example date pattern
-        # Add more patterns for names, PII, specific terms etc.
-    }
     obfuscated_text = text
-    placeholder_count = 0
-    updated_sensitive_map = sensitive_map.copy()
-
-    for pattern, placeholder_template in patterns.items():
-        def replace_match(match):
-            nonlocal placeholder_count
-            placeholder_count += 1
-            placeholder = placeholder_template.format(count=placeholder_count)
-            updated_sensitive_map[placeholder] = match.group(0)
-            return placeholder
-
-        obfuscated_text = re.sub(pattern, replace_match, obfuscated_text)
-
-    # Return obfuscated text and updated map
-    return obfuscated_text, updated_sensitive_map
+    for pattern, kind in SENSITIVE_PATTERNS.items():
+        obfuscated_text = re.sub(
+            pattern, lambda match: session_vault.placeholder_for(kind, match.group(0)), obfuscated_text
+        )
+    return obfuscated_text
 
-def replace_placeholders_with_sensitive_data(text: str, sensitive_map: Dict[str, str]) -> str:
+def replace_placeholders_with_sensitive_data(value: Any, session_vault: SessionVault) -> Any:
     """
-    Replace placeholders in text with actual sensitive data from the map.
+    Replace placeholders with actual sensitive data from the session's vault.
+    Accepts a string, or a dict/list of strings (e.g. one translation per language).
+    Raises UnknownPlaceholderError for a placeholder the vault has no value for.
     """
-    reconstructed_text = text
-    # Replace placeholders from the map
-    for placeholder, sensitive_value in sensitive_map.items():
-        reconstructed_text = reconstructed_text.replace(placeholder, sensitive_value)
-    return reconstructed_text
+    if isinstance(value, str):
+        return session_vault.restore(value)
+    if isinstance(value, dict):
+        return {key: replace_placeholders_with_sensitive_data(item, session_vault) for key, item in value.items()}
+    if isinstance(value, list):
+        return [replace_placeholders_with_sensitive_data(item, session_vault) for item in value]
+    return value
 
 
 async def handle_sensitive_before(
@@ -57,57 +85,46 @@ async def handle_sensitive_before(
     """
     Callback executed BEFORE a tool runs.
     Identifies and replaces sensitive data in tool arguments with placeholders.
-    Stores the mapping in session state.
+    The mapping is kept in the session's vault, not in session state, and
+    saved before the tool runs so a resumed session can still restore it.
     """
     tool_name = tool.name
     logger.info(f"[Callback: BeforeTool] Running for tool: {tool_name}")
-    logger.info(f"[Callback: BeforeTool] Original args: {args}") # WARNING: Contains sensitive data here!
-
-    # Determine which argument(s) contain text that needs processing for THIS tool
-    # You NEED to customize this logic based on the arguments of the tools
-    # this callback is attached to.
-
-    text_to_process = None
-    text_arg_name = None
-
-    if tool_name == "translate_text_tool" and "text" in args:
-        text_to_process = args.get("text")
-        text_arg_name = "text"
-    elif tool_name == "check_translation_tool" and "original_text" in args:
-         # For translation check, might need to process original AND translated
-         # Simplification: Process original text argument
-         text_to_process = args.get("original_text")
-         text_arg_name = "original_text"
-         # Note: Handling multiple sensitive args needs more complex logic here
-
-    # Add logic for edit_word_doc_tool if it takes text instructions directly
-    # or if you load document content temporarily in the tool and need to process it before editing API call
-
-    if text_to_process and isinstance(text_to_process, str):
-        sensitive_map_key = f"{SENSITIVE_MAP_KEY_PREFIX}{tool_name}"
-        current_sensitive_map = tool_context.state.get(sensitive_map_key, {})
-
-        obfuscated_text, updated_sensitive_map = identify_and_replace_sensitive_data(
-            text_to_process, current_sensitive_map
-        )
-
+    flight_recorder.record(
+        tool_context._invocation_context.session.id, "tool_start", tool_name,
+        payload_bytes=sum(len(value) for value in args.values() if isinstance(value, str)),
+    )
+
+    session_vault = session_vault_for(tool_context)
+    obfuscated_count = 0
+    for arg_name in SENSITIVE_ARGS.get(tool_name, []):
+        text_to_process = args.get(arg_name)
+        if not text_to_process or not isinstance(text_to_process, str):
+            continue
+        obfuscated_text = identify_and_replace_sensitive_data(text_to_process, session_vault)
         if obfuscated_text != text_to_process:
-            logger.info(f"[Callback: BeforeTool] Sensitive data obfuscated in args.")
-            # Update the argument dictionary with the obfuscated text
-            # Make a copy of args to avoid modifying immutable inputs if they were
-            modified_args = copy.deepcopy(args)
-            modified_args[text_arg_name] = obfuscated_text
-
-            # Store the updated sensitive map in state
-            tool_context.state[sensitive_map_key] = updated_sensitive_map
-            logger.info(f"[Callback: BeforeTool] Updated sensitive map in state['{sensitive_map_key}'].")
+            # Update the argument dictionary in place: ADK calls the tool with this same dict
+            args[arg_name] = obfuscated_text
+            obfuscated_count += 1
+
+    sensitive_vault.save(session_vault)
+    if obfuscated_count:
+        logger.info(f"[Callback: BeforeTool] Sensitive data obfuscated in {obfuscated_count} args ({len(session_vault)} values in vault).")
+    else:
+        logger.info(f"[Callback: BeforeTool] No sensitive data processed or no relevant args found. Proceeding.")
+    # Return None: Proceed with tool execution using the (possibly obfuscated) args
+    return None
 
-            # Return None: Proceed with tool execution using the modified_args
-            return None # ADK will pass modified_args to the tool function
 
-    logger.info(f"[Callback: BeforeTool] No sensitive data processed or no relevant args found. Proceeding.")
-    # Return None: Proceed with tool execution using the original args
-    return None
+def _payload_size(value: Any) -> int:
+    """Approximate size of a tool response: the length of its strings, without serializing it."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + _payload_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(item) for item in value)
+    return 0
 
 
 async def handle_sensitive_after(
@@ -115,53 +132,49 @@ async def handle_sensitive_after(
 ) -> Optional[Dict]:
     """
     Callback executed AFTER a tool runs.
-    Replaces placeholders in the tool's response with actual sensitive data
-    using the map stored in session state.
+    Replaces placeholders in the tool's response (and in any state keys the
+    tool wrote) with actual sensitive data from the session's vault.
+    If a placeholder has no value, the tool call fails instead: the state
+    keys it wrote are cleared and an error response is returned.
     """
     tool_name = tool.name
     logger.info(f"[Callback: AfterTool] Running for tool: {tool_name}")
-    logger.info(f"[Callback: AfterTool] Original tool_response: {tool_response}") # WARNING: Contains placeholders here!
-
-    sensitive_map_key = f"{SENSITIVE_MAP_KEY_PREFIX}{tool_name}"
-    sensitive_map = tool_context.state.get(sensitive_map_key)
-
-    # Determine which part(s) of the tool_response contain text with placeholders
-    # You NEED to customize this logic based on the expected output structure
-    # of the tools this callback is attached to.
-
-    response_text_to_process = None
-    response_key_name = None # Key in the tool_response dict containing the text
-
-    if tool_name == "translate_text_tool" and "translated_text" in tool_response:
-        response_text_to_process = tool_response.get("translated_text")
-        response_key_name = "translated_text"
-    elif tool_name == "check_translation_tool" and "feedback_text" in tool_response:
-         # For quality check, process the feedback text generated by the tool
-         response_text_to_process = tool_response.get("feedback_text")
-         response_key_name = "feedback_text"
-    # Add logic for edit_word_doc_tool if its result includes text summary or
-    # if you process doc bytes *after* the tool runs and need to re-insert into bytes
-
-    if sensitive_map and response_text_to_process and isinstance(response_text_to_process, str):
-         logger.info(f"[Callback: AfterTool] Sensitive map found. Reconstructing text in response.")
-
-         reconstructed_text = replace_placeholders_with_sensitive_data(
-             response_text_to_process, sensitive_map
-         )
-
-         if reconstructed_text != response_text_to_process:
-             logger.info(f"[Callback: AfterTool] Placeholders replaced in tool response.")
-             # Update the tool_response dictionary with the reconstructed text
-             # Make a copy to avoid modifying immutable response if it was
-             modified_tool_response = copy.deepcopy(tool_response)
-             modified_tool_response[response_key_name] = reconstructed_text
-
-             # Optionally, clear the sensitive map from state after use in this step
-             # del tool_context.state[sensitive_map_key] # Careful if map is needed downstream!
-
-             # Return the modified tool_response
-             return modified_tool_response
-
-    logger.info(f"[Callback: AfterTool] No sensitive map found or no relevant response text. Proceeding.")
+    flight_recorder.record(
+        tool_context._invocation_context.session.id, "tool_end", tool_name,
+        payload_bytes=_payload_size(tool_response),
+    )
+
+    session_vault = session_vault_for(tool_context)
+    state_keys = [state_key for state_key in PLACEHOLDER_STATE_KEYS.get(tool_name, []) if state_key in tool_context.state]
+    modified_tool_response = None
+    try:
+        restored_state = {
+            state_key: replace_placeholders_with_sensitive_data(tool_context.state[state_key], session_vault)
+            for state_key in state_keys
+        }
+        for response_key_name in PLACEHOLDER_RESPONSE_KEYS.get(tool_name, []):
+            if response_key_name not in tool_response:
+                continue
+            reconstructed = replace_placeholders_with_sensitive_data(tool_response[response_key_name], session_vault)
+            if reconstructed != tool_response[response_key_name]:
+                # Make a copy to avoid modifying immutable response if it was
+                if modified_tool_response is None:
+                    modified_tool_response = copy.deepcopy(tool_response)
+                modified_tool_response[response_key_name] = reconstructed
+    except UnknownPlaceholderError as e:
+        logger.error(f"[Callback: AfterTool] {tool_name} output can't be restored: {e}")
+        for state_key in state_keys:
+            tool_context.state[state_key] = None # Never hand placeholders on as if they were the result
+        return {"status": "error", "message": f"{tool_name} output could not be restored: {e}"}
+
+    for state_key, restored in restored_state.items():
+        tool_context.state[state_key] = restored
+
+    if modified_tool_response is not None:
+        logger.info(f"[Callback: AfterTool] Placeholders replaced in tool response.")
+        # Return the modified tool_response
+        return modified_tool_response
+
+    logger.info(f"[Callback: AfterTool] No placeholders in tool response. Proceeding.")
     # Return None: Use the original tool_response
     return None
@@ -0,0 +1,110 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/document_cache.py
+import collections
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Memory the cache may hold in this worker, all sessions together
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ParsedDocument:
+    """
+    A parsed attachment, shared by every session that handles the same bytes.
+    For DOCX, `segment_ids` holds the stable ID of each segment (see
+    docx_extract.DocxSegment); other formats have none.
+    """
+    file_format: str
+    text: str
+    segments: Tuple[str, ...]
+    segment_ids: Tuple[str, ...] = field(default=(), compare=False)
+
+
+class DocumentCache:
+    """
+    Process-wide LRU cache of parsed documents and other derived artifacts,
+    keyed by (kind, content hash), within a byte budget.
+
+    Thread-safe, so tools running in worker threads and concurrent sessions
+    can share it. Parsing happens outside the lock; if two sessions parse
+    the same bytes at once, both results are identical and the later one
+    simply replaces the earlier.
+    """
+
+    def __init__(self, max_bytes: int = DOCUMENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "collections.OrderedDict[Tuple[str, str], Tuple[Any, int]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def get(self, kind: str, content_hash: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((kind, content_hash))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((kind, content_hash))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, kind: str, content_hash: str, value: Any, size_bytes: int) -> None:
+        """Stores `value`, evicting least recently used entries to stay within the budget."""
+        if size_bytes > self.max_bytes:
+            return # Would evict everything else and still not fit
+        key = (kind, content_hash)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size_bytes)
+            self.current_bytes += size_bytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                self.evicted_bytes += evicted_size
+
+    def get_or_create(self, kind: str, content_hash: str, create: Callable[[], Any], size_of: Callable[[Any], int]) -> Any:
+        """Returns the cached value, or calls `create()` and caches its result. Exceptions from `create` are not cached."""
+        value = self.get(kind, content_hash)
+        if value is None:
+            value = create()
+            self.put(kind, content_hash, value, size_of(value))
+        return value
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+
+def parsed_document_size(parsed: ParsedDocument) -> int:
+    """Approximate memory held by a parsed document."""
+    return (
+        sys.getsizeof(parsed.text)
+        + sum(sys.getsizeof(segment) for segment in parsed.segments)
+        + sum(sys.getsizeof(segment_id) for segment_id in parsed.segment_ids)
+    )
+
+
+# Shared by every session handled by this worker process
+document_cache = DocumentCache()
@@ -0,0 +1,183 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/docx_extract.py
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, List, Tuple
+from xml.etree.ElementTree import iterparse
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+W_P, W_T, W_TAB, W_BR, W_CR = (W_NS + tag for tag in ("p", "t", "tab", "br", "cr"))
+W_TBL, W_TR, W_TC = (W_NS + tag for tag in ("tbl", "tr", "tc"))
+W_FOOTNOTE, W_ENDNOTE = W_NS + "footnote", W_NS + "endnote"
+W_TYPE, W_ID = W_NS + "type", W_NS + "id"
+
+# Parts holding text, in the order their segments are listed: the body, then
+# headers and footers (numbered as Word numbers them), then footnotes and endnotes
+_TEXT_PART_ORDER = [
+    re.compile(r"word/document\.xml"),
+    re.compile(r"word/header(\d*)\.xml"),
+    re.compile(r"word/footer(\d*)\.xml"),
+    re.compile(r"word/footnotes\.xml"),
+    re.compile(r"word/endnotes\.xml"),
+]
+
+
+@dataclass(frozen=True)
+class DocxSegment:
+    """
+    One paragraph of a DOCX file. `id` is "<part>#<n>": the n-th paragraph
+    of that zip member in document order, so the same file always gives the
+    same IDs and an editor can find the paragraph again. `location` says
+    where it sits: "body", "table 1 row 2 cell 3", "header1", "footnote 4".
+    """
+    id: str
+    location: str
+    text: str
+
+
+def text_parts(part_names: Iterable[str]) -> List[str]:
+    """The parts of a package that hold text, in segment order."""
+    ordered = []
+    for pattern in _TEXT_PART_ORDER:
+        matches = [(match.group(1) if match.groups() else "", name) for name in part_names for match in [pattern.fullmatch(name)] if match]
+        ordered.extend(name for _, name in sorted(matches, key=lambda item: (len(item[0]), item[0])))
+    return ordered
+
+
+def _skipped(element) -> bool:
+    """Subtrees without segments: compatibility fallbacks (duplicates of text boxes) and special notes such as footnote separators."""
+    return element.tag == MC_FALLBACK or (element.tag in (W_FOOTNOTE, W_ENDNOTE) and element.get(W_TYPE) is not None)
+
+
+_ONE_LINE = str.maketrans({"\n": " ", "\r": " "})
+
+
+def paragraph_text(paragraph) -> str:
+    """
+    Text of a w:p element (ElementTree or lxml). Tabs stay tabs, line
+    breaks become spaces so a paragraph is always one line. Deleted text,
+    field codes, nested paragraphs (text boxes; they are segments of their
+    own) and compatibility fallbacks (duplicates of the text boxes) are left out.
+    """
+    pieces: List[str] = []
+
+    def walk(element) -> None:
+        for child in element:
+            tag = child.tag
+            if tag == W_T:
+                pieces.append(child.text or "")
+            elif tag == W_TAB:
+                pieces.append("\t")
+            elif tag in (W_BR, W_CR):
+                pieces.append(" ")
+            elif tag != W_P and not _skipped(child):
+                walk(child)
+
+    walk(paragraph)
+    return "".join(pieces).translate(_ONE_LINE)
+
+
+def paragraph_elements(root) -> Iterator:
+    """The w:p elements of a parsed part in segment order (the order iter_docx_segments numbers them)."""
+    def walk(element):
+        for child in element:
+            if _skipped(child):
+                continue
+            if child.tag == W_P:
+                yield child
+            yield from walk(child)
+    return walk(root)
+
+
+def _part_label(part_name: str) -> str:
+    return part_name.rsplit("/", 1)[-1][:-len(".xml")]
+
+
+def _iter_part_segments(part_name: str, stream: IO[bytes]) -> Iterator[DocxSegment]:
+    """
+    Segments of one part, read with an incremental parser. Only the element
+    path being parsed is kept: every finished paragraph, table and other
+    block is removed from its parent once its text is taken, so memory
+    stays flat however long the part is.
+    """
+    label = _part_label(part_name)
+    path = [] # Open elements, outermost first
+    tables: List[List[int]] = [] # Per open table: [row number, cell number]
+    table_count = 0
+    note = None # (kind, id) of the footnote or endnote being read
+    skip_depth = 0 # > 0 inside a subtree without segments
+    open_paragraphs: List[Tuple[int, str]] = [] # (number, location) of the paragraphs being read
+    finished: List[Tuple[int, DocxSegment]] = [] # Paragraphs nested in an open one, emitted with it
+    next_number = 0
+
+    for event, element in iterparse(stream, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            path.append(element)
+            if skip_depth or _skipped(element):
+                skip_depth += 1
+            elif tag == W_TBL:
+                if not tables:
+                    table_count += 1
+                tables.append([0, 0])
+            elif tag == W_TR and tables:
+                tables[-1][0] += 1
+                tables[-1][1] = 0
+            elif tag == W_TC and tables:
+                tables[-1][1] += 1
+            elif tag in (W_FOOTNOTE, W_ENDNOTE):
+                note = (tag[len(W_NS):], element.get(W_ID))
+            elif tag == W_P:
+                if note is not None:
+                    location = f"{note[0]} {note[1]}"
+                elif tables:
+                    location = _table_location(table_count, tables)
+                    if label != "document":
+                        location = f"{label} {location}"
+                else:
+                    location = "body" if label == "document" else label
+                open_paragraphs.append((next_number, location))
+                next_number += 1
+            continue
+
+        path.pop()
+        if skip_depth:
+            skip_depth -= 1
+        elif tag == W_TBL:
+            tables.pop()
+        elif tag in (W_FOOTNOTE, W_ENDNOTE):
+            note = None
+        elif tag == W_P:
+            number, location = open_paragraphs.pop()
+            finished.append((number, DocxSegment(f"{part_name}#{number}", location, paragraph_text(element))))
+            if not open_paragraphs:
+                # A paragraph's nested paragraphs end first; list them after it, in document order
+                for _, segment in sorted(finished, key=lambda item: item[0]):
+                    yield segment
+                finished.clear()
+
+        if not open_paragraphs and path:
+            path[-1].remove(element) # Done with it; drop it from the tree being built
+            element.clear()
+
+
+def _table_location(table_number: int, tables: List[List[int]]) -> str:
+    """'table 4 row 2 cell 3', or in a nested table 'table 4 row 2 cell 3 / row 1 cell 1'."""
+    return f"table {table_number} " + " / ".join(f"row {row} cell {cell}" for row, cell in tables)
+
+
+def iter_docx_segments(stream: IO[bytes]) -> Iterator[DocxSegment]:
+    """
+    Yields the paragraphs of a DOCX file (a seekable binary stream, e.g. an
+    mmap) in segment order: body paragraphs and table cells as they appear,
+    then headers, footers, footnotes and endnotes. Zip members are
+    decompressed and parsed incrementally, so memory doesn't grow with the
+    size of the document. Footnote separators and other special notes
+    (which have a w:type) are skipped.
+    """
+    with zipfile.ZipFile(stream) as package:
+        for part_name in text_parts(package.namelist()):
+            with package.open(part_name) as part:
+                for segment in _iter_part_segments(part_name, part):
+                    yield segment
@@ -0,0 +1,125 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/docx_stream.py
+import os
+import re
+import zipfile
+from typing import Dict
+from xml.sax.saxutils import escape
+
+from .attachment_handles import AttachmentHandle, AttachmentSpool, attachment_spool
+
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# The smallest package Word opens: content types, the package relationship and the document itself
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+DOCUMENT_HEADER_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+DOCUMENT_FOOTER_XML = '<w:sectPr/></w:body></w:document>'
+
+# Control characters XML 1.0 can't carry (python-docx refuses them too)
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def paragraph_xml(text: str) -> str:
+    """One w:p element for a paragraph of plain text; tabs become w:tab like python-docx's add_paragraph."""
+    text = _INVALID_XML_CHARS.sub("", text)
+    if not text:
+        return "<w:p/>"
+    runs = []
+    for position, piece in enumerate(text.split("\t")):
+        if position:
+            runs.append("<w:tab/>")
+        if piece:
+            runs.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return f"<w:p><w:r>{''.join(runs)}</w:r></w:p>"
+
+
+class StreamingDocxWriter:
+    """
+    Builds a DOCX file paragraph by paragraph while a translation is still
+    running. Segments may be added in any order; each is written to the
+    compressed document part as soon as every segment before it is in, so
+    only the out-of-order ones are held in memory. The zip is written to a
+    temporary file in the spool directory, and `finish()` moves it into
+    the spool under its content hash.
+
+    Blocking file I/O; `add` writes a few paragraphs at a time, `finish`
+    hashes the whole file and belongs in a thread.
+    """
+
+    def __init__(self, segment_count: int, spool: AttachmentSpool = attachment_spool):
+        self.segment_count = segment_count
+        self.spool = spool
+        self._pending: Dict[int, str] = {}
+        self._next_index = 0
+        self._temp_path = spool.temp_path()
+        self._zip = zipfile.ZipFile(self._temp_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        self._zip.writestr("_rels/.rels", PACKAGE_RELS_XML)
+        # Only one member can be open for writing, so the static parts go first
+        self._document = self._zip.open("word/document.xml", "w", force_zip64=True)
+        self._document.write(DOCUMENT_HEADER_XML.encode("utf-8"))
+
+    @property
+    def written_segments(self) -> int:
+        return self._next_index
+
+    @property
+    def complete(self) -> bool:
+        return self._next_index == self.segment_count
+
+    def add(self, index: int, text: str) -> None:
+        """Adds the segment at `index`, then writes every segment that is now next in order."""
+        if not 0 <= index < self.segment_count:
+            raise IndexError(f"Segment {index} out of range for {self.segment_count} segments")
+        if index < self._next_index or index in self._pending:
+            raise ValueError(f"Segment {index} was already added")
+        self._pending[index] = text
+        if index != self._next_index:
+            return
+        paragraphs = []
+        while self._next_index in self._pending:
+            paragraphs.append(paragraph_xml(self._pending.pop(self._next_index)))
+            self._next_index += 1
+        self._document.write("".join(paragraphs).encode("utf-8"))
+
+    def finish(self, mime_type: str = DOCX_MIME_TYPE) -> AttachmentHandle:
+        """Closes the zip once every segment is in and returns the spooled file."""
+        if not self.complete:
+            missing = self.segment_count - self._next_index
+            self.abort()
+            raise ValueError(f"Document incomplete: {missing} of {self.segment_count} segments missing")
+        self._document.write(DOCUMENT_FOOTER_XML.encode("utf-8"))
+        self._document.close()
+        self._zip.close()
+        return self.spool.adopt_file(self._temp_path, mime_type)
+
+    def abort(self) -> None:
+        """Discards the partial file, e.g. when the translation failed."""
+        try:
+            self._document.close()
+            self._zip.close()
+        except (OSError, ValueError, zipfile.BadZipFile):
+            pass # Only the file is of interest, and it is deleted next
+        finally:
+            self._pending.clear()
+            if os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+
@@ -0,0 +1,327 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/fuzzy_memory.py
+import difflib
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Estimated Jaccard similarity (of normalised token shingles) from which a
+# translated segment counts as a match; 0 turns fuzzy reuse off
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.7"))
+# Translated segments kept per customer and source language, most recent first
+FUZZY_MEMORY_MAX_ENTRIES = int(os.getenv("FUZZY_MEMORY_MAX_ENTRIES", "5000"))
+
+# 64 MinHash values cut into 16 bands of 4: a pair at similarity 0.7 shares
+# a band with probability 0.99, a pair at 0.3 with about 0.12
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_SEED = 20240611 # Fixed, so signatures are the same in every worker
+SIGNATURE_CHUNK_TEXTS = 64
+
+# Placeholders of the sensitive data vault, numbers (with their separators,
+# so "1,200.50" and "12/03/2024" are one token), words, and punctuation marks
+_TOKEN = re.compile(r"__[A-Z]+_\d+__|\d+(?:[.,:/-]\d+)*|\w+|[^\w\s]")
+_PLACEHOLDER = re.compile(r"__([A-Z]+)_\d+__")
+_DIGITS = re.compile(r"\d")
+
+# numpy is imported on first use, like in language_id
+_permutations: Dict[str, Any] = {}
+
+
+def _numpy():
+    """Returns the numpy module. Raises ImportError if it's not installed."""
+    import numpy # Requires numpy
+    return numpy
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+def _normalise(token: str) -> str:
+    """
+    Shingle form of a token: every digit is the same digit and placeholders
+    lose their number, so segments that differ only by an amount, a date or
+    a masked value have identical shingles.
+    """
+    placeholder = _PLACEHOLDER.fullmatch(token)
+    if placeholder:
+        return f"__{placeholder.group(1)}__"
+    return _DIGITS.sub("0", token.lower())
+
+
+def _shingle_hashes(text: str) -> List[int]:
+    """32-bit hashes of the segment's normalised tokens and token pairs."""
+    tokens = [_normalise(token) for token in tokenize(text)]
+    shingles = set(tokens) | {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+    return [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+
+
+def _permutation_parameters():
+    """(a, b) of the MinHash permutations h -> (a*h + b) mod p, as column vectors."""
+    if "a" not in _permutations:
+        np = _numpy()
+        generator = np.random.default_rng(MINHASH_SEED)
+        _permutations["a"] = generator.integers(1, MINHASH_PRIME, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64)
+        _permutations["b"] = generator.integers(1, MINHASH_PRIME, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64)
+    return _permutations["a"], _permutations["b"]
+
+
+def _mix64(values):
+    """splitmix64 finaliser: spreads the 32-bit shingle hashes over 64 bits (uint64 arithmetic wraps)."""
+    np = _numpy()
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _mod_prime(x):
+    """x mod 2**61 - 1 for any uint64 x: 2**61 is 1 modulo the Mersenne prime."""
+    np = _numpy()
+    p = np.uint64(MINHASH_PRIME)
+    x = (x & p) + (x >> np.uint64(61))
+    return np.where(x >= p, x - p, x)
+
+
+def _permute(a, b, h):
+    """
+    (a*h + b) mod p without overflowing uint64, for a, b, h below p = 2**61 - 1.
+    The factors are split into 31-bit halves, and the partial products shifted
+    to 2**62 and 2**61 are folded back using 2**61 = 1 (mod p).
+    """
+    np = _numpy()
+    low_bits = np.uint64((1 << 31) - 1)
+    a_high, a_low = a >> np.uint64(31), a & low_bits
+    h_high, h_low = h >> np.uint64(31), h & low_bits
+    middle = a_high * h_low + a_low * h_high # Times 2**31, below 2**62
+    total = (
+        ((a_high * h_high) << np.uint64(1)) # Times 2**62 = 2 (mod p)
+        + (middle >> np.uint64(30)) # The part of middle * 2**31 at 2**61 and above
+        + ((middle & np.uint64((1 << 30) - 1)) << np.uint64(31))
+        + a_low * h_low
+        + b
+    )
+    return _mod_prime(total)
+
+
+def minhash_signatures(texts: List[str]):
+    """
+    MinHash signatures of many segments at once, one row each. The shingle
+    hashes of all segments are permuted in one array operation and reduced
+    per segment with minimum.reduceat. Every text must have a token.
+    """
+    np = _numpy()
+    a, b = _permutation_parameters()
+    rows = []
+    # In chunks, so the permuted array stays a few MB for a large memory
+    for start in range(0, len(texts), SIGNATURE_CHUNK_TEXTS):
+        hashes = [_shingle_hashes(text) for text in texts[start:start + SIGNATURE_CHUNK_TEXTS]]
+        offsets = np.cumsum([0] + [len(text_hashes) for text_hashes in hashes[:-1]])
+        values = _mod_prime(_mix64(np.fromiter((value for text_hashes in hashes for value in text_hashes), dtype=np.uint64)))
+        permuted = _permute(a, b, values) # (permutations, shingles of the chunk)
+        rows.append(np.minimum.reduceat(permuted, offsets, axis=1).T)
+    return np.concatenate(rows) if rows else np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint64)
+
+
+class FuzzySegmentIndex:
+    """
+    Near-duplicate index over segments, with a payload per segment (e.g. its
+    translations). Candidates come from LSH banding: a segment is looked up
+    only in the buckets of its own bands, so a query costs the same however
+    large the index is. Their similarity to the query is then estimated from
+    the full signatures in one vectorised comparison.
+    """
+
+    def __init__(self, threshold: float = FUZZY_MATCH_THRESHOLD, bands: int = LSH_BANDS):
+        np = _numpy()
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self.sources: List[str] = []
+        self.payloads: List[Any] = []
+        self._signatures = np.zeros((64, MINHASH_PERMUTATIONS), dtype=np.uint64) # Grows by doubling
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def _band_keys(self, signature) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add_many(self, sources: List[str], payloads: List[Any], signatures=None) -> None:
+        """Adds segments (skipping those without tokens); pass their signatures if already computed."""
+        np = _numpy()
+        kept = [position for position, source in enumerate(sources) if tokenize(source)]
+        if not kept:
+            return
+        if signatures is None:
+            signatures = minhash_signatures([sources[position] for position in kept])
+        else:
+            signatures = signatures[kept]
+        start = len(self.sources)
+        if start + len(kept) > len(self._signatures):
+            grown = np.zeros((max(2 * len(self._signatures), start + len(kept)), MINHASH_PERMUTATIONS), dtype=np.uint64)
+            grown[:start] = self._signatures[:start]
+            self._signatures = grown
+        self._signatures[start:start + len(kept)] = signatures
+        for offset, position in enumerate(kept):
+            entry = start + offset
+            self.sources.append(sources[position])
+            self.payloads.append(payloads[position])
+            for band, key in enumerate(self._band_keys(signatures[offset])):
+                self._buckets[band].setdefault(key, []).append(entry)
+
+    def add(self, source: str, payload: Any, signature=None) -> None:
+        self.add_many([source], [payload], None if signature is None else signature[None, :])
+
+    def query(self, signature) -> Optional[Tuple[int, float]]:
+        """(entry, estimated similarity) of the most similar indexed segment at or above the threshold, or None."""
+        np = _numpy()
+        candidates = {entry for band, key in enumerate(self._band_keys(signature)) for entry in self._buckets[band].get(key, ())}
+        if not candidates:
+            return None
+        entries = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self._signatures[entries] == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        # Ties go to the earliest entry, so the result doesn't depend on set order
+        best_entries = entries[similarities == similarities[best]]
+        return int(best_entries.min()), float(similarities[best])
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    """
+    A segment's near-duplicate: an entry of the customer's memory (with its
+    `translations` by language), or an earlier segment of the same document
+    (`leader`, its index), whose translation is only known once it's back.
+    """
+    source: str
+    similarity: float
+    translations: Dict[str, str] = field(default_factory=dict)
+    leader: Optional[int] = None
+
+
+def match_segments(
+    segments: List[str],
+    memory_entries: List[Dict[str, Any]],
+    threshold: float = FUZZY_MATCH_THRESHOLD,
+) -> Dict[int, FuzzyMatch]:
+    """
+    Finds a near-duplicate for each segment of a document, among the stored
+    memory entries ({"source", "translations"}) and the segments before it.
+    A segment without a match is indexed in turn, so later segments can
+    reuse its translation; one with a match is not (its match is better).
+    Returns {segment index: match}.
+    """
+    index = FuzzySegmentIndex(threshold)
+    index.add_many([entry["source"] for entry in memory_entries], list(memory_entries))
+    positions = [position for position, segment in enumerate(segments) if tokenize(segment)]
+    signatures = minhash_signatures([segments[position] for position in positions])
+    matches: Dict[int, FuzzyMatch] = {}
+    for position, signature in zip(positions, signatures):
+        hit = index.query(signature) if len(index) else None
+        if hit is None:
+            index.add(segments[position], position, signature)
+            continue
+        entry, similarity = hit
+        payload = index.payloads[entry]
+        if isinstance(payload, dict):
+            matches[position] = FuzzyMatch(index.sources[entry], similarity, translations=payload.get("translations", {}))
+        else:
+            matches[position] = FuzzyMatch(index.sources[entry], similarity, leader=payload)
+    return matches
+
+
+def merge_memory_entries(
+    entries: List[Dict[str, Any]],
+    sources: List[str],
+    translations: Dict[str, List[str]],
+    max_entries: int = FUZZY_MEMORY_MAX_ENTRIES,
+) -> List[Dict[str, Any]]:
+    """
+    The memory after a document was translated: its segments (with
+    `translations`, {language: translated segments}) first, then the older
+    entries, up to `max_entries`. A segment already in memory keeps its
+    translations into languages that weren't requested this time.
+    """
+    previous = {entry["source"]: entry.get("translations", {}) for entry in entries}
+    merged: Dict[str, Dict[str, str]] = {}
+    for position, source in enumerate(sources):
+        if source in merged or not tokenize(source):
+            continue
+        merged[source] = {**previous.get(source, {}), **{language: translated[position] for language, translated in translations.items()}}
+    for entry in entries:
+        merged.setdefault(entry["source"], entry.get("translations", {}))
+    return [{"source": source, "translations": entry_translations} for source, entry_translations in list(merged.items())[:max_entries]]
+
+
+def _patchable(token: str) -> bool:
+    """Tokens a translation normally carries over unchanged: numbers, masked values and names."""
+    return bool(_DIGITS.search(token) or _PLACEHOLDER.fullmatch(token) or token[:1].isupper())
+
+
+def patch_translation(source: str, matched_source: str, matched_translation: str) -> Optional[str]:
+    """
+    Translation of `source` made from the translation of a near-duplicate:
+    each token that differs is swapped for the new one in the translation.
+    Only possible if the segments differ by replaced numbers, placeholders
+    or capitalised words (no inserted or removed tokens), and every replaced
+    token occurs exactly once in the translation. None otherwise.
+    """
+    old_tokens, new_tokens = tokenize(matched_source), tokenize(source)
+    matcher = difflib.SequenceMatcher(a=old_tokens, b=new_tokens, autojunk=False)
+    replacements: Dict[str, str] = {}
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace" or old_end - old_start != new_end - new_start:
+            return None
+        for old, new in zip(old_tokens[old_start:old_end], new_tokens[new_start:new_end]):
+            if not (_patchable(old) and _patchable(new)) or replacements.get(old, new) != new:
+                return None
+            replacements[old] = new
+    if not replacements:
+        return matched_translation
+
+    pattern = re.compile(r"(?<!\w)(" + "|".join(re.escape(old) for old in sorted(replacements, key=len, reverse=True)) + r")(?!\w)")
+    found = pattern.findall(matched_translation)
+    if sorted(found) != sorted(replacements):
+        return None # A token was translated (a month name, say), or occurs more than once
+    return pattern.sub(lambda match: replacements[match.group(1)], matched_translation)
+
+
+def reference_context(matched_source: str, matched_translation: str) -> str:
+    """Context sent with a segment whose near-duplicate couldn't be patched, so the backend can keep its wording."""
+    return f"A similar segment was translated before.\nSource: {matched_source}\nTranslation: {matched_translation}"
+
+
+class FuzzyReuseMetrics:
+    """Counts of segments translated, patched from a match, or sent with a match as context, for every workflow in the process."""
+
+    def __init__(self):
+        self.segments = 0
+        self.patched = 0
+        self.with_context = 0
+
+    def record(self, segments: int, patched: int, with_context: int) -> None:
+        self.segments += segments
+        self.patched += patched
+        self.with_context += with_context
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "segments": self.segments,
+            "patched": self.patched,
+            "with_context": self.with_context,
+            "reuse_rate": self.patched / self.segments if self.segments else 0.0,
+            "context_rate": self.with_context / self.segments if self.segments else 0.0,
+        }
+
+
+# Shared by every workflow in this process
+fuzzy_reuse_metrics = FuzzyReuseMetrics()
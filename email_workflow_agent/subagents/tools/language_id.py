@@ -0,0 +1,216 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/language_id.py
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Only the start of a document is looked at; a few KB identify the language reliably
+LANGUAGE_ID_SAMPLE_CHARS = int(os.getenv("LANGUAGE_ID_SAMPLE_CHARS", "4096"))
+# Below this cosine margin between the best and second-best language, the answer is "unknown"
+LANGUAGE_ID_MIN_MARGIN = float(os.getenv("LANGUAGE_ID_MIN_MARGIN", "0.02"))
+MIN_LETTERS = 20
+
+NGRAM_ORDERS = (1, 2, 3)
+NGRAM_BUCKETS = 1 << 14
+HASH_MULTIPLIER = 1000003
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "fr": "French",
+    "de": "German",
+    "es": "Spanish",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "nl": "Dutch",
+}
+
+# Reference text per language; its n-gram profile is what documents are compared against
+LANGUAGE_SAMPLES = {
+    "en": (
+        "The company is committed to protecting the personal information of its employees and customers. "
+        "This policy applies to all staff who have access to confidential records, and it describes what "
+        "they should do when they receive a request for information. Please read the following sections "
+        "carefully and contact your manager if you have any questions about the way we work with the data "
+        "that we hold. Each department will review its procedures every year, and the results of that "
+        "review will be shared with the board. Thank you for your attention to this important matter."
+    ),
+    "fr": (
+        "L'entreprise s'engage à protéger les informations personnelles de ses employés et de ses clients. "
+        "Cette politique s'applique à tout le personnel qui a accès aux dossiers confidentiels, et elle décrit "
+        "ce qu'il doit faire lorsqu'il reçoit une demande d'information. Veuillez lire attentivement les "
+        "sections suivantes et contacter votre responsable si vous avez des questions sur la façon dont nous "
+        "traitons les données que nous détenons. Chaque service examinera ses procédures chaque année, et les "
+        "résultats de cet examen seront communiqués au conseil. Merci de votre attention à cette question."
+    ),
+    "de": (
+        "Das Unternehmen verpflichtet sich, die persönlichen Daten seiner Mitarbeiter und Kunden zu schützen. "
+        "Diese Richtlinie gilt für alle Mitarbeiter, die Zugang zu vertraulichen Unterlagen haben, und sie "
+        "beschreibt, was sie tun sollen, wenn sie eine Anfrage nach Informationen erhalten. Bitte lesen Sie die "
+        "folgenden Abschnitte sorgfältig und wenden Sie sich an Ihren Vorgesetzten, wenn Sie Fragen zum Umgang "
+        "mit den bei uns gespeicherten Daten haben. Jede Abteilung überprüft ihre Verfahren jedes Jahr, und die "
+        "Ergebnisse dieser Prüfung werden dem Vorstand mitgeteilt. Vielen Dank für Ihre Aufmerksamkeit."
+    ),
+    "es": (
+        "La empresa se compromete a proteger la información personal de sus empleados y clientes. Esta política "
+        "se aplica a todo el personal que tiene acceso a los registros confidenciales, y describe lo que deben "
+        "hacer cuando reciben una solicitud de información. Por favor, lea atentamente las siguientes secciones y "
+        "póngase en contacto con su responsable si tiene alguna pregunta sobre la forma en que tratamos los datos "
+        "que tenemos. Cada departamento revisará sus procedimientos todos los años, y los resultados de esa "
+        "revisión se compartirán con el consejo. Gracias por su atención a este asunto tan importante."
+    ),
+    "it": (
+        "L'azienda si impegna a proteggere le informazioni personali dei propri dipendenti e clienti. Questa "
+        "politica si applica a tutto il personale che ha accesso ai documenti riservati e descrive cosa deve fare "
+        "quando riceve una richiesta di informazioni. Si prega di leggere attentamente le sezioni seguenti e di "
+        "contattare il proprio responsabile in caso di domande sul modo in cui trattiamo i dati in nostro possesso. "
+        "Ogni reparto esaminerà le proprie procedure ogni anno e i risultati di tale esame saranno condivisi con il "
+        "consiglio. Grazie per l'attenzione dedicata a questa importante questione."
+    ),
+    "pt": (
+        "A empresa está empenhada em proteger as informações pessoais dos seus funcionários e clientes. Esta "
+        "política aplica-se a todo o pessoal que tem acesso a registos confidenciais e descreve o que deve fazer "
+        "quando recebe um pedido de informação. Por favor, leia atentamente as secções seguintes e contacte o seu "
+        "gestor se tiver alguma dúvida sobre a forma como tratamos os dados que detemos. Cada departamento irá "
+        "rever os seus procedimentos todos os anos, e os resultados dessa revisão serão partilhados com o "
+        "conselho. Obrigado pela sua atenção a este assunto tão importante."
+    ),
+    "nl": (
+        "Het bedrijf zet zich in om de persoonlijke gegevens van zijn werknemers en klanten te beschermen. Dit "
+        "beleid is van toepassing op alle medewerkers die toegang hebben tot vertrouwelijke documenten, en het "
+        "beschrijft wat zij moeten doen wanneer zij een verzoek om informatie ontvangen. Lees de volgende "
+        "hoofdstukken zorgvuldig door en neem contact op met uw leidinggevende als u vragen heeft over de manier "
+        "waarop wij met onze gegevens omgaan. Elke afdeling zal haar procedures elk jaar herzien, en de resultaten "
+        "van die herziening worden gedeeld met het bestuur. Dank u voor uw aandacht voor deze belangrijke zaak."
+    ),
+}
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+# numpy is imported on first use, like the document parsers, so importing the tools stays cheap
+_profiles: Dict[str, Any] = {}
+
+
+def _numpy():
+    """Returns the numpy module. Raises ImportError if it's not installed."""
+    import numpy # Requires numpy
+    return numpy
+
+
+def _ngram_vector(text: str):
+    """
+    L2-normalised vector of hashed character 1-3-gram counts (log-scaled).
+    The n-grams of the whole text are hashed at once with array arithmetic
+    on its code points, so the cost is a few passes over one array.
+    """
+    np = _numpy()
+    cleaned = " " + " ".join(_NON_LETTERS.sub(" ", text.lower()).split()) + " "
+    codes = np.frombuffer(cleaned.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    features = []
+    for order in NGRAM_ORDERS:
+        if len(codes) < order:
+            break
+        count = len(codes) - order + 1
+        hashes = np.full(count, order, dtype=np.uint64) # Seeded with the order, so a unigram and a trigram rarely share a bucket
+        for offset in range(order):
+            hashes = hashes * np.uint64(HASH_MULTIPLIER) + codes[offset:offset + count] # Wraps around on overflow, as intended
+        features.append(hashes % np.uint64(NGRAM_BUCKETS))
+    counts = np.bincount(np.concatenate(features), minlength=NGRAM_BUCKETS) if features else np.zeros(NGRAM_BUCKETS)
+    vector = np.log1p(counts.astype(np.float32))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _profile_matrix() -> Tuple[List[str], Any]:
+    """The languages and their profile vectors, one row each. Built once per process."""
+    if "matrix" not in _profiles:
+        np = _numpy()
+        languages = sorted(LANGUAGE_SAMPLES)
+        _profiles["languages"] = languages
+        _profiles["matrix"] = np.stack([_ngram_vector(LANGUAGE_SAMPLES[language]) for language in languages])
+    return _profiles["languages"], _profiles["matrix"]
+
+
+def warm_language_profiles() -> None:
+    """Pre-import hook for workers: imports numpy and builds the profiles before the first email."""
+    _profile_matrix()
+
+
+def identify_language(text: str, sample_chars: int = LANGUAGE_ID_SAMPLE_CHARS) -> Tuple[Optional[str], float]:
+    """
+    Identifies the language of a document from its first `sample_chars`
+    characters. Returns (ISO 639-1 code, confidence margin), or
+    (None, margin) if the text is too short or too ambiguous to tell.
+    """
+    sample = text[:sample_chars]
+    if sum(character.isalpha() for character in sample) < MIN_LETTERS:
+        return None, 0.0
+    languages, matrix = _profile_matrix()
+    scores = matrix @ _ngram_vector(sample) # Cosine similarity with every profile at once
+    ranked = scores.argsort()[::-1]
+    margin = float(scores[ranked[0]] - scores[ranked[1]])
+    if margin < LANGUAGE_ID_MIN_MARGIN:
+        return None, margin
+    return languages[ranked[0]], margin
+
+
+def language_code(language: Optional[str]) -> Optional[str]:
+    """Maps a language name or code ("French", "fr") to its code, or None if unknown."""
+    if not language:
+        return None
+    lowered = language.strip().lower()
+    if lowered in LANGUAGE_NAMES:
+        return lowered
+    for code, name in LANGUAGE_NAMES.items():
+        if name.lower() == lowered:
+            return code
+    return None
+
+
+_LANGUAGE_SUFFIX = re.compile(
+    r"[\s._-]+(" + "|".join(sorted({*LANGUAGE_NAMES, *(name.lower() for name in LANGUAGE_NAMES.values()), "translated", "translation", "original"})) + r")$"
+)
+
+
+def _document_stem(filename: str) -> str:
+    """Filename without extension and trailing language markers: "policy_manual_fr.docx" -> "policy_manual"."""
+    stem = os.path.splitext(os.path.basename(filename))[0].lower()
+    while True:
+        shorter = _LANGUAGE_SUFFIX.sub("", stem)
+        if shorter == stem:
+            return stem
+        stem = shorter
+
+
+def pair_documents(detected: Dict[str, Optional[str]], target_languages: List[str] = ()) -> List[Dict[str, str]]:
+    """
+    Pairs the attachments of a review email into (original, translation)
+    by their detected languages (`detected` maps filename -> language code,
+    in attachment order).
+
+    A file in one of the requested `target_languages` is a translation.
+    Without a usable request, the English files are the originals if the
+    email has files in other languages too, else the first file's language
+    is the source. Each translation is paired with the original that has
+    the same name apart from language markers, or else the first original.
+    """
+    target_codes = {code for code in (language_code(language) for language in target_languages) if code}
+    translations = [name for name, language in detected.items() if language and language in target_codes]
+    originals = [name for name, language in detected.items() if language and name not in translations]
+    if not translations or not originals:
+        languages = [language for language in detected.values() if language]
+        if not languages:
+            return []
+        source = "en" if "en" in languages and any(language != "en" for language in languages) else languages[0]
+        originals = [name for name, language in detected.items() if language == source]
+        translations = [name for name, language in detected.items() if language and language != source]
+
+    pairs = []
+    for translation in translations:
+        matching = [original for original in originals if _document_stem(original) == _document_stem(translation)]
+        original = (matching or originals)[0]
+        pairs.append({
+            "original": original,
+            "translation": translation,
+            "source_language": detected[original],
+            "target_language": detected[translation],
+        })
+    return pairs
@@ -0,0 +1,134 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/qa_sampling.py
+import math
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+# "sampled" checks a stratified sample of segments; "full" checks every segment
+QA_MODE = os.getenv("QA_MODE", "sampled")
+# Documents with at most this many segments are always checked in full
+QA_FULL_CHECK_MAX_SEGMENTS = int(os.getenv("QA_FULL_CHECK_MAX_SEGMENTS", "40"))
+# Most segments a sampled check will look at, however long the document
+QA_SAMPLE_BUDGET = int(os.getenv("QA_SAMPLE_BUDGET", "200"))
+# Sampling stops once the 95% confidence interval of the mean score is this narrow (half-width)
+QA_TARGET_HALF_WIDTH = float(os.getenv("QA_TARGET_HALF_WIDTH", "0.05"))
+# A sampled score below this triggers a full check
+QA_FULL_CHECK_BELOW = float(os.getenv("QA_FULL_CHECK_BELOW", "0.8"))
+
+# Segments per round: checked together, then the stopping rule is evaluated
+SAMPLE_ROUND_SIZE = 16
+MIN_SAMPLE_SIZE = 30
+NUM_STRATA = 10
+Z_95 = 1.96
+
+# Scores a batch of segment indexes, in [0, 1] each (1 = no problem found)
+CheckBatch = Callable[[List[int]], Awaitable[List[float]]]
+
+
+@dataclass
+class QualityCheckResult:
+    mode: str # "full", "sampled", or "sampled+full" (sample fell below the threshold)
+    score: float
+    segments_total: int
+    segments_checked: int
+    half_width: Optional[float] = None
+    low_scoring_segments: List[int] = field(default_factory=list)
+
+
+def stratified_order(indexes: Sequence[int], num_strata: int = NUM_STRATA, seed: Optional[int] = None) -> List[int]:
+    """
+    Orders segment indexes for sampling: the document is split into
+    `num_strata` contiguous strata, each is shuffled, and the strata are
+    interleaved round-robin. Any prefix of the result is then a stratified
+    random sample, so sampling can stop after any round.
+    """
+    rng = random.Random(seed)
+    num_strata = max(1, min(num_strata, len(indexes)))
+    strata = [list(indexes[i * len(indexes) // num_strata:(i + 1) * len(indexes) // num_strata]) for i in range(num_strata)]
+    for stratum in strata:
+        rng.shuffle(stratum)
+    ordered = []
+    for position in range(max(len(stratum) for stratum in strata)):
+        for stratum in strata:
+            if position < len(stratum):
+                ordered.append(stratum[position])
+    return ordered
+
+
+def confidence_half_width(scores: Sequence[float], population: int) -> float:
+    """95% half-width of the mean score, with the finite population correction."""
+    n = len(scores)
+    if n < 2:
+        return 1.0
+    mean = sum(scores) / n
+    variance = sum((score - mean) ** 2 for score in scores) / (n - 1)
+    correction = math.sqrt(max(0.0, (population - n) / max(1, population - 1)))
+    if variance == 0:
+        # A sample without a single error still leaves doubt: use the rule-of-three bound instead of 0
+        return min(1.0, 3.0 / n) * correction
+    return Z_95 * math.sqrt(variance / n) * correction
+
+
+async def quality_check(
+    segment_indexes: Sequence[int],
+    check_batch: CheckBatch,
+    mode: str = QA_MODE,
+    full_check_max_segments: int = QA_FULL_CHECK_MAX_SEGMENTS,
+    sample_budget: int = QA_SAMPLE_BUDGET,
+    target_half_width: float = QA_TARGET_HALF_WIDTH,
+    full_check_below: float = QA_FULL_CHECK_BELOW,
+    seed: Optional[int] = None,
+) -> QualityCheckResult:
+    """
+    Scores the translation of `segment_indexes` with `check_batch`.
+
+    Short documents (and mode "full") are checked in full. Otherwise
+    stratified rounds of segments are checked until the confidence
+    interval of the mean score is narrow enough or the budget is spent;
+    segments with errors widen the interval, so a shaky translation gets
+    a bigger sample. If the sampled score is below `full_check_below`,
+    every segment is checked after all.
+    """
+    population = len(segment_indexes)
+    if mode == "full" or population <= full_check_max_segments:
+        return await _full_check(segment_indexes, check_batch, "full")
+
+    order = stratified_order(segment_indexes, seed=seed)
+    checked: List[int] = []
+    scores: List[float] = []
+    half_width = 1.0
+    while len(checked) < min(sample_budget, population):
+        round_indexes = order[len(checked):min(len(checked) + SAMPLE_ROUND_SIZE, sample_budget, population)]
+        scores.extend(await check_batch(round_indexes))
+        checked.extend(round_indexes)
+        half_width = confidence_half_width(scores, population)
+        if len(checked) >= MIN_SAMPLE_SIZE and half_width <= target_half_width:
+            break
+
+    score = sum(scores) / len(scores)
+    if score < full_check_below:
+        # Bad enough that the customer should get the full list of problems
+        return await _full_check(segment_indexes, check_batch, "sampled+full")
+
+    return QualityCheckResult(
+        mode="sampled",
+        score=score,
+        segments_total=population,
+        segments_checked=len(checked),
+        half_width=half_width,
+        low_scoring_segments=sorted(index for index, segment_score in zip(checked, scores) if segment_score < 1.0),
+    )
+
+
+async def _full_check(segment_indexes: Sequence[int], check_batch: CheckBatch, mode: str) -> QualityCheckResult:
+    scores: List[float] = []
+    for start in range(0, len(segment_indexes), SAMPLE_ROUND_SIZE):
+        scores.extend(await check_batch(list(segment_indexes[start:start + SAMPLE_ROUND_SIZE])))
+    return QualityCheckResult(
+        mode=mode,
+        score=sum(scores) / len(scores) if scores else 1.0,
+        segments_total=len(segment_indexes),
+        segments_checked=len(scores),
+        low_scoring_segments=[index for index, segment_score in zip(segment_indexes, scores) if segment_score < 1.0],
+    )
@@ -0,0 +1,59 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/segments.py
+import difflib
+from typing import Dict, Iterable, List, Optional
+
+# Upper bound on characters sent to the translation backend in one request
+DEFAULT_BATCH_CHARS = 4000
+
+
+def segment_text(text: str) -> List[str]:
+    """
+    Splits extracted text into paragraph segments.
+    extract_text joins paragraphs with newlines, so this is its inverse:
+    join_segments(segment_text(text)) == text. Empty paragraphs are kept
+    so the document layout survives the round trip.
+    """
+    return text.split("\n") if text else []
+
+
+def join_segments(segments: List[str]) -> str:
+    return "\n".join(segments)
+
+
+def batch_segments(segments: List[str], max_chars: int = DEFAULT_BATCH_CHARS, indexes: Optional[Iterable[int]] = None) -> List[List[int]]:
+    """
+    Groups the indexes of non-empty segments into batches of at most
+    `max_chars` characters (a longer single segment gets its own batch).
+    Empty segments are left out; they need no translation.
+    Pass `indexes` to batch only those segments (e.g. the ones that changed).
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_chars = 0
+    for index in (range(len(segments)) if indexes is None else indexes):
+        segment = segments[index]
+        if not segment.strip():
+            continue
+        if current and current_chars + len(segment) > max_chars:
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def diff_segments(previous: List[str], current: List[str]) -> Dict[int, int]:
+    """
+    Aligns the segments of a revised document with the previous version.
+    Returns {current index: previous index} for every paragraph that is
+    unchanged; anything missing from the result was inserted or edited.
+    """
+    matcher = difflib.SequenceMatcher(a=previous, b=current, autojunk=False)
+    unchanged: Dict[int, int] = {}
+    for tag, previous_start, previous_end, current_start, _ in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(previous_end - previous_start):
+                unchanged[current_start + offset] = previous_start + offset
+    return unchanged
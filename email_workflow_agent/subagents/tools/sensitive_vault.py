@@ -0,0 +1,189 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/sensitive_vault.py
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from ...sensitive_store import sensitive_value_store
+
+logger = logging.getLogger(__name__)
+
+# Placeholders look like __DATE_12__: a kind and a per-session sequence number
+PLACEHOLDER_PATTERN = re.compile(r"__([A-Z]+)_(\d+)__")
+
+# Key type: (app_name, user_id, session_id)
+VaultKey = Tuple[str, str, str]
+
+
+class UnknownPlaceholderError(ValueError):
+    """Raised when text holds placeholders its session's vault has no value for."""
+
+    def __init__(self, placeholders):
+        self.placeholders = sorted(set(placeholders))
+        super().__init__(f"No sensitive value for placeholder(s) {', '.join(self.placeholders[:5])}" + (", ..." if len(self.placeholders) > 5 else ""))
+
+
+class SessionVault:
+    """
+    Placeholder <-> sensitive value mapping for one session.
+
+    Placeholder numbers come from one counter per session and are never
+    reused, so two tool calls can't hand out the same placeholder for
+    different values. A value seen again gets its existing placeholder.
+    Every value is kept for as long as the session runs; values added since
+    the vault was last saved are held in `unsaved` until SensitiveVault.save.
+    """
+
+    def __init__(self, key: VaultKey, values: Optional[Dict[str, str]] = None):
+        self.key = key
+        self._values: Dict[str, str] = dict(values or {}) # placeholder -> value
+        self._placeholders: Dict[Tuple[str, str], str] = {} # (kind, value) -> placeholder
+        last_number = 0
+        for placeholder, value in self._values.items():
+            match = PLACEHOLDER_PATTERN.fullmatch(placeholder)
+            self._placeholders[(match.group(1), value)] = placeholder
+            last_number = max(last_number, int(match.group(2)))
+        self._next_number = itertools.count(last_number + 1) # Continues the numbering of a reloaded vault
+        self.unsaved: Dict[str, str] = {}
+        self.last_used = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def placeholder_for(self, kind: str, value: str) -> str:
+        """Returns the placeholder for `value`, allocating one if it's new."""
+        placeholder = self._placeholders.get((kind, value))
+        if placeholder is None:
+            placeholder = f"__{kind}_{next(self._next_number)}__"
+            self._placeholders[(kind, value)] = placeholder
+            self._values[placeholder] = value
+            self.unsaved[placeholder] = value
+        return placeholder
+
+    def value_for(self, placeholder: str) -> Optional[str]:
+        return self._values.get(placeholder)
+
+    def restore(self, text: str) -> str:
+        """
+        Replaces every placeholder in `text` in one pass. Raises
+        UnknownPlaceholderError if any has no value, rather than letting
+        a placeholder through to the customer.
+        """
+        unknown = []
+
+        def replace_match(match):
+            value = self.value_for(match.group(0))
+            if value is None:
+                unknown.append(match.group(0))
+                return match.group(0)
+            return value
+
+        restored = PLACEHOLDER_PATTERN.sub(replace_match, text)
+        if unknown:
+            raise UnknownPlaceholderError(unknown)
+        return restored
+
+
+class SensitiveVault:
+    """
+    Process-wide cache of the per-session vaults, backed by the encrypted
+    sensitive value store (see sensitive_store).
+
+    Kept out of session state, so sensitive values are never sent along
+    with the session's events. New values are saved to the store after each
+    tool call has obfuscated its arguments, so a session resumed after a
+    restart, or redelivered to another worker, restores the same
+    placeholders. When more than `max_sessions` are loaded, the least
+    recently used vault is unloaded from memory and reloaded from the store
+    on next use. A session's values are deleted, in memory and in the
+    store, once its workflow completes or fails, when the session is
+    removed, or after `ttl_seconds` without use.
+    """
+
+    def __init__(
+        self,
+        store=sensitive_value_store,
+        max_sessions: int = int(os.getenv("SENSITIVE_VAULT_MAX_SESSIONS", "1000")),
+        ttl_seconds: float = float(os.getenv("SENSITIVE_VAULT_TTL_SECONDS", "3600")),
+    ):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[VaultKey, SessionVault]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_store_sweep = time.monotonic()
+        self.loaded = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def session(self, app_name: str, user_id: str, session_id: str) -> SessionVault:
+        """Returns the vault for a session, loading it from the store (or creating it) on first use."""
+        key = (app_name, user_id, session_id)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            vault = self._sessions.get(key)
+            if vault is None:
+                vault = self._sessions[key] = SessionVault(key, self.store.load_sensitive_values(*key))
+                if len(vault):
+                    self.loaded += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._unload(next(iter(self._sessions)))
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(key)
+            vault.last_used = now
+            return vault
+
+    def save(self, vault: SessionVault) -> None:
+        """Writes the vault's new values to the store."""
+        with self._lock:
+            self._save(vault)
+
+    def _save(self, vault: SessionVault) -> None:
+        if len(vault):
+            # Also marks the stored vault as used, so the store's TTL counts from now
+            self.store.record_sensitive_values(*vault.key, vault.unsaved)
+            vault.unsaved = {}
+
+    def _unload(self, key: VaultKey) -> None:
+        self._save(self._sessions.pop(key)) # Nothing is lost: it's reloaded from the store on next use
+
+    def evict_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Forgets a session's values, in memory and in the store, once its workflow has completed or failed."""
+        with self._lock:
+            self._sessions.pop((app_name, user_id, session_id), None)
+            self.store.clear_sensitive_values(app_name, user_id, session_id)
+        logger.info(f"[SensitiveVault] Evicted vault for session {session_id[:8]}.")
+
+    def _expire(self, now: float) -> None:
+        # Sessions are kept in least-recently-used order, so expired ones are at the front
+        while self._sessions:
+            key, vault = next(iter(self._sessions.items()))
+            if now - vault.last_used < self.ttl_seconds:
+                break
+            del self._sessions[key]
+            self.store.clear_sensitive_values(*key)
+            self.expired += 1
+        # Stored vaults no process holds any more (e.g. a worker died mid-email) expire in the store
+        if now - self._last_store_sweep >= min(self.ttl_seconds, 60.0):
+            self._last_store_sweep = now
+            self.store.delete_expired(self.ttl_seconds)
+
+    def metrics_snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "values": sum(len(vault) for vault in self._sessions.values()),
+                "sessions_reloaded": self.loaded,
+                "sessions_expired": self.expired,
+                "sessions_evicted": self.evicted,
+            }
+
+
+# Shared by the sensitive data callbacks of every tool in this process
+sensitive_vault = SensitiveVault()
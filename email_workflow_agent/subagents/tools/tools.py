@@ -1,16 +1,102 @@
 # email-agent-workflow/email_workflow_agent/tools/tools.py
+import asyncio
+import codecs
+import copy
+import datetime
+import json
 import os
+import re
 import uuid
 import logging
-import requests # Example for external API calls
-from typing import Any, Dict, Optional, List
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, List, Tuple
 from google.adk.tools import FunctionTool, ToolContext
 from google.genai import types
-# Import the sensitive data handling callbacks
-from .callbacks import handle_sensitive_before, handle_sensitive_after
+# Sensitive data helpers (the callbacks themselves are attached by the agents)
+from .callbacks import identify_and_replace_sensitive_data, session_vault_for
+from .sensitive_vault import sensitive_vault
+from .segments import segment_text, join_segments, batch_segments, diff_segments
+from .qa_sampling import QA_MODE, quality_check
+from .document_cache import ParsedDocument, document_cache, parsed_document_size
+from .attachment_handles import Attachment, attachment_from_part, save_attachment, save_spooled_attachment
+from .docx_stream import DOCX_MIME_TYPE, StreamingDocxWriter
+from .docx_extract import iter_docx_segments, paragraph_elements, paragraph_text, text_parts
+from .language_id import LANGUAGE_NAMES, identify_language, pair_documents, warm_language_profiles
+from .translation_client import translation_client
+from .fuzzy_memory import (
+    FUZZY_MATCH_THRESHOLD, FuzzyMatch, fuzzy_reuse_metrics, match_segments, merge_memory_entries, patch_translation, reference_context,
+)
+from ..review_agent.chunked_review import align_segments, chunked_reviewer
+from ...result_index import hash_attachment_bytes
+from ...rate_limiter import current_tenant
+from ...deadlines import DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
+# --- Parser Libraries ---
+# python-docx and PyPDF2 are slow to import, so they are loaded once per worker:
+# up front by warm_parser_libraries(), or at the latest on the first tool call.
+_parser_classes: Dict[str, Any] = {}
+
+def _docx_document_class():
+    """Returns python-docx's Document class. Raises ImportError if it's not installed."""
+    if "docx" not in _parser_classes:
+        from docx import Document # Requires python-docx
+        _parser_classes["docx"] = Document
+    return _parser_classes["docx"]
+
+def _pdf_reader_class():
+    """Returns PyPDF2's PdfReader class. Raises ImportError if it's not installed."""
+    if "pdf" not in _parser_classes:
+        from PyPDF2 import PdfReader # Requires PyPDF2
+        _parser_classes["pdf"] = PdfReader
+    return _parser_classes["pdf"]
+
+def warm_parser_libraries() -> Dict[str, bool]:
+    """
+    Pre-import hook for workers: loads the document parser libraries (and
+    numpy with the language profiles) once, before the first email, so no
+    request pays for their import.
+    Returns which libraries are available.
+    """
+    available = {}
+    for library, loader in (("python-docx", _docx_document_class), ("PyPDF2", _pdf_reader_class), ("numpy", warm_language_profiles)):
+        try:
+            loader()
+            available[library] = True
+        except ImportError:
+            logger.warning(f"[Tool] {library} not installed; the features that need it are unavailable.")
+            available[library] = False
+    return available
+
+def _parse_document(attachment: Attachment) -> ParsedDocument:
+    """
+    Parses an attachment into text and paragraph segments.
+    DOCX is read by the streaming extractor, which also covers tables,
+    headers, footers and notes; PDF needs PyPDF2 (ImportError otherwise);
+    any other type is decoded as UTF-8 text.
+    The parsers read from the attachment's stream, which for a spooled
+    file is its memory map: no copy of the whole file is made.
+    """
+    segment_ids = ()
+    with attachment.open() as stream:
+        if attachment.mime_type == DOCX_MIME_TYPE:
+            docx_segments = list(iter_docx_segments(stream))
+            segment_ids = tuple(segment.id for segment in docx_segments)
+            text = "\n".join(segment.text for segment in docx_segments)
+            file_format = "docx"
+        elif attachment.mime_type == "application/pdf":
+            PdfReader = _pdf_reader_class()
+            reader = PdfReader(stream) # Reads lazily: the text is extracted while the stream is open
+            text = "".join([page.extract_text() for page in reader.pages if page.extract_text()])
+            file_format = "pdf"
+        else:
+            # Attempt decoding as text if possible (e.g., .txt files or simple encodings)
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+            text = "".join(decoder.decode(chunk) for chunk in attachment.iter_chunks()) + decoder.decode(b"", final=True)
+            file_format = "txt"
+    return ParsedDocument(file_format=file_format, text=text, segments=tuple(segment_text(text)), segment_ids=segment_ids)
+
 # --- Custom Tool Functions ---
 
 # Tool 1: Download and Save Attachments as Artifacts
@@ -23,15 +109,18 @@ async def download_attachments(tool_context: ToolContext) -> Dict[str, Any]:
     Reads from state['initial_attachments'].
     Writes artifact filenames/versions to state['attachment_artifacts'].
     Writes original file format to state['original_file_format'] for later use.
+    Writes content hashes to state['attachment_hashes'] for result deduplication.
     """
     logger.info(f"[Tool] download_attachments called.")
     initial_attachments = tool_context.state.get("initial_attachments", [])
     saved_artifact_details = {}
+    attachment_hashes = {}
     original_file_format = None # Assuming first attachment dictates format
 
     if not initial_attachments:
         logger.warning(f"[Tool] No attachments found in initial state.")
         tool_context.state["attachment_artifacts"] = saved_artifact_details # Save empty dict
+        tool_context.state["attachment_hashes"] = attachment_hashes
         tool_context.state["original_file_format"] = original_file_format
         return {"status": "success", "message": "No attachments to process."}
 
@@ -53,12 +142,13 @@ async def download_attachments(tool_context: ToolContext) -> Dict[str, Any]:
              if original_file_format is None: original_file_format = "pdf"
         # Add other types as needed
 
-        artifact_part = types.Part.from_data(data=dummy_bytes, mime_type=mime_type)
-
         try:
             # Save the artifact using the context method
             # Use original filename, ArtifactService handles versioning and scoping
-            version = await tool_context.save_artifact(filename=filename, artifact=artifact_part)
+            # Large files are spooled to disk; a real download should pass the response
+            # body's chunks here so they are never held in memory whole
+            attachment, version = await save_attachment(tool_context, filename, [dummy_bytes], len(dummy_bytes), mime_type)
+            attachment_hashes[filename] = attachment.content_hash
             saved_artifact_details[filename] = version
             logger.info(f"[Tool] Saved artifact '{filename}' version {version}.")
         except ValueError as e:
@@ -71,6 +161,7 @@ async def download_attachments(tool_context: ToolContext) -> Dict[str, Any]:
 
     # Update state with the names and versions of the saved artifacts
     tool_context.state["attachment_artifacts"] = saved_artifact_details
+    tool_context.state["attachment_hashes"] = attachment_hashes
     # Store the format of the first attachment for later conversion/editing
     tool_context.state["original_file_format"] = original_file_format
 
@@ -82,6 +173,52 @@ download_attachments_tool = FunctionTool(func=download_attachments)
 
 # Tool 2: Extract Text from Document Artifacts
 # This tool is called by the Custom Orchestrator agent
+async def _extract_artifact(tool_context: ToolContext, artifact_name: str, artifact_version: int) -> Tuple[Optional[ParsedDocument], Optional[Dict[str, Any]]]:
+    """Loads and parses one artifact. Returns (parsed document, None), or (None, error response)."""
+    # Load the artifact content
+    artifact_part = await tool_context.load_artifact(filename=artifact_name, version=artifact_version)
+
+    attachment = attachment_from_part(artifact_part)
+    if attachment is None:
+         logger.error(f"[Tool] Failed to load or artifact has no inline data: {artifact_name} v{artifact_version}.")
+         return None, {"status": "error", "message": f"Failed to load artifact {artifact_name} for text extraction."}
+
+    # Extract text based on MIME type
+    mime_type = attachment.mime_type
+    file_kind = {DOCX_MIME_TYPE: "DOCX", "application/pdf": "PDF"}.get(mime_type)
+    if file_kind is None:
+        logger.warning(f"[Tool] Unsupported MIME type for text extraction: {mime_type} for {artifact_name}. Attempting raw text.")
+    else:
+        logger.info(f"[Tool] Extracting text from {file_kind}: {artifact_name}")
+
+    # Repeated stages and identical attachments in other sessions reuse the parse
+    try:
+        parsed = document_cache.get_or_create(
+            "parsed", attachment.content_hash,
+            lambda: _parse_document(attachment),
+            parsed_document_size,
+        )
+    except ImportError:
+        logger.error(f"[Tool] PyPDF2 not installed. Cannot extract text from {file_kind}.")
+        return None, {"status": "error", "message": f"PyPDF2 library not found. Cannot extract text from {file_kind}."}
+    except Exception as e:
+        logger.error(f"[Tool] Error extracting text from {file_kind or mime_type}: {e}")
+        return None, {"status": "error", "message": f"Error extracting text from {file_kind or mime_type}: {e}"}
+
+    outside_body = sum(1 for segment_id in parsed.segment_ids if not segment_id.startswith("word/document.xml#"))
+    logger.info(f"[Tool] Extracted {len(parsed.text)} chars from {file_kind or 'raw text'} ({len(parsed.segments)} segments, {outside_body} from headers, footers and notes).")
+    return parsed, None
+
+def _detect_language(text: str) -> Optional[str]:
+    """Language code of a document, or None if it can't be told (or numpy is missing)."""
+    try:
+        language, margin = identify_language(text)
+    except ImportError:
+        logger.warning("[Tool] numpy not installed. Cannot identify document languages.")
+        return None
+    logger.info(f"[Tool] Detected language {language or 'unknown'} (margin {margin:.3f}).")
+    return language
+
 async def extract_text(tool_context: ToolContext) -> Dict[str, Any]:
     """
     Tool to extract text from document artifacts.
@@ -89,86 +226,68 @@ async def extract_text(tool_context: ToolContext) -> Dict[str, Any]:
     Reads artifact names/versions from state['attachment_artifacts'].
     Loads artifacts, extracts text (handles .docx, .pdf etc.).
     Writes extracted text(s) and potentially original format to state.
+
+    Identifies each document's language from its first few KB and writes
+    state['detected_languages'] ({filename: code}) and state['source_language'].
+    For review emails every attachment is extracted and the files are paired
+    into originals and translations by language (state['document_pairs']);
+    the first pair provides state['extracted_text'] (original),
+    state['translated_text'] and state['review_document_artifact'] (the
+    translation, which is the document that gets edited).
     """
     logger.info(f"[Tool] extract_text called.")
     attachment_artifacts = tool_context.state.get("attachment_artifacts", {})
-    extracted_texts = {} # Use a dict to store text from multiple files if needed
-    original_file_format = None
 
     if not attachment_artifacts:
         logger.warning(f"[Tool] No attachment artifacts found in state.")
         tool_context.state["extracted_text"] = "" # Save empty string
         return {"status": "success", "message": "No artifacts to extract text from."}
 
-    # Assuming we only process the first document attachment for simplicity in this workflow
-    # In a real app, you might need to process multiple documents (e.g., original and translated)
-    first_artifact_name = list(attachment_artifacts.keys())[0]
-    first_artifact_version = attachment_artifacts[first_artifact_name]
+    # Translation requests process the first document attachment; reviews need the
+    # original and the translation, so every attachment is extracted for them
+    is_review = tool_context.state.get("email_type") == "review" and len(attachment_artifacts) > 1
+    artifact_names = list(attachment_artifacts.keys()) if is_review else list(attachment_artifacts.keys())[:1]
 
     try:
-        # Load the artifact content
-        artifact_part = await tool_context.load_artifact(
-            filename=first_artifact_name, version=first_artifact_version
-        )
-
-        if not artifact_part or not artifact_part.inline_data:
-             logger.error(f"[Tool] Failed to load or artifact has no inline data: {first_artifact_name} v{first_artifact_version}.")
-             return {"status": "error", "message": f"Failed to load artifact {first_artifact_name} for text extraction."}
-
-        # Extract text based on MIME type
-        mime_type = artifact_part.inline_data.mime_type
-        file_content_bytes = artifact_part.inline_data.data
-        extracted_text_content = ""
-
-        # --- Placeholder: Text Extraction Logic ---
-        if mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            logger.info(f"[Tool] Extracting text from DOCX: {first_artifact_name}")
-            try:
-                from docx import Document # Requires python-docx
-                from io import BytesIO
-                doc = Document(BytesIO(file_content_bytes))
-                extracted_text_content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                original_file_format = "docx"
-                logger.info(f"[Tool] Extracted {len(extracted_text_content)} chars from DOCX.")
-            except ImportError:
-                logger.error("[Tool] python-docx not installed. Cannot extract text from DOCX.")
-                return {"status": "error", "message": "Python-docx library not found. Cannot extract text from DOCX."}
-            except Exception as e:
-                logger.error(f"[Tool] Error extracting text from DOCX: {e}")
-                return {"status": "error", "message": f"Error extracting text from DOCX: {e}"}
-
-        elif mime_type == "application/pdf":
-             logger.info(f"[Tool] Extracting text from PDF: {first_artifact_name}")
-             try:
-                 from PyPDF2 import PdfReader # Requires PyPDF2
-                 from io import BytesIO
-                 reader = PdfReader(BytesIO(file_content_bytes))
-                 extracted_text_content = "".join([page.extract_text() for page in reader.pages if page.extract_text()])
-                 original_file_format = "pdf"
-                 logger.info(f"[Tool] Extracted {len(extracted_text_content)} chars from PDF.")
-             except ImportError:
-                 logger.error("[Tool] PyPDF2 not installed. Cannot extract text from PDF.")
-                 return {"status": "error", "message": "PyPDF2 library not found. Cannot extract text from PDF."}
-             except Exception as e:
-                 logger.error(f"[Tool] Error extracting text from PDF: {e}")
-                 return {"status": "error", "message": f"Error extracting text from PDF: {e}"}
-        else:
-            logger.warning(f"[Tool] Unsupported MIME type for text extraction: {mime_type} for {first_artifact_name}. Attempting raw text.")
-            try:
-                 # Attempt decoding as text if possible (e.g., .txt files or simple encodings)
-                 extracted_text_content = file_content_bytes.decode('utf-8', errors='ignore')
-                 original_file_format = "txt" # Assume if decode works
-                 logger.info(f"[Tool] Decoded {len(extracted_text_content)} chars as text.")
-            except Exception as e:
-                 logger.error(f"[Tool] Failed to decode content as text: {e}")
-                 return {"status": "error", "message": f"Unsupported file type for text extraction: {mime_artifact.mime_type}"}
-        # --- End Placeholder ---
+        parsed_documents: Dict[str, ParsedDocument] = {}
+        for artifact_name in artifact_names:
+            parsed, error = await _extract_artifact(tool_context, artifact_name, attachment_artifacts[artifact_name])
+            if error:
+                return error
+            parsed_documents[artifact_name] = parsed
+        detected_languages = {name: _detect_language(parsed.text) for name, parsed in parsed_documents.items()}
+        tool_context.state["detected_languages"] = detected_languages
+
+        first_artifact_name = artifact_names[0]
+        original_name, pairs = first_artifact_name, []
+        if is_review:
+            requested = tool_context.state.get("target_languages") or [tool_context.state.get("target_language")]
+            pairs = pair_documents(detected_languages, [language for language in requested if language])
+            if pairs:
+                original_name, translation_name = pairs[0]["original"], pairs[0]["translation"]
+                logger.info(f"[Tool] Paired original '{original_name}' ({pairs[0]['source_language']}) with translation '{translation_name}' ({pairs[0]['target_language']}).")
+                tool_context.state["translated_text"] = parsed_documents[translation_name].text
+                tool_context.state["target_language"] = LANGUAGE_NAMES.get(pairs[0]["target_language"], pairs[0]["target_language"])
+                tool_context.state["review_document_artifact"] = {
+                    "artifact_name": translation_name, "artifact_version": attachment_artifacts[translation_name],
+                }
+            else:
+                logger.warning(f"[Tool] Could not tell the original from the translation by language; using '{first_artifact_name}' as the original.")
+        tool_context.state["document_pairs"] = pairs
 
         # Save the extracted text (and original format) to state
-        tool_context.state["extracted_text"] = extracted_text_content
-        tool_context.state["original_file_format"] = original_file_format
-
-        return {"status": "success", "message": f"Text extracted from {first_artifact_name}.", "extracted_char_count": len(extracted_text_content)}
+        tool_context.state["extracted_text"] = parsed_documents[original_name].text
+        tool_context.state["original_file_format"] = parsed_documents[original_name].file_format
+        if detected_languages.get(original_name):
+            tool_context.state["source_language"] = detected_languages[original_name]
+
+        return {
+            "status": "success",
+            "message": f"Text extracted from {', '.join(artifact_names)}.",
+            "extracted_char_count": len(parsed_documents[original_name].text),
+            "detected_languages": detected_languages,
+            "document_pairs": pairs,
+        }
 
     except Exception as e:
         logger.error(f"[Tool] Unexpected error during text extraction: {e}")
@@ -180,39 +299,25 @@ extract_text_tool = FunctionTool(func=extract_text)
 
 # Tool 3: Translate Text (Applies Sensitive Data Callbacks)
 # Called by TranslationWorkflowAgent
-# Attach the sensitive data callbacks to this tool
-async def translate_text(tool_context: ToolContext, text: str, target_language: str = "French") -> Dict[str, Any]:
+# Its agent attaches the sensitive data callbacks (tools can't carry their own)
+async def translate_text(tool_context: ToolContext, text: str, target_language: str = "French", source_language: Optional[str] = None) -> Dict[str, Any]:
     """
     Tool to translate text using an external API.
-    Sensitive data handling callbacks are attached to this tool.
+    Its agent runs the sensitive data handling callbacks around it.
 
     Reads text argument (may contain placeholders).
     Reads target_language argument.
+    Reads source_language argument, or else the language extract_text
+    detected (state['source_language']), or else assumes English.
     Returns translated text (may contain placeholders initially).
     """
-    logger.info(f"[Tool] translate_text called for {len(text)} chars to {target_language}.")
+    source_language = source_language or tool_context.state.get("source_language") or "en"
+    logger.info(f"[Tool] translate_text called for {len(text)} chars from {source_language} to {target_language}.")
 
-    # --- Placeholder: Call External Translation API ---
     try:
-        # In a real app, you'd call an API like Google Cloud Translation, DeepL, etc.
-        # Example using requests (install it first: pip install requests)
-        # api_url = "https://translation.googleapis.com/language/translate/v2" # Example
-        # api_key = os.getenv("TRANSLATION_API_KEY") # Get from .env
-        # if not api_key:
-        #     logger.error("[Tool] TRANSLATION_API_KEY not set.")
-        #     return {"status": "error", "message": "Translation API key not configured."}
-        #
-        # response = requests.post(api_url, params={'key': api_key}, json={
-        #     'q': text,
-        #     'target': target_language,
-        #     'source': 'en', # Assuming source is always English based on prompt
-        # })
-        # response.raise_for_status() # Raise an exception for bad status codes
-        # result = response.json()
-        # translated_text_content = result['data']['translations'][0]['translatedText']
-
-        # Simulate translation (placeholders are carried through)
-        translated_text_content = f"Translated: {text} (to {target_language})" # Placeholders like __VAR_1__ will be here
+        # The shared client holds the backend call (simulated for now) and the
+        # process-wide request limit
+        translated_text_content = (await translation_client.translate_batch([text], target_language, source_language))[0] # Placeholders like __VAR_1__ will be here
 
         logger.info(f"[Tool] Simulated translation.")
         return {"status": "success", "translated_text": translated_text_content}
@@ -220,99 +325,674 @@ async def translate_text(tool_context: ToolContext, text: str, target_language:
     except Exception as e:
         logger.error(f"[Tool] Error calling translation API: {e}")
         return {"status": "error", "message": f"Translation failed: {e}"}
-    # --- End Placeholder ---
 
-# Wrap the tool function and ATTACH THE SENSITIVE DATA CALLBACKS
-translate_text_tool = FunctionTool(
-    func=translate_text,
-    before_tool_callback=handle_sensitive_before, # Apply sensitive data handler before
-    after_tool_callback=handle_sensitive_after,   # Apply sensitive data handler after
-)
+# The agent that owns this tool runs the sensitive data callbacks (see callbacks.py)
+translate_text_tool = FunctionTool(func=translate_text)
+
+
+# --- Segment Memory ---
+# The source segments and translations of the last version of each document
+# are kept per sender, so a revised version only translates what changed.
+# Stored with placeholders in place of sensitive values: a reused segment is
+# identical, placeholders included, so its translation stays consistent.
+SEGMENT_MEMORY_MIME_TYPE = "application/json"
+
+def _segment_memory_filename(state) -> Optional[str]:
+    """User-scoped artifact name for (sender, document), or None if either is unknown."""
+    sender_email = state.get("email_sender_email")
+    original_filename = (state.get("initial_attachments") or [None])[0]
+    if not sender_email or not isinstance(original_filename, str):
+        return None
+    safe_name = re.sub(r"[^A-Za-z0-9._@-]+", "_", f"{sender_email}/{original_filename}")
+    # The "user:" prefix makes the artifact visible to later sessions
+    return f"user:segment_memory/{safe_name}.json"
+
+async def _load_segment_memory(tool_context: ToolContext, filename: str) -> Dict[str, Any]:
+    """Returns the stored segments of the previous version, or {} if there is none."""
+    try:
+        memory_part = await tool_context.load_artifact(filename=filename)
+        if memory_part and memory_part.inline_data:
+            return json.loads(memory_part.inline_data.data)
+    except Exception as e:
+        # A missing or unreadable memory only means everything is translated again
+        logger.warning(f"[Tool] Could not load segment memory '{filename}': {e}")
+    return {}
+
+def _merge_segment_memory(
+    memory: Dict[str, Any], source_language: str, segments: List[str], translations: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """
+    The segment memory after translating `segments`: this version's segments
+    with their new `translations` ({language: translated segments}), plus the
+    stored translations into languages that weren't requested this time,
+    carried over for the segments that didn't change (None where they did).
+    """
+    merged = dict(translations)
+    if memory.get("source_language") == source_language:
+        unchanged = diff_segments(memory.get("segments", []), segments)
+        for language, previous in memory.get("translations", {}).items():
+            if language in merged:
+                continue
+            carried = [None] * len(segments)
+            for index, previous_index in unchanged.items():
+                carried[index] = previous[previous_index]
+            if any(translated is not None for translated in carried):
+                merged[language] = carried
+    return {"source_language": source_language, "segments": segments, "translations": merged}
+
+async def _save_segment_memory(tool_context: ToolContext, filename: str, memory: Dict[str, Any]) -> None:
+    """
+    Stores `memory` as the artifact's only version. Retention never removes
+    user: artifacts, so superseded versions are deleted here instead of piling up.
+    """
+    data = json.dumps(memory).encode("utf-8")
+    invocation_context = tool_context._invocation_context
+    try:
+        if invocation_context.artifact_service is not None:
+            await invocation_context.artifact_service.delete_artifact(
+                app_name=invocation_context.app_name,
+                user_id=invocation_context.user_id,
+                session_id=invocation_context.session.id,
+                filename=filename,
+            )
+        await tool_context.save_artifact(
+            filename=filename,
+            artifact=types.Part.from_bytes(data=data, mime_type=SEGMENT_MEMORY_MIME_TYPE),
+        )
+    except Exception as e:
+        logger.warning(f"[Tool] Could not save segment memory '{filename}': {e}")
+
+# One update at a time per memory artifact in this process: concurrent sessions
+# of a customer then add to each other's memory instead of overwriting it
+_memory_update_locks: Dict[str, asyncio.Lock] = {}
+
+async def _update_segment_memory(tool_context: ToolContext, filename: str, update: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+    """Saves `update(memory)`, reading the memory again under the artifact's lock so no other session's update is lost."""
+    async with _memory_update_locks.setdefault(filename, asyncio.Lock()):
+        await _save_segment_memory(tool_context, filename, update(await _load_segment_memory(tool_context, filename)))
+
+# --- Fuzzy Segment Memory ---
+# Every translated segment of a customer's documents (customer = the sender's
+# domain, as for the rate limiter), per source language. A new segment that
+# is a near-duplicate of one of them, or of an earlier segment of the same
+# document, reuses its translation with the differing tokens patched, or is
+# sent with it as context. Stored with placeholders, like the segment memory.
+
+def _fuzzy_memory_filename(source_language: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9._@-]+", "_", f"{current_tenant.get()}/{source_language}")
+    return f"user:fuzzy_memory/{safe_name}.json"
+
+def _fuzzy_matches(segments: List[str], memory_entries: List[Dict[str, Any]]) -> Dict[int, FuzzyMatch]:
+    """Near-duplicate of each segment, or {} if fuzzy reuse is off or numpy is missing."""
+    if FUZZY_MATCH_THRESHOLD <= 0:
+        return {}
+    try:
+        return match_segments(segments, memory_entries)
+    except ImportError:
+        logger.warning("[Tool] numpy not installed. Cannot reuse translations of similar segments.")
+        return {}
+
+
+# Tool 3b: Translate Text into Several Languages (Applies Sensitive Data Callbacks)
+# Called by TranslationWorkflowAgent
+async def translate_to_languages(tool_context: ToolContext, text: str, target_languages: List[str], source_language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tool to translate text into several target languages at once.
+    Its agent runs the sensitive data handling callbacks around it.
+
+    Segments the text once and reuses the segments for every language.
+    If the same sender sent an earlier version of this document, only the
+    paragraphs that were inserted or changed since then are translated;
+    the rest reuse their previous translations. A paragraph that is a near
+    duplicate of one translated before (for the same customer, or earlier
+    in this document) reuses that translation with the differing numbers,
+    names and placeholders patched, or else is sent with it as context.
+    All languages are translated concurrently; the shared translation
+    client keeps the total request rate within its limit. Each language's
+    Word document is written while its batches come back, so it is ready
+    when the translation is (state['streamed_documents']).
+    The source language defaults to the one extract_text detected
+    (state['source_language']), then to English.
+    Writes state['translated_texts'] ({language: text}), for the steps
+    that handle a single translation state['translated_text'] (first language),
+    and state['translation_reuse'] (segment counts and reuse rate).
+    """
+    target_languages = [language for language in target_languages if language] or ["French"]
+    source_language = source_language or tool_context.state.get("source_language") or "en"
+    logger.info(f"[Tool] translate_to_languages called for {len(text)} chars from {source_language} to {', '.join(target_languages)}.")
+
+    # One segmentation pass shared by all languages
+    segments = segment_text(text)
+
+    # Diff against the previous version's segments from the same sender
+    memory_filename = _segment_memory_filename(tool_context.state)
+    memory = await _load_segment_memory(tool_context, memory_filename) if memory_filename else {}
+    if memory.get("source_language") != source_language:
+        memory = {}
+    unchanged = diff_segments(memory.get("segments", []), segments) if memory else {}
+    previous_translations = memory.get("translations", {})
+
+    # Near-duplicates among the customer's translated segments and within this document
+    fuzzy_filename = _fuzzy_memory_filename(source_language)
+    fuzzy_entries = (await _load_segment_memory(tool_context, fuzzy_filename)).get("entries", [])
+    fuzzy_matches = await asyncio.to_thread(_fuzzy_matches, segments, fuzzy_entries) # Hashes every stored segment
+    fuzzy_counts = {"candidates": 0, "patched": 0, "with_context": 0}
+
+    # The documents get the real values; placeholders only exist for the translation backend
+    session_vault = session_vault_for(tool_context)
+    writers: Dict[str, StreamingDocxWriter] = {}
+    reused_counts: Dict[str, int] = {}
+
+    async def translate_language(target_language: str) -> List[str]:
+        writer = writers[target_language] = StreamingDocxWriter(len(segments))
+        translated_segments = list(segments) # Empty segments pass through untranslated
+        previous = previous_translations.get(target_language)
+        if previous:
+            # A language carried over from an earlier request has no translation (None) for segments changed since
+            reused = {index: previous[previous_index] for index, previous_index in unchanged.items() if previous[previous_index] is not None}
+            for index, translated in reused.items():
+                translated_segments[index] = translated
+            reused_counts[target_language] = len(reused)
+            changed = [index for index in range(len(segments)) if index not in reused]
+        else:
+            changed = None # No earlier translation into this language; translate it all
+        to_translate = [index for index in (range(len(segments)) if changed is None else changed) if segments[index].strip()]
+        fuzzy_counts["candidates"] += len(to_translate)
+
+        # Near-duplicates: patch their translation, or send the segment with it as context.
+        # A segment whose match is still being translated waits for it.
+        contexts: Dict[int, str] = {}
+        waiting: Dict[int, List[int]] = {} # Leader index -> segments matching it
+        to_send = []
+
+        def reuse(index: int, matched_source: str, matched_translation: str) -> bool:
+            """Patches the match's translation in if possible, else attaches it as context. True if patched."""
+            patched = patch_translation(segments[index], matched_source, matched_translation)
+            if patched is not None:
+                translated_segments[index] = patched
+                fuzzy_counts["patched"] += 1
+                return True
+            contexts[index] = reference_context(matched_source, matched_translation)
+            fuzzy_counts["with_context"] += 1
+            return False
+
+        sending = set(to_translate)
+        for index in to_translate:
+            match = fuzzy_matches.get(index)
+            if match is not None and match.leader is not None and match.leader in sending:
+                waiting.setdefault(match.leader, []).append(index)
+                continue
+            if match is not None and match.leader is not None:
+                reference = translated_segments[match.leader] # Reused from the previous version
+            else:
+                reference = match.translations.get(target_language) if match is not None else None
+            if reference is None or not reuse(index, match.source, reference):
+                to_send.append(index)
+
+        # Segments that aren't sent to the backend (or waiting for a match) are final already
+        pending_indexes = set(to_send) | {index for followers in waiting.values() for index in followers}
+        for index, segment in enumerate(translated_segments):
+            if index not in pending_indexes:
+                writer.add(index, session_vault.restore(segment))
+
+        async def translate_batch(batch: List[int]):
+            batch_contexts = [contexts.get(i) for i in batch]
+            return batch, await translation_client.translate_batch(
+                [segments[i] for i in batch], target_language, source_language,
+                contexts=batch_contexts if any(batch_contexts) else None,
+            )
+
+        # Batches come back in any order; the writer puts their paragraphs in place.
+        # Segments that waited for one of them and can't be patched go out as new batches.
+        batch_tasks = [asyncio.ensure_future(translate_batch(batch)) for batch in batch_segments(segments, indexes=to_send)]
+        pending = set(batch_tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished_batch in done:
+                    batch, translated_batch = finished_batch.result()
+                    follow_ups = []
+                    for index, translated_segment in zip(batch, translated_batch):
+                        translated_segments[index] = translated_segment
+                        writer.add(index, session_vault.restore(translated_segment))
+                        for follower in waiting.pop(index, ()):
+                            if reuse(follower, segments[index], translated_segment):
+                                writer.add(follower, session_vault.restore(translated_segments[follower]))
+                            else:
+                                follow_ups.append(follower)
+                    for follow_up_batch in batch_segments(segments, indexes=follow_ups):
+                        batch_tasks.append(asyncio.ensure_future(translate_batch(follow_up_batch)))
+                        pending.add(batch_tasks[-1])
+        finally:
+            # A failed batch, or a cancelled stage, stops the batches still in flight
+            for task in batch_tasks:
+                task.cancel()
+        return translated_segments
+
+    language_tasks = [asyncio.ensure_future(translate_language(language)) for language in target_languages]
+    try:
+        translations = await asyncio.gather(*language_tasks)
+    except BaseException as e:
+        for task in language_tasks:
+            task.cancel()
+        await asyncio.gather(*language_tasks, return_exceptions=True) # Stopped before their documents are discarded
+        for writer in writers.values():
+            writer.abort()
+        if not isinstance(e, Exception) or isinstance(e, DeadlineExceeded):
+            raise # Out of time: the orchestrator ends the workflow with a partial-failure event
+        logger.error(f"[Tool] Error calling translation API: {e}")
+        return {"status": "error", "message": f"Translation failed: {e}"}
+
+    if memory_filename:
+        await _update_segment_memory(
+            tool_context, memory_filename,
+            lambda current: _merge_segment_memory(current, source_language, segments, dict(zip(target_languages, translations))),
+        )
+    if FUZZY_MATCH_THRESHOLD > 0:
+        await _update_segment_memory(
+            tool_context, fuzzy_filename,
+            lambda current: {"entries": merge_memory_entries(current.get("entries", []), segments, dict(zip(target_languages, translations)))},
+        )
+
+    translated_texts = {language: join_segments(translated) for language, translated in zip(target_languages, translations)}
+
+    # convert_translations_to_word reuses these as long as the text is unchanged
+    streamed_documents = {}
+    for target_language in target_languages:
+        try:
+            handle = await asyncio.to_thread(writers[target_language].finish)
+            output_filename = _translated_document_filename(tool_context.state, target_language)
+            _, version = await save_spooled_attachment(tool_context, output_filename, handle)
+        except Exception as e:
+            # Not fatal: the conversion step builds the document from the text instead
+            logger.warning(f"[Tool] Could not save the streamed {target_language} document: {e}")
+            continue
+        streamed_documents[target_language] = {
+            "artifact_name": output_filename,
+            "artifact_version": version,
+            "text_hash": hash_attachment_bytes(session_vault.restore(translated_texts[target_language]).encode("utf-8")),
+        }
+    reused_segments = sum(reused_counts.values())
+    fuzzy_reuse_metrics.record(fuzzy_counts["candidates"], fuzzy_counts["patched"], fuzzy_counts["with_context"])
+    translation_reuse = {
+        "segments": len(segments) * len(target_languages),
+        "reused_segments": reused_segments,
+        "fuzzy_patched_segments": fuzzy_counts["patched"],
+        "fuzzy_context_segments": fuzzy_counts["with_context"],
+    }
+    translation_reuse["reuse_rate"] = (
+        (reused_segments + fuzzy_counts["patched"]) / translation_reuse["segments"] if translation_reuse["segments"] else 0.0
+    )
+    # The after-tool callback restores sensitive values in these state keys too
+    tool_context.state["translated_texts"] = translated_texts
+    tool_context.state["translated_text"] = translated_texts[target_languages[0]]
+    tool_context.state["translation_reuse"] = translation_reuse
+    tool_context.state["streamed_documents"] = streamed_documents
+    logger.info(
+        f"[Tool] Translated {len(segments)} segments into {len(translated_texts)} languages "
+        f"({reused_segments} of {translation_reuse['segments']} reused from the previous version, "
+        f"{fuzzy_counts['patched']} patched from similar segments, {fuzzy_counts['with_context']} sent with a similar one as context)."
+    )
+    return {"status": "success", "translated_texts": translated_texts}
+
+# The agent that owns this tool runs the sensitive data callbacks (see callbacks.py)
+translate_to_languages_tool = FunctionTool(func=translate_to_languages)
 
 
 # Tool 4: Check Translation Quality (Applies Sensitive Data Callbacks)
 # Called by TranslationWorkflowAgent or ReviewWorkflowAgent
-# Attach the sensitive data callbacks to this tool
+# Its agent attaches the sensitive data callbacks (tools can't carry their own)
+PLACEHOLDER_PATTERN = re.compile(r"__[A-Z]+_\d+__")
+
+
+def _simulated_segment_score(original_segment: str, translated_segment: str) -> float:
+    """
+    Stand-in for the check backend's per-segment score (1.0 = no problem found).
+    Flags untranslated segments, lost or invented placeholders, and
+    translations far shorter or longer than their source.
+    """
+    if not translated_segment.strip():
+        return 0.0
+    if sorted(PLACEHOLDER_PATTERN.findall(original_segment)) != sorted(PLACEHOLDER_PATTERN.findall(translated_segment)):
+        return 0.0
+    length_ratio = len(translated_segment) / max(1, len(original_segment))
+    if not 0.5 <= length_ratio <= 2.0:
+        return 0.5
+    return 1.0
+
+
+async def _check_quality(original_text: str, translated_text: str) -> Dict[str, Any]:
+    """
+    Checks one translation against its original segment by segment (see
+    check_translation). Returns the score (0-100), the QA mode used, the
+    segment counts, and up to five original segments that need attention.
+    """
+    original_segments = segment_text(original_text)
+    translated_segments = segment_text(translated_text)
+    # translate_to_languages keeps one output segment per input segment; if that no longer
+    # holds (e.g. the text was edited), there is nothing to align, so check it all
+    aligned = len(original_segments) == len(translated_segments)
+    if not aligned:
+        translated_segments = (translated_segments + [""] * len(original_segments))[:len(original_segments)]
+    segment_indexes = [index for index, segment in enumerate(original_segments) if segment.strip()]
+
+    async def check_batch(indexes: List[int]) -> List[float]:
+        # Scored locally, so nothing is taken from the translation API's quota. A real check
+        # backend shares that quota: its call belongs inside translation_rate_limiter.permit()
+        return [_simulated_segment_score(original_segments[i], translated_segments[i]) for i in indexes]
+
+    result = await quality_check(segment_indexes, check_batch, mode=QA_MODE if aligned else "full")
+    return {
+        "score": round(result.score * 100),
+        "qa_mode": result.mode,
+        "segments_checked": result.segments_checked,
+        "segments_total": result.segments_total,
+        "segments_flagged": len(result.low_scoring_segments),
+        # Placeholders in the flagged segments are carried through; the after-tool callback restores them
+        "flagged": [original_segments[i] for i in result.low_scoring_segments[:5]],
+    }
+
+def _quality_feedback_text(check: Dict[str, Any]) -> str:
+    return (
+        f"Quality check feedback ({check['qa_mode']}, {check['segments_checked']} of {check['segments_total']} segments checked): "
+        + (f"{check['segments_flagged']} segments need attention, e.g. {check['flagged']}. " if check["flagged"] else "no problems found. ")
+        + f"Score: {check['score']}/100."
+    )
+
+
 async def check_translation(tool_context: ToolContext, original_text: str, translated_text: str) -> Dict[str, Any]:
     """
     Tool to check the quality and accuracy of translated text against the original.
-    Sensitive data handling callbacks are attached to this tool.
+    Its agent runs the sensitive data handling callbacks around it.
 
     Reads original_text argument (may contain placeholders).
     Reads translated_text argument (may contain placeholders).
     Returns feedback/score (may contain placeholders initially).
+
+    Short documents are checked segment by segment in full. Longer ones
+    get a stratified sample of aligned segments that grows until the
+    score is known precisely enough (see qa_sampling); a low sampled
+    score triggers a full check. QA_MODE=full always checks everything.
     """
     logger.info(f"[Tool] check_translation called for {len(original_text)} vs {len(translated_text)} chars.")
 
-    # --- Placeholder: Translation Quality Check Logic ---
     try:
-        # In a real app, you might use:
-        # - Another LLM call specifically for evaluation
-        # - NLP libraries for similarity scores
-        # - Comparison against a Translation Memory (TM)
-        # The texts passed here will have sensitive data replaced by placeholders *if* the callback ran.
+        check = await _check_quality(original_text, translated_text)
+        # Leave the confidence for the model router: low scores escalate later steps
+        tool_context.state["step_confidence"] = check["score"] / 100
+
+        logger.info(f"[Tool] Quality check ({check['qa_mode']}) scored {check['score']}/100 on {check['segments_checked']}/{check['segments_total']} segments.")
+        return {
+            "status": "success",
+            "feedback_text": _quality_feedback_text(check),
+            "score": check["score"],
+            "qa_mode": check["qa_mode"],
+            "segments_checked": check["segments_checked"],
+            "segments_total": check["segments_total"],
+        }
+
+    except Exception as e:
+        logger.error(f"[Tool] Error during translation quality check: {e}")
+        return {"status": "error", "message": f"Quality check failed: {e}"}
 
-        # Simulate quality check feedback (placeholders are carried through)
-        feedback_text = f"Quality check feedback: The translation seems reasonable, but pay attention to terms like {translated_text.split(' ')[-1]} (from original {original_text.split(' ')[-1]}). Score: 85/100."
-        # Placeholders like __VAR_1__ will be in original_text/translated_text args
-        # and potentially generated in feedback_text by the simulation here.
+# The agent that owns this tool runs the sensitive data callbacks (see callbacks.py)
+check_translation_tool = FunctionTool(func=check_translation)
 
-        logger.info(f"[Tool] Simulated quality check.")
-        return {"status": "success", "feedback_text": feedback_text, "score": 85} # Example structure
 
+# Tool 4a: Check Every Translation of a Multi-Language Request (Applies Sensitive Data Callbacks)
+# Called by TranslationWorkflowAgent
+async def check_translations(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Tool to check each translation in state['translated_texts'] against the
+    original in state['extracted_text'], like check_translation does for one.
+    Its agent runs the sensitive data handling callbacks around it.
+
+    The texts are read from state (with their real values), so the tool
+    masks them with the session's placeholders itself before checking.
+    Languages are checked concurrently. Writes state['translation_quality']
+    ({language: score and segment counts}) and the lowest score as
+    state['step_confidence']. Returns per-language feedback (may contain placeholders).
+    """
+    original_text = tool_context.state.get("extracted_text") or ""
+    translated_texts = tool_context.state.get("translated_texts") or {}
+    if not translated_texts and tool_context.state.get("translated_text"):
+        translated_texts = {tool_context.state.get("target_language") or "translation": tool_context.state["translated_text"]}
+    if not original_text or not translated_texts:
+        return {"status": "error", "message": "No original text or translations in state to check."}
+    logger.info(f"[Tool] check_translations called for {len(original_text)} chars in {len(translated_texts)} languages.")
+
+    try:
+        session_vault = session_vault_for(tool_context)
+        masked_original = identify_and_replace_sensitive_data(original_text, session_vault)
+        languages = list(translated_texts)
+        checks = await asyncio.gather(*(
+            _check_quality(masked_original, identify_and_replace_sensitive_data(translated_texts[language], session_vault))
+            for language in languages
+        ))
+        sensitive_vault.save(session_vault)
     except Exception as e:
         logger.error(f"[Tool] Error during translation quality check: {e}")
         return {"status": "error", "message": f"Quality check failed: {e}"}
-    # --- End Placeholder ---
 
-# Wrap the tool function and ATTACH THE SENSITIVE DATA CALLBACKS
-check_translation_tool = FunctionTool(
-    func=check_translation,
-    before_tool_callback=handle_sensitive_before, # Apply sensitive data handler before
-    after_tool_callback=handle_sensitive_after,   # Apply sensitive data handler after
-)
+    by_language = dict(zip(languages, checks))
+    lowest_score = min(check["score"] for check in checks)
+    # Leave the confidence for the model router: the weakest translation decides escalation
+    tool_context.state["step_confidence"] = lowest_score / 100
+    tool_context.state["translation_quality"] = {
+        language: {key: check[key] for key in ("score", "qa_mode", "segments_checked", "segments_total", "segments_flagged")}
+        for language, check in by_language.items()
+    }
+    scores = {language: check["score"] for language, check in by_language.items()}
+    logger.info(f"[Tool] Quality checks scored {scores} (lowest {lowest_score}/100).")
+    return {
+        "status": "success",
+        "feedback_text": "\n".join(f"{language}: {_quality_feedback_text(check)}" for language, check in by_language.items()),
+        "score": lowest_score,
+        "scores": scores,
+    }
+
+# The agent that owns this tool runs the sensitive data callbacks, which restore the feedback
+check_translations_tool = FunctionTool(func=check_translations)
+
+
+# Tool 4b: Review a Translation Chunk by Chunk (Applies Sensitive Data Callbacks)
+# Called by ReviewWorkflowAgent
+async def review_translation(tool_context: ToolContext, original_text: str, translated_text: str) -> Dict[str, Any]:
+    """
+    Tool to review a translation against its original and plan the edits.
+    Its agent runs the sensitive data handling callbacks around it.
+
+    Aligns the paragraphs of both texts, reviews chunks of aligned
+    paragraphs concurrently, and merges the results into one edit plan.
+    Writes state['review_edit_plan']: a list of
+    {"paragraph", "current", "replacement", "reason"} ordered by paragraph,
+    where "paragraph" is the index of the paragraph in the translation.
+    """
+    logger.info(f"[Tool] review_translation called for {len(original_text)} vs {len(translated_text)} chars.")
+
+    try:
+        pairs = align_segments(segment_text(original_text), segment_text(translated_text))
+        plan, failed_chunks = await chunked_reviewer.review(pairs, confidence=tool_context.state.get("step_confidence"))
+    except Exception as e:
+        logger.error(f"[Tool] Error during translation review: {e}")
+        return {"status": "error", "message": f"Translation review failed: {e}"}
+
+    # The after-tool callback restores sensitive values in the plan
+    tool_context.state["review_edit_plan"] = plan
+    summary = "; ".join(f"paragraph {edit['paragraph']}: {edit['reason']}" for edit in plan[:10])
+    if len(plan) > 10:
+        summary += f"; and {len(plan) - 10} more"
+    return {
+        "status": "success" if not failed_chunks else "partial",
+        "edits": len(plan),
+        "paragraphs_reviewed": len(pairs),
+        "failed_chunks": failed_chunks,
+        "summary": summary or "No edits needed.",
+    }
+
+# The agent that owns this tool runs the sensitive data callbacks (see callbacks.py)
+review_translation_tool = FunctionTool(func=review_translation)
+
+
+# --- Tracked Changes ---
+REVISION_AUTHOR = "Translation Review"
+
+def _apply_tracked_replacement(p, replacement: str, revision_id: int, revision_date: str) -> None:
+    """
+    Replaces a w:p element's text as a tracked change: the
+    current runs are wrapped in <w:del> and the replacement is added in a
+    <w:ins> run carrying the first run's formatting.
+    """
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    def revision(tag: str, offset: int):
+        element = OxmlElement(tag)
+        element.set(qn("w:id"), str(revision_id + offset))
+        element.set(qn("w:author"), REVISION_AUTHOR)
+        element.set(qn("w:date"), revision_date)
+        return element
+
+    runs = p.findall(qn("w:r"))
+    deletion = revision("w:del", 0)
+    for run in runs:
+        p.remove(run)
+        for text in run.findall(qn("w:t")):
+            text.tag = qn("w:delText") # Deleted text must be in delText to show as a deletion
+        deletion.append(run)
+
+    new_run = OxmlElement("w:r")
+    if runs and runs[0].find(qn("w:rPr")) is not None:
+        new_run.append(copy.deepcopy(runs[0].find(qn("w:rPr"))))
+    new_text = OxmlElement("w:t")
+    new_text.set(qn("xml:space"), "preserve")
+    new_text.text = replacement
+    new_run.append(new_text)
+    insertion = revision("w:ins", 1)
+    insertion.append(new_run)
+
+    if runs:
+        p.append(deletion)
+    p.append(insertion)
+
+
+class _BlobPartEdits:
+    """
+    Parts python-docx only holds as bytes (footnotes, endnotes) are parsed
+    for editing; the ones that were edited are serialized back on store().
+    """
+
+    def __init__(self):
+        self.elements: Dict[Any, Any] = {}
+        self.touched = set()
+
+    def touch(self, part) -> None:
+        if part in self.elements:
+            self.touched.add(part)
+
+    def store(self) -> None:
+        from docx.opc.oxml import serialize_part_xml
+        for part in self.touched:
+            part._blob = serialize_part_xml(self.elements[part]) # python-docx has no setter for a plain part's content
+
+def _segment_paragraphs(doc) -> Tuple[List[Tuple[Any, Any]], _BlobPartEdits]:
+    """
+    The (part, w:p element) of every paragraph of a python-docx Document,
+    in the order extract_text lists its segments, so a segment index is a
+    paragraph index here.
+    """
+    from docx.opc.part import XmlPart
+    from docx.oxml import parse_xml
+
+    parts = {str(part.partname).lstrip("/"): part for part in doc.part.package.iter_parts()}
+    blob_parts = _BlobPartEdits()
+    paragraphs = []
+    for part_name in text_parts(parts):
+        part = parts[part_name]
+        if isinstance(part, XmlPart):
+            root = part.element
+        else:
+            root = blob_parts.elements[part] = parse_xml(part.blob)
+        paragraphs.extend((part, p) for p in paragraph_elements(root))
+    return paragraphs, blob_parts
+
+
+# python-docx's object model takes several times the file's size in memory
+DOCX_MODEL_SIZE_FACTOR = 8
+
+def _load_docx_model(attachment):
+    """
+    A private copy of the python-docx Document for `attachment`. The parsed
+    model is cached by content hash (re-reviews of the same document skip
+    the parse); every caller gets a deep copy, since editing changes it.
+    Raises ImportError without python-docx.
+    """
+    def parse():
+        Document = _docx_document_class()
+        with attachment.open() as stream:
+            return Document(stream)
+
+    cached = document_cache.get_or_create(
+        "docx_model", attachment.content_hash, parse, lambda _: DOCX_MODEL_SIZE_FACTOR * attachment.size
+    )
+    return copy.deepcopy(cached)
 
 
 # Tool 5: Edit Word Document with Track Changes (Applies Sensitive Data Callbacks)
 # Called by ReviewWorkflowAgent
-# Attach the sensitive data callbacks to this tool
-async def edit_word_doc(tool_context: ToolContext, artifact_name: str, artifact_version: int, edit_instructions: str) -> Dict[str, Any]:
+# Its agent attaches the sensitive data callbacks (tools can't carry their own)
+async def edit_word_doc(tool_context: ToolContext, artifact_name: str, artifact_version: int, edit_instructions: str = "") -> Dict[str, Any]:
     """
     Tool to load a Word document artifact, apply edits with track changes,
     and save the edited document as a new artifact version.
-    Sensitive data handling callbacks are attached to this tool.
+    Its agent runs the sensitive data handling callbacks around it.
 
     Reads document artifact by name/version.
-    Reads edit_instructions argument (may contain placeholders).
-    Saves edited document as a new artifact version.
+    Reads the edit plan from state['review_edit_plan'] (written by review_translation)
+    and applies each edit to its paragraph as a tracked change. Paragraphs
+    are numbered like the segments of extract_text (body, tables, headers,
+    footers, notes), so edits outside the body land too. Edits whose
+    paragraph no longer has the reviewed text are skipped.
+    Reads edit_instructions argument (optional notes, may contain placeholders).
+    Saves edited document as a new artifact version and writes
+    state['edited_document_artifact'].
     Returns new artifact name/version.
     """
-    logger.info(f"[Tool] edit_word_doc called for artifact '{artifact_name}' v{artifact_version}.")
+    edit_plan = tool_context.state.get("review_edit_plan") or []
+    logger.info(f"[Tool] edit_word_doc called for artifact '{artifact_name}' v{artifact_version} with {len(edit_plan)} planned edits.")
+    if edit_instructions:
+        logger.info(f"[Tool] Reviewer notes ({len(edit_instructions)} chars) accompany the edit plan.")
 
     try:
         # Load the document artifact content
-        doc_artifact_part = await tool_context.load_artifact(filename=artifact_name, version=artifact_version)
+        doc_attachment = attachment_from_part(await tool_context.load_artifact(filename=artifact_name, version=artifact_version))
 
-        if not doc_artifact_part or not doc_artifact_part.inline_data:
+        if doc_attachment is None:
              logger.error(f"[Tool] Failed to load document artifact or it has no inline data: {artifact_name} v{artifact_version}.")
              return {"status": "error", "message": f"Failed to load document artifact {artifact_name} for editing."}
+        if doc_attachment.mime_type != DOCX_MIME_TYPE:
+             return {"status": "error", "message": f"Only DOCX documents can be edited with track changes, not {doc_attachment.mime_type}."}
 
-        # --- Placeholder: Document Editing Logic with Track Changes ---
         try:
-             # This is complex! python-docx has limited track changes support.
-             # You might need a commercial library or API (e.g., Aspose.Words, DocuSign, Google Docs API)
-             # Or a workflow involving converting to a different format, editing, and converting back.
-
-             logger.info(f"[Tool] Applying edits with track changes based on instructions ({len(edit_instructions)} chars).")
-             edited_content_bytes = b"Edited document content with track changes simulated.\n" + doc_artifact_part.inline_data.data # Simulate edit
-             edited_mime_type = doc_artifact_part.inline_data.mime_type # Keep original type
-
-             # Note: Real implementation involves parsing docx XML, applying changes, saving.
-             # Placeholder text may contain placeholders *if* the callback processed it.
-             # If you need to process the *document content* itself for sensitive data within the tool,
-             # you'd need to do it here before calling an external editing API, and apply callbacks
-             # around that internal content processing step, not just the tool args/response.
-             # For simplicity, we assume sensitive data is mainly in instructions and output text feedback.
+             doc = _load_docx_model(doc_attachment)
+
+             paragraphs, edited_blob_parts = _segment_paragraphs(doc)
+             revision_date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+             applied, skipped = 0, 0
+             for edit in edit_plan:
+                 index = edit["paragraph"]
+                 if index >= len(paragraphs) or paragraph_text(paragraphs[index][1]) != edit["current"]:
+                     skipped += 1 # The document changed since it was reviewed
+                     continue
+                 part, p = paragraphs[index]
+                 _apply_tracked_replacement(p, edit["replacement"], revision_id=2 * applied + 1, revision_date=revision_date)
+                 edited_blob_parts.touch(part)
+                 applied += 1
+             edited_blob_parts.store()
+             logger.info(f"[Tool] Applied {applied} tracked edits ({skipped} skipped as stale).")
+
+             buffer = BytesIO()
+             doc.save(buffer)
 
         except ImportError:
              logger.error("[Tool] python-docx not installed. Cannot edit DOCX.")
@@ -320,29 +1000,67 @@ async def edit_word_doc(tool_context: ToolContext, artifact_name: str, artifact_
         except Exception as e:
              logger.error(f"[Tool] Error during document editing: {e}")
              return {"status": "error", "message": f"Document editing failed: {e}"}
-        # --- End Placeholder ---
-
-        # Create a new artifact part for the edited document
-        edited_artifact_part = types.Part.from_data(data=edited_content_bytes, mime_type=edited_mime_type)
 
         # Save the edited document as a *new version* of the same artifact filename
         # The artifact service handles assigning the next version number
-        new_version = await tool_context.save_artifact(filename=artifact_name, artifact=edited_artifact_part)
+        _, new_version = await save_attachment(tool_context, artifact_name, [buffer.getvalue()], buffer.tell(), DOCX_MIME_TYPE)
         logger.info(f"[Tool] Saved edited document as artifact '{artifact_name}' version {new_version}.")
 
-        return {"status": "success", "message": f"Document edited and saved as version {new_version}.", "edited_artifact_name": artifact_name, "edited_artifact_version": new_version}
+        tool_context.state["edited_document_artifact"] = {"artifact_name": artifact_name, "artifact_version": new_version}
+        return {
+            "status": "success",
+            "message": f"Document edited ({applied} tracked edits, {skipped} skipped) and saved as version {new_version}.",
+            "edited_artifact_name": artifact_name,
+            "edited_artifact_version": new_version,
+        }
 
     except Exception as e:
         logger.error(f"[Tool] Unexpected error during document editing workflow: {e}")
         return {"status": "error", "message": f"Unexpected error during document editing workflow: {e}"}
 
-# Wrap the tool function and ATTACH THE SENSITIVE DATA CALLBACKS
-edit_word_doc_tool = FunctionTool(
-    func=edit_word_doc,
-    # Apply sensitive data handling before and after
-    before_tool_callback=handle_sensitive_before,
-    after_tool_callback=handle_sensitive_after,
-)
+# The agent that owns this tool runs the sensitive data callbacks (see callbacks.py)
+edit_word_doc_tool = FunctionTool(func=edit_word_doc)
+
+
+def _build_docx_bytes(text: str) -> bytes:
+    """
+    Builds a DOCX file with one paragraph per line of text. Raises ImportError without python-docx.
+    The same text (a retried step, or a duplicate email) reuses the file built before.
+    """
+    return document_cache.get_or_create(
+        "built_docx", hash_attachment_bytes(text.encode("utf-8")), lambda: _render_docx_bytes(text), len
+    )
+
+def _render_docx_bytes(text: str) -> bytes:
+    Document = _docx_document_class()
+    doc = Document()
+    for paragraph in segment_text(text):
+        doc.add_paragraph(paragraph)
+    # Add more complex formatting if needed based on original_format or template
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def _streamed_document(state, text: str, target_language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The document translate_to_languages already wrote for exactly this text, if there is one."""
+    text_hash = hash_attachment_bytes(text.encode("utf-8"))
+    for language, document in (state.get("streamed_documents") or {}).items():
+        if document["text_hash"] == text_hash and target_language in (None, language):
+            return document
+    return None
+
+def _translated_document_filename(state, target_language: Optional[str] = None) -> str:
+    """
+    Filename for a translated document, based on the original filename.
+    A language suffix is added when one email produces several translations.
+    """
+    suffix = f"_{target_language.lower().replace(' ', '_')}" if target_language else ""
+    original_filename = (state.get("initial_attachments") or [None])[0] # Get name of first attachment
+    if original_filename:
+         base_name = os.path.splitext(original_filename)[0]
+         return f"{base_name}_translated{suffix}.docx"
+    return f"translated_document{suffix}_{uuid.uuid4().hex[:6]}.docx"
 
 
 # Tool 6: Convert Text to Word Document Artifact
@@ -359,6 +1077,11 @@ async def convert_to_word(tool_context: ToolContext, translated_text: str, origi
     """
     logger.info(f"[Tool] convert_to_word called for {len(translated_text)} chars, original format '{original_format}'.")
 
+    streamed = _streamed_document(tool_context.state, translated_text)
+    if streamed:
+        logger.info(f"[Tool] Reusing the document written during translation: '{streamed['artifact_name']}' v{streamed['artifact_version']}.")
+        return {"status": "success", "message": f"Document saved as artifact '{streamed['artifact_name']}' v{streamed['artifact_version']}.", "artifact_name": streamed["artifact_name"], "artifact_version": streamed["artifact_version"]}
+
     # --- Placeholder: Convert Text to Word Logic ---
     try:
         # Requires python-docx or similar library
@@ -366,17 +1089,8 @@ async def convert_to_word(tool_context: ToolContext, translated_text: str, origi
             logger.warning(f"[Tool] Original format '{original_format}' not DOCX. Converting to DOCX anyway.")
 
         try:
-            from docx import Document # Requires python-docx
-            from io import BytesIO
-            doc = Document()
-            doc.add_paragraph(translated_text)
-            # Add more complex formatting if needed based on original_format or template
-
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-            word_bytes = buffer.getvalue()
-            mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            word_bytes = _build_docx_bytes(translated_text)
+            mime_type = DOCX_MIME_TYPE
             logger.info(f"[Tool] Created DOCX document ({len(word_bytes)} bytes).")
         except ImportError:
              logger.error("[Tool] python-docx not installed. Cannot create DOCX.")
@@ -386,22 +1100,12 @@ async def convert_to_word(tool_context: ToolContext, translated_text: str, origi
              return {"status": "error", "message": f"Error creating DOCX: {e}"}
         # --- End Placeholder ---
 
-        # Create a new artifact part for the Word document
-        word_artifact_part = types.Part.from_data(data=word_bytes, mime_type=mime_type)
-
         # Define a filename for the translated/edited document
-        # Use a consistent naming convention, maybe based on original filename and status
-        original_filename = tool_context.state.get("initial_attachments", [None])[0] # Get name of first attachment
-        if original_filename:
-             base_name = os.path.splitext(original_filename)[0]
-             # Assuming this is for translated document:
-             output_filename = f"{base_name}_translated.docx"
-        else:
-             output_filename = f"translated_document_{uuid.uuid4().hex[:6]}.docx"
+        output_filename = _translated_document_filename(tool_context.state)
 
-        # Save the document as a new artifact
+        # Save the document as a new artifact (spooled to disk if it is large)
         # Versioning starts from 0 for this new filename
-        version = await tool_context.save_artifact(filename=output_filename, artifact=word_artifact_part)
+        _, version = await save_attachment(tool_context, output_filename, [word_bytes], len(word_bytes), mime_type)
         logger.info(f"[Tool] Saved Word document as artifact '{output_filename}' version {version}.")
 
         return {"status": "success", "message": f"Document saved as artifact '{output_filename}' v{version}.", "artifact_name": output_filename, "artifact_version": version}
@@ -414,6 +1118,53 @@ async def convert_to_word(tool_context: ToolContext, translated_text: str, origi
 convert_to_word_tool = FunctionTool(func=convert_to_word)
 
 
+# Tool 6b: Convert Every Translation to a Word Document Artifact
+# Called by TranslationWorkflowAgent after translate_to_languages
+async def convert_translations_to_word(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Tool to create one Word document artifact per translated language.
+
+    Reads state['translated_texts'] ({language: text}).
+    Documents already written during translation (state['streamed_documents'])
+    are reused when their text is unchanged.
+    Writes state['translated_document_artifacts'] (one entry per language)
+    and state['translated_document_artifact'] (the first one).
+    """
+    translated_texts = tool_context.state.get("translated_texts") or {}
+    logger.info(f"[Tool] convert_translations_to_word called for {len(translated_texts)} languages.")
+
+    if not translated_texts:
+        return {"status": "error", "message": "No translations found in state['translated_texts']."}
+
+    artifacts = []
+    for target_language, translated_text in translated_texts.items():
+        streamed = _streamed_document(tool_context.state, translated_text, target_language)
+        if streamed:
+            logger.info(f"[Tool] Reusing the {target_language} document written during translation.")
+            artifacts.append({"artifact_name": streamed["artifact_name"], "artifact_version": streamed["artifact_version"], "target_language": target_language})
+            continue
+        try:
+            word_bytes = _build_docx_bytes(translated_text)
+        except ImportError:
+            logger.error("[Tool] python-docx not installed. Cannot create DOCX.")
+            return {"status": "error", "message": "Python-docx library not found. Cannot create DOCX."}
+        except Exception as e:
+            logger.error(f"[Tool] Error creating DOCX for {target_language}: {e}")
+            return {"status": "error", "message": f"Error creating DOCX for {target_language}: {e}"}
+
+        output_filename = _translated_document_filename(tool_context.state, target_language)
+        _, version = await save_attachment(tool_context, output_filename, [word_bytes], len(word_bytes), DOCX_MIME_TYPE)
+        logger.info(f"[Tool] Saved {target_language} document as artifact '{output_filename}' version {version}.")
+        artifacts.append({"artifact_name": output_filename, "artifact_version": version, "target_language": target_language})
+
+    tool_context.state["translated_document_artifacts"] = artifacts
+    tool_context.state["translated_document_artifact"] = artifacts[0]
+    return {"status": "success", "message": f"Saved {len(artifacts)} translated documents.", "artifacts": artifacts}
+
+# Wrap the tool function
+convert_translations_to_word_tool = FunctionTool(func=convert_translations_to_word)
+
+
 # Tool 7: Send Final Email
 # Called by EmailSenderAgent
 async def send_final_email(tool_context: ToolContext) -> Dict[str, Any]:
@@ -423,8 +1174,9 @@ async def send_final_email(tool_context: ToolContext) -> Dict[str, Any]:
     Reads recipient email from state['email_sender_email'].
     Reads email body from state['initial_reply_text'].
     Reads final document artifact name/version from state
-    (either 'translated_document_artifact' or 'edited_document_artifact').
-    Loads artifact and sends email.
+    (either 'translated_document_artifact' or 'edited_document_artifact'),
+    or every artifact in 'translated_document_artifacts' for multi-language requests.
+    Loads the artifacts and sends them in one email.
     """
     logger.info(f"[Tool] send_final_email called.")
 
@@ -432,59 +1184,64 @@ async def send_final_email(tool_context: ToolContext) -> Dict[str, Any]:
     email_body_text = tool_context.state.get("initial_reply_text") # Use initial reply text
     email_subject = tool_context.state.get("email_subject") # Use original subject
 
-    # Determine which artifact is the final document based on email type
+    # Determine which artifact(s) are the final documents based on email type
     email_type = tool_context.state.get("email_type")
     if email_type == "translation":
-         final_artifact_details = tool_context.state.get("translated_document_artifact")
+         # One document per target language when several were requested
+         final_artifacts = tool_context.state.get("translated_document_artifacts") or [tool_context.state.get("translated_document_artifact")]
     elif email_type == "review":
-         final_artifact_details = tool_context.state.get("edited_document_artifact")
+         final_artifacts = [tool_context.state.get("edited_document_artifact")]
     else:
          logger.error(f"[Tool] Cannot send email, unknown email type: {email_type}")
          return {"status": "error", "message": "Cannot send email, unknown process type."}
 
-    if not recipient_email or not email_body_text or not final_artifact_details:
+    final_artifacts = [details for details in final_artifacts if details]
+    if not recipient_email or not email_body_text or not final_artifacts:
          logger.error(f"[Tool] Cannot send email, missing recipient, body, or artifact details.")
          return {"status": "error", "message": "Cannot send email, missing required information."}
 
-    final_artifact_name = final_artifact_details.get("artifact_name")
-    final_artifact_version = final_artifact_details.get("artifact_version")
-
-    if not final_artifact_name or final_artifact_version is None:
+    if any(not details.get("artifact_name") or details.get("artifact_version") is None for details in final_artifacts):
          logger.error(f"[Tool] Cannot send email, final artifact details incomplete.")
          return {"status": "error", "message": "Cannot send email, final artifact details incomplete."}
 
 
     try:
-        # Load the final document artifact content
-        final_doc_artifact_part = await tool_context.load_artifact(
-            filename=final_artifact_name, version=final_artifact_version
-        )
-
-        if not final_doc_artifact_part or not final_doc_artifact_part.inline_data:
-            logger.error(f"[Tool] Failed to load final document artifact: {final_artifact_name} v{final_artifact_version}.")
-            return {"status": "error", "message": f"Failed to load final document artifact {final_artifact_name}."}
+        # Load the final document artifacts content
+        attachments = []
+        for details in final_artifacts:
+            final_doc_attachment = attachment_from_part(await tool_context.load_artifact(
+                filename=details["artifact_name"], version=details["artifact_version"]
+            ))
+            if final_doc_attachment is None:
+                logger.error(f"[Tool] Failed to load final document artifact: {details['artifact_name']} v{details['artifact_version']}.")
+                return {"status": "error", "message": f"Failed to load final document artifact {details['artifact_name']}."}
+            attachments.append((details["artifact_name"], final_doc_attachment))
 
         # --- Placeholder: Send Email Logic ---
         try:
             logger.info(f"[Tool] Simulating sending email to {recipient_email}.")
             logger.info(f"[Tool] Subject: {email_subject}")
             logger.info(f"[Tool] Body: {email_body_text}")
-            logger.info(f"[Tool] Attaching artifact: {final_artifact_name} ({final_doc_artifact_part.inline_data.mime_type})")
+            for attachment_name, attachment in attachments:
+                logger.info(f"[Tool] Attaching artifact: {attachment_name} ({attachment.mime_type})")
 
             # In a real app, use an email sending library or API (e.g., SendGrid, Mailgun, Gmail API)
-            # You would attach final_doc_artifact_part.inline_data.data (bytes) with the specified mime_type and filename.
+            # You would stream each attachment's iter_chunks() (zero-copy slices of the file for
+            # large ones) into the message with its mime_type and filename, all in one message.
 
             # Example using print for simulation
             print(f"\n--- SIMULATING EMAIL SEND ---")
             print(f"To: {recipient_email}")
             print(f"Subject: {email_subject}")
             print(f"Body:\n{email_body_text}")
-            print(f"Attachment: {final_artifact_name} ({len(final_doc_artifact_part.inline_data.data)} bytes, {final_doc_artifact_part.inline_data.mime_type})")
+            for attachment_name, attachment in attachments:
+                sent_bytes = sum(len(chunk) for chunk in attachment.iter_chunks())
+                print(f"Attachment: {attachment_name} ({sent_bytes} bytes, {attachment.mime_type})")
             print(f"-----------------------------\n")
 
             # Simulate success
             logger.info(f"[Tool] Email simulation successful.")
-            return {"status": "success", "message": "Email sent successfully."}
+            return {"status": "success", "message": f"Email sent successfully with {len(attachments)} attachment(s)."}
 
         except Exception as e:
             logger.error(f"[Tool] Error sending email: {e}")
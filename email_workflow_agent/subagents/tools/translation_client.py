@@ -0,0 +1,168 @@
+# email-agent-workflow/email_workflow_agent/subagents/tools/translation_client.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from ...deadlines import check_deadline
+from ...fake_backend import fake_backend_from_env
+from ...rate_limiter import RATE_LIMIT_MAX_RETRIES, AdaptiveRateLimiter, is_rate_limited, translation_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# --- Hedging ---
+# A batch still running after the HEDGE_PERCENTILE latency of recent batches
+# gets a duplicate request; the first answer wins and the other is cancelled.
+TRANSLATION_HEDGING = os.getenv("TRANSLATION_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("TRANSLATION_HEDGE_PERCENTILE", "0.95"))
+# At most this fraction of extra requests
+HEDGE_BUDGET = float(os.getenv("TRANSLATION_HEDGE_BUDGET", "0.05"))
+# No hedging until this many latencies have been seen
+HEDGE_MIN_SAMPLES = 20
+
+
+class TranslationClient:
+    """
+    Client for the external translation backend, shared by every tool that
+    translates. All requests from all sessions in this process go through
+    one adaptive rate limiter, so fanning out to several languages (or
+    several workflows at once) can't flood the backend. Throttled requests
+    are retried after a backoff.
+
+    With hedging on, a batch that is slower than the adaptive percentile
+    delay is sent a second time (within the hedge budget) to cut tail latency.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: AdaptiveRateLimiter = translation_rate_limiter,
+        hedging: bool = TRANSLATION_HEDGING,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_budget: float = HEDGE_BUDGET,
+    ):
+        self.rate_limiter = rate_limiter
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        # Set TRANSLATION_FAKE_RPS to test against a local backend that answers 429s
+        self.fake_backend = fake_backend_from_env("TRANSLATION")
+        self._latencies: Deque[float] = deque(maxlen=512)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def translate_batch(
+        self,
+        segments: List[str],
+        target_language: str,
+        source_language: str = "en",
+        contexts: Optional[List[Optional[str]]] = None,
+    ) -> List[str]:
+        """
+        Translates a batch of segments in one backend request. Output order matches input.
+        `contexts` optionally gives each segment a text that guides its
+        translation without being translated (e.g. a similar segment and its earlier translation).
+        """
+        self.requests += 1
+        if not self.hedging:
+            return await self._translate_with_retries(segments, target_language, source_language, contexts)
+
+        primary = asyncio.ensure_future(self._translate_with_retries(segments, target_language, source_language, contexts))
+        hedge = None
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._hedge_allowed():
+                return await primary
+
+            self.hedges += 1
+            logger.info(f"[TranslationClient] Batch slower than {delay:.2f}s; sending a hedged request.")
+            hedge = asyncio.ensure_future(self._translate_with_retries(segments, target_language, source_language, contexts))
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    # First success wins
+                    if hedge in succeeded and primary not in succeeded:
+                        self.hedge_wins += 1
+                    return succeeded[0].result()
+                if not pending:
+                    # Both failed: raise the primary's error
+                    return primary.result()
+        finally:
+            # The loser (or both, if we were cancelled) is cancelled
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def hedge_delay(self) -> Optional[float]:
+        """The current hedge delay: a high percentile of recent batch latencies."""
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    def _hedge_allowed(self) -> bool:
+        return self.hedges + 1 <= self.hedge_budget * self.requests
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            "hedge_delay_s": self.hedge_delay(),
+        }
+
+    async def _translate_with_retries(
+        self, segments: List[str], target_language: str, source_language: str, contexts: Optional[List[Optional[str]]] = None,
+    ) -> List[str]:
+        batch_chars = sum(len(segment) for segment in segments) + sum(len(context) for context in contexts or () if context)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            check_deadline("translation batch")
+            try:
+                async with self.rate_limiter.permit(tokens=batch_chars):
+                    started = time.monotonic()
+                    translated = await self._call_backend(segments, target_language, source_language, contexts)
+                    self._latencies.append(time.monotonic() - started)
+                    return translated
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                logger.info(f"[TranslationClient] Throttled (attempt {attempt + 1}); backing off.")
+                await self.rate_limiter.backoff(attempt, e)
+
+    async def _call_backend(
+        self, segments: List[str], target_language: str, source_language: str, contexts: Optional[List[Optional[str]]] = None,
+    ) -> List[str]:
+        # --- Placeholder: Call External Translation API ---
+        # In a real app, you'd call an API like Google Cloud Translation, DeepL, etc.
+        # Use an async HTTP client, so a stage that runs out of time can cancel the request.
+        # Example:
+        # api_url = "https://translation.googleapis.com/language/translate/v2"
+        # response = await http_client.post(api_url, params={'key': os.getenv("TRANSLATION_API_KEY")}, json={
+        #     'q': segments, # The v2 API accepts a list of strings per request
+        #     'target': target_language,
+        #     'source': source_language,
+        # }, timeout=remaining_seconds()) # Never wait past the deadline
+        # response.raise_for_status() # A 429 here is retried by translate_batch
+        # return [t['translatedText'] for t in response.json()['data']['translations']]
+        # Segments with a context go in their own requests to a backend that
+        # takes one, e.g. DeepL's `context` parameter (neither translated nor billed).
+
+        if self.fake_backend is not None:
+            await self.fake_backend.call()
+
+        # Simulate translation (placeholders are carried through)
+        return [f"Translated: {segment} (to {target_language})" for segment in segments]
+        # --- End Placeholder ---
+
+
+# Shared by every translation tool in this process
+translation_client = TranslationClient()
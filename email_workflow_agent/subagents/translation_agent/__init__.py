@@ -1,2 +1,2 @@
 # email-agent-workflow/email_workflow_agent/subagents/translation_agent/__init__.py
-from .agent import translation_workflow_agent
\ No newline at end of file
+from .agent import create_translation_workflow_agent
\ No newline at end of file
@@ -1,38 +1,62 @@
 # email-agent-workflow/email_workflow_agent/subagents/translation_agent/agent.py
-from google.adk.agents import SequentialAgent
-# Import specific tools used in this workflow branch
-from ..tools.tools import translate_text_tool, check_translation_tool, convert_to_word_tool
+from google.adk.agents import LlmAgent, SequentialAgent
+from ...model_router import model_router
+from ..tools.callbacks import handle_sensitive_before, handle_sensitive_after
 
-# Define the Sequential Workflow for Translation Requests
-translation_workflow_agent = SequentialAgent(
-    name="TranslationWorkflowAgent",
-    # Order of sub-agents/tools is crucial in SequentialAgent
-    sub_agents=[
-        # LlmAgent to orchestrate text translation using the tool
-        # (The tool call happens within this LlmAgent's execution)
-        LlmAgent(
-            name="TextTranslationOrchestrator",
-            model="gemini-2.0-flash", # Use a capable model for translation orchestration
-            instruction="Use the translate_text_tool to translate the extracted text from state['extracted_text'] to the target language.",
-            tools=[translate_text_tool], # Provide the translation tool
-            output_key="translated_text", # Save translated text to state
-        ),
-        # LlmAgent to orchestrate quality check using the tool
-         LlmAgent(
-            name="QualityCheckOrchestrator",
-            model="gemini-2.0-flash", # Model for quality check interpretation
-            instruction="Use the check_translation_tool to assess the quality of the translated text in state['translated_text'] compared to the original text in state['extracted_text'].",
-            tools=[check_translation_tool], # Provide the quality check tool
-            output_key="translation_quality_feedback", # Save feedback to state
-        ),
-        # LlmAgent to orchestrate Word conversion using the tool
-        LlmAgent(
-            name="WordConversionOrchestrator",
-            model="gemini-2.0-flash", # Minimal model
-            instruction="Use the convert_to_word_tool to create a Word document from the translated text in state['translated_text'], using the original format from state['original_file_format'].",
-            tools=[convert_to_word_tool], # Provide the conversion tool
-            output_key="translated_document_artifact", # Save final artifact name to state
-        ),
-    ],
-    description="Handles the process for translation requests: translates, checks quality, converts to Word.",
-)
\ No newline at end of file
+
+def create_translation_workflow_agent() -> SequentialAgent:
+    """
+    Builds the Sequential Workflow for Translation Requests.
+    Called by the orchestrator the first time the branch is needed, so
+    importing the package doesn't construct (or import the tools of) every branch.
+    """
+    # Import specific tools used in this workflow branch
+    from ..tools.tools import translate_to_languages_tool, check_translations_tool, convert_translations_to_word_tool
+
+    return SequentialAgent(
+        name="TranslationWorkflowAgent",
+        # Order of sub-agents/tools is crucial in SequentialAgent
+        sub_agents=[
+            # LlmAgent to orchestrate text translation using the tool
+            # (The tool call happens within this LlmAgent's execution)
+            LlmAgent(
+                name="TextTranslationOrchestrator",
+                model=model_router.llm_for("translate"), # Large tier for long documents
+                before_model_callback=model_router.callback_for("translate"),
+                instruction="Use the translate_to_languages_tool to translate the extracted text from state['extracted_text'] into every language in state['target_languages'] (or just state['target_language'] if no list is given). The source language was detected from the document and is in state['source_language'].",
+                tools=[translate_to_languages_tool], # Provide the translation tool
+                before_tool_callback=handle_sensitive_before, # Masks sensitive data in the text to translate
+                after_tool_callback=handle_sensitive_after,   # Restores it in the translations
+                # No output_key: the tool writes state['translated_texts'] and state['translated_text'] itself
+            ),
+            # LlmAgent to orchestrate quality check using the tool
+             LlmAgent(
+                name="QualityCheckOrchestrator",
+                model=model_router.llm_for("quality_check"), # Escalates when confidence is low
+                before_model_callback=model_router.callback_for("quality_check"),
+                instruction="Use the check_translations_tool to assess the quality of every translation in state['translated_texts'] compared to the original text in state['extracted_text']. The tool reads both from state itself.",
+                tools=[check_translations_tool], # Checks each requested language
+                before_tool_callback=handle_sensitive_before,
+                after_tool_callback=handle_sensitive_after,   # Restores placeholders in the feedback
+                output_key="translation_quality_feedback", # Save feedback to state
+            ),
+            # LlmAgent to orchestrate Word conversion using the tool
+            LlmAgent(
+                name="WordConversionOrchestrator",
+                model=model_router.llm_for("tool_call"), # Fast tier
+                before_model_callback=model_router.callback_for("tool_call"),
+                instruction="Use the convert_translations_to_word_tool to create one Word document per translation in state['translated_texts'].",
+                tools=[convert_translations_to_word_tool], # Provide the conversion tool
+                # No output_key: the tool writes state['translated_document_artifacts'] itself
+            ),
+        ],
+        description="Handles the process for translation requests: translates, checks quality, converts to Word.",
+    )
+
+
+def __getattr__(name: str):
+    # Keeps `from .agent import translation_workflow_agent` working; built on first access
+    if name == "translation_workflow_agent":
+        agent = globals()[name] = create_translation_workflow_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
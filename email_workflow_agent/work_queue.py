@@ -0,0 +1,141 @@
+# email-agent-workflow/email_workflow_agent/work_queue.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite file shared by the supervisor and every worker process on this box
+WORK_QUEUE_DB_PATH = os.getenv("WORK_QUEUE_DB", "work_queue.db")
+# A leased job whose worker stops heartbeating is redelivered after this long
+LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "60"))
+# Deliveries before a job is given up on and marked 'failed'
+MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+
+
+class WorkQueue:
+    """
+    Durable local queue of emails for the worker pool.
+
+    A worker leases the oldest available job for `lease_seconds` and keeps
+    the lease alive with heartbeats while it runs. If the worker dies, the
+    lease expires and the job is delivered again to another worker. A job
+    delivered `max_attempts` times without completing is marked 'failed'.
+
+    Each process opens its own connection; SQLite's locking (WAL mode,
+    BEGIN IMMEDIATE for leasing) keeps two workers from taking the same job.
+    """
+
+    def __init__(self, db_path: str = WORK_QUEUE_DB_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use, and again in a forked child: connections can't cross processes
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS email_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload_json TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    enqueued_at REAL NOT NULL,
+                    finished_at REAL,
+                    last_error TEXT
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS email_jobs_status ON email_jobs (status, id)")
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def enqueue(self, payload: Dict[str, Any]) -> int:
+        """Adds a job; `payload` is passed to the workflow as keyword arguments."""
+        with self._lock:
+            cursor = self._db().execute(
+                "INSERT INTO email_jobs (payload_json, enqueued_at) VALUES (?, ?)",
+                (json.dumps(payload), time.time()),
+            )
+        return cursor.lastrowid
+
+    def lease(self, worker_id: str) -> Optional[Tuple[int, Dict[str, Any], int]]:
+        """
+        Takes the oldest queued job, or one whose lease has expired.
+        Returns (job id, payload, attempt number) or None if nothing is available.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE") # Take the write lock before choosing, so no one else picks the same row
+            try:
+                # Expired leases that have used up their attempts are given up on first
+                db.execute(
+                    "UPDATE email_jobs SET status = 'failed', finished_at = ?, last_error = 'lease expired on final attempt' "
+                    "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                row = db.execute(
+                    "SELECT id, payload_json, attempts FROM email_jobs "
+                    "WHERE status = 'queued' OR (status = 'leased' AND lease_expires_at < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                job_id, payload_json, attempts = row
+                db.execute(
+                    "UPDATE email_jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, job_id),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        if attempts:
+            logger.warning(f"[WorkQueue] Redelivering job {job_id} to {worker_id} (attempt {attempts + 1}).")
+        return job_id, json.loads(payload_json), attempts + 1
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Extends a lease. Returns False if the worker no longer holds it (it expired and was redelivered)."""
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE email_jobs SET lease_expires_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE email_jobs SET status = 'done', finished_at = ? WHERE id = ? AND lease_owner = ?",
+                (time.time(), job_id, worker_id),
+            )
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> None:
+        """Puts a failed job back in the queue, or marks it 'failed' after its last attempt."""
+        with self._lock:
+            self._db().execute(
+                "UPDATE email_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "lease_owner = NULL, lease_expires_at = NULL, last_error = ?, "
+                "finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END "
+                "WHERE id = ? AND lease_owner = ?",
+                (self.max_attempts, error[:2000], self.max_attempts, time.time(), job_id, worker_id),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) FROM email_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
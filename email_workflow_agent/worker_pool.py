@@ -0,0 +1,136 @@
+# email-agent-workflow/email_workflow_agent/worker_pool.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from .work_queue import WorkQueue
+
+logger = logging.getLogger(__name__)
+
+# How often a worker without work checks the queue again
+POLL_INTERVAL_SECONDS = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "0.5"))
+# How often the supervisor checks on its workers
+SUPERVISOR_INTERVAL_SECONDS = 1.0
+
+
+class WorkflowFailed(Exception):
+    """Raised by a workflow that ended without finishing its email, so its job is retried or marked failed."""
+
+
+async def run_worker(
+    run_workflow: Callable[..., Awaitable[None]],
+    queue: Optional[WorkQueue] = None,
+    worker_id: Optional[str] = None,
+    exit_when_idle: bool = False,
+) -> int:
+    """
+    Worker loop: leases emails from the shared queue and runs the workflow
+    for each, heartbeating the lease while it runs. The job's payload is
+    passed to `run_workflow` as keyword arguments. A job whose workflow
+    raises (e.g. WorkflowFailed) is handed back to the queue, which
+    redelivers it until its attempts run out.
+
+    If the lease is lost (the worker stalled past the lease and the job was
+    handed to someone else), the workflow is cancelled here and waited for,
+    so it has stopped before the next job starts. A workflow that ends up
+    cancelled otherwise counts as failed. Returns the number of jobs
+    completed; runs forever unless `exit_when_idle` is set.
+    """
+    queue = queue or WorkQueue()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    completed = 0
+    logger.info(f"[Worker {worker_id}] Started.")
+
+    while True:
+        leased = queue.lease(worker_id)
+        if leased is None:
+            if exit_when_idle:
+                return completed
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        job_id, payload, attempt = leased
+        logger.info(f"[Worker {worker_id}] Running job {job_id} (attempt {attempt}).")
+        workflow = asyncio.ensure_future(run_workflow(**payload))
+        lease_lost = False
+        try:
+            while not workflow.done():
+                await asyncio.wait({workflow}, timeout=queue.lease_seconds / 3)
+                if not workflow.done() and not queue.heartbeat(job_id, worker_id):
+                    logger.warning(f"[Worker {worker_id}] Lost the lease on job {job_id}; abandoning it.")
+                    lease_lost = True
+                    workflow.cancel()
+                    # The job now belongs to another worker: don't let this run go on beside it
+                    await asyncio.gather(workflow, return_exceptions=True)
+                    break
+        except asyncio.CancelledError:
+            # The worker itself is stopping; the job's lease expires and it is redelivered
+            workflow.cancel()
+            await asyncio.gather(workflow, return_exceptions=True)
+            raise
+
+        if lease_lost:
+            continue
+        if workflow.cancelled():
+            logger.error(f"[Worker {worker_id}] Job {job_id} was cancelled.")
+            queue.fail(job_id, worker_id, "Workflow cancelled")
+        elif workflow.exception() is not None:
+            logger.error(f"[Worker {worker_id}] Job {job_id} failed: {workflow.exception()!r}")
+            queue.fail(job_id, worker_id, repr(workflow.exception()))
+        else:
+            queue.complete(job_id, worker_id)
+            completed += 1
+
+
+def supervise(
+    worker_target: Callable[[int], None],
+    num_workers: int = os.cpu_count() or 1,
+    queue: Optional[WorkQueue] = None,
+    stop_when_drained: bool = False,
+) -> None:
+    """
+    Spawns `num_workers` processes running `worker_target(worker_index)`
+    (a module-level function that builds its own Runner and calls
+    run_worker) and restarts any that crash. Their leases expire and the
+    queue redelivers their jobs to the others.
+
+    Each worker has its own event loop, GIL, Runner and rate limiters, so
+    per-process quotas (e.g. MODEL_REQUESTS_PER_MINUTE) should be set to
+    the shared quota divided by `num_workers`. Sessions and artifacts must
+    live in shared stores (SESSION_DB_URL, WORKFLOW_ARTIFACT_DIR) for a
+    redelivered email to resume where the dead worker stopped.
+    """
+    queue = queue or WorkQueue()
+    context = multiprocessing.get_context("spawn") # Fresh interpreters: no inherited locks or connections
+    processes: Dict[int, multiprocessing.Process] = {}
+
+    def start(worker_index: int) -> None:
+        process = context.Process(target=worker_target, args=(worker_index,), name=f"email-worker-{worker_index}", daemon=True)
+        process.start()
+        processes[worker_index] = process
+        logger.info(f"[Supervisor] Started worker {worker_index} (pid {process.pid}).")
+
+    for worker_index in range(num_workers):
+        start(worker_index)
+
+    try:
+        while True:
+            time.sleep(SUPERVISOR_INTERVAL_SECONDS)
+            counts = queue.counts()
+            if stop_when_drained and not counts.get("queued") and not counts.get("leased"):
+                logger.info(f"[Supervisor] Queue drained: {counts}.")
+                break
+            for worker_index, process in list(processes.items()):
+                if not process.is_alive() and process.exitcode != 0: # A clean exit is a worker that chose to stop
+                    logger.warning(f"[Supervisor] Worker {worker_index} (pid {process.pid}) exited with {process.exitcode}; restarting.")
+                    start(worker_index)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(timeout=10)
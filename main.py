@@ -1,20 +1,50 @@
 import asyncio
+import functools
 import os
+import sys
 import uuid
+from typing import List, Optional
 from dotenv import load_dotenv
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.adk.artifacts import InMemoryArtifactService
 from google.genai import types
 from email_workflow_agent.agent import root_agent # Import the custom orchestrator agent
+from email_workflow_agent.checkpoints import checkpoint_store
+from email_workflow_agent.deadlines import deadline_metrics
+from email_workflow_agent.file_artifact_service import ARTIFACT_DIR, FileArtifactService
+from email_workflow_agent.scheduler import WorkflowScheduler, SchedulerOverloaded
+from email_workflow_agent.session_lifecycle import OffloadingInMemorySessionService, SessionRetention
+from email_workflow_agent.subagents.tools.translation_client import translation_client
+from email_workflow_agent.subagents.tools.fuzzy_memory import fuzzy_reuse_metrics
+from email_workflow_agent.subagents.tools.attachment_handles import attachment_spool
+from email_workflow_agent.subagents.tools.document_cache import document_cache
+from email_workflow_agent.subagents.classifier_agent.batcher import classification_batcher
+from email_workflow_agent.subagents.review_agent.chunked_review import chunked_reviewer
+from email_workflow_agent.work_queue import WorkQueue
+from email_workflow_agent.worker_pool import WorkflowFailed, run_worker, supervise
 
 # Load environment variables from .env file
 load_dotenv()
 
 # --- Services ---
 # Using in-memory services for simplicity. Replace with persistent options for production.
-session_service = InMemorySessionService()
-artifact_service = InMemoryArtifactService()
+# Set SESSION_DB_URL (e.g. sqlite:///sessions.db) to keep sessions across restarts,
+# which lets resume_unfinished_workflows() pick up interrupted emails.
+# Large event payloads (whole documents in tool args/responses) are spooled to
+# disk and referenced from the events instead of stored inside them.
+SESSION_DB_URL = os.getenv("SESSION_DB_URL")
+# Set WORKFLOW_ARTIFACT_DIR to keep artifacts on a filesystem shared by all worker processes.
+# Resumed sessions load the attachments saved before the restart, so persistent
+# sessions need persistent artifacts.
+if SESSION_DB_URL and not ARTIFACT_DIR:
+    raise RuntimeError("SESSION_DB_URL is set but WORKFLOW_ARTIFACT_DIR is not: resumed sessions could not load their artifacts.")
+artifact_service = FileArtifactService(ARTIFACT_DIR) if ARTIFACT_DIR else InMemoryArtifactService()
+if SESSION_DB_URL:
+    # Needs the google-adk[db] extra (sqlalchemy), so it's only imported when used
+    from email_workflow_agent.session_lifecycle import OffloadingDatabaseSessionService
+    session_service = OffloadingDatabaseSessionService(db_url=SESSION_DB_URL, artifact_service=artifact_service)
+else:
+    session_service = OffloadingInMemorySessionService(artifact_service=artifact_service)
 
 # --- Agent Runner Setup ---
 APP_NAME = "email_translation_workflow"
@@ -22,6 +52,10 @@ APP_NAME = "email_translation_workflow"
 # or be derived from the email sender. Using a fixed one for demo.
 USER_ID = "email_sender_user" # Example user ID
 
+# Completed sessions and their artifacts are removed after SESSION_TTL_SECONDS,
+# or earlier if the process goes over its memory budget.
+session_retention = SessionRetention(session_service, artifact_service, APP_NAME)
+
 runner = Runner(
     agent=root_agent,
     app_name=APP_NAME,
@@ -31,9 +65,27 @@ runner = Runner(
 
 # --- Simulate Receiving an Email and Running Workflow ---
 
-async def run_email_workflow(sender_email: str, subject: str, body: str, attachments: list):
-    """Simulates receiving an email and triggering the ADK workflow."""
-    session_id = str(uuid.uuid4()) # Unique session ID per email
+async def run_email_workflow(
+    sender_email: str,
+    subject: str,
+    body: str,
+    attachments: list,
+    target_languages: Optional[List[str]] = None,
+    session_id: Optional[str] = None,
+    deadline_seconds: Optional[float] = None,
+    raise_on_failure: bool = False,
+):
+    """
+    Simulates receiving an email and triggering the ADK workflow.
+    `target_languages` requests several translations of the same attachment;
+    each language comes back as its own document in the one reply.
+    `session_id` is fixed by the work queue, so a redelivered email continues
+    its existing session (and checkpoints) instead of starting over.
+    `deadline_seconds` overrides EMAIL_DEADLINE_SECONDS for this email.
+    With `raise_on_failure` (worker mode) a failed workflow raises, so the
+    queue hands the email back for redelivery instead of marking it done.
+    """
+    session_id = session_id or str(uuid.uuid4()) # Unique session ID per email
 
     # Initial state to pass email details to the workflow
     initial_state = {
@@ -46,14 +98,21 @@ async def run_email_workflow(sender_email: str, subject: str, body: str, attachm
         "initial_attachments": attachments # Passing simplified list of filenames for demo
         # In a real scenario, you'd handle byte data or temp paths here
     }
+    if target_languages:
+        initial_state["target_languages"] = list(target_languages)
+        initial_state["target_language"] = target_languages[0]
+    if deadline_seconds:
+        initial_state["deadline_seconds"] = deadline_seconds
 
-    # Create a new session for this email
-    session = await session_service.create_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=session_id,
-        state=initial_state,
-    )
+    # Create a new session for this email, unless it's a redelivery of one already started
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    if session is None:
+        session = await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            session_id=session_id,
+            state=initial_state,
+        )
 
     print(f"--- Starting workflow for email from {sender_email} (Session ID: {session_id[:8]}) ---")
     print(f"Subject: {subject}\n")
@@ -63,6 +122,7 @@ async def run_email_workflow(sender_email: str, subject: str, body: str, attachm
     user_message = types.Content(role="user", parts=[types.Part(text=body)])
 
     final_response_text = "Workflow completed."
+    workflow_error = None
 
     try:
         # Run the agent asynchronously
@@ -89,32 +149,137 @@ async def run_email_workflow(sender_email: str, subject: str, body: str, attachm
 
 
     except Exception as e:
+        workflow_error = e
         print(f"\n!!! Workflow encountered an ERROR: {e} !!!")
         import traceback
         traceback.print_exc()
 
     print(f"\n--- Workflow finished for Session ID: {session_id[:8]} ---")
+    session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    failure = workflow_error or (session.state.get("workflow_failure") if session is not None else None)
+    # A failed session that can still be resumed keeps its data for the resume or redelivery;
+    # retention only starts once nothing will pick it up again
+    if failure is None or not checkpoint_store.load(APP_NAME, USER_ID, session_id):
+        await session_retention.mark_completed(USER_ID, session_id)
+    if raise_on_failure and workflow_error is not None:
+        raise workflow_error
+    if raise_on_failure and failure is not None:
+        raise WorkflowFailed(f"Session {session_id[:8]} failed: {failure}")
+
+async def resume_unfinished_workflows():
+    """
+    Resumes workflows that a previous worker left unfinished.
+    The orchestrator skips every stage that has a checkpoint, so only the
+    interrupted stage and the ones after it run again.
+    """
+    for unfinished in checkpoint_store.unfinished_sessions(app_name=APP_NAME):
+        session = await session_service.get_session(
+            app_name=APP_NAME, user_id=unfinished["user_id"], session_id=unfinished["session_id"]
+        )
+        if session is None:
+            # Without a persistent session store the email data is gone; nothing to resume.
+            print(f"--- Cannot resume session {unfinished['session_id'][:8]}: session not found ---")
+            checkpoint_store.clear(APP_NAME, unfinished["user_id"], unfinished["session_id"])
+            continue
+
+        print(f"--- Resuming workflow for Session ID: {session.id[:8]} ---")
+        resume_message = types.Content(role="user", parts=[types.Part(text=session.state.get("email_body", "Resume workflow."))])
+        try:
+            async for event in runner.run_async(
+                user_id=unfinished["user_id"],
+                session_id=session.id,
+                new_message=resume_message,
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    print(f"--- Workflow Step Output ({event.author}): ---\n{event.content.parts[0].text}\n")
+        except Exception as e:
+            print(f"\n!!! Resumed workflow encountered an ERROR: {e} !!!")
+
+# --- Worker Pool Mode ---
+def warm_worker() -> None:
+    """Loads the tools and the document parsers behind them, once per process, before the first email."""
+    # Imported here, not at the top, so importing this module doesn't load every tool
+    from email_workflow_agent.subagents.tools import warm_parser_libraries
+    warm_parser_libraries()
+
+def worker_entry(worker_index: int) -> None:
+    """Runs in each worker process: its own Runner (this module's), consuming the shared queue."""
+    warm_worker()
+
+    async def serve():
+        retention_task = asyncio.create_task(session_retention.run_periodically())
+        try:
+            await run_worker(functools.partial(run_email_workflow, raise_on_failure=True))
+        finally:
+            retention_task.cancel()
+
+    asyncio.run(serve())
+
+def run_worker_pool(num_workers: int) -> None:
+    """Queues the example emails and processes them with `num_workers` worker processes."""
+    queue = WorkQueue()
+    for email in EXAMPLE_EMAILS:
+        # The session id is fixed here so a redelivered email resumes its session
+        queue.enqueue({**email, "session_id": str(uuid.uuid4())})
+    supervise(worker_entry, num_workers, queue=queue, stop_when_drained=True)
+    print(f"Work queue: {queue.counts()}")
 
 # --- Example Usage ---
-async def main():
-    # Simulate two incoming emails
-    await run_email_workflow(
+EXAMPLE_EMAILS = [
+    dict(
         sender_email="translator1@example.com",
         subject="Translation Request for Q3 Report",
-        body="Hi team, please translate the attached Q3 report (report_q3_en.docx) from English to French.",
-        attachments=["report_q3_en.docx"] # Simplified attachment representation
-    )
-
-    print("\n" + "="*50 + "\n")
-
-    await run_email_workflow(
+        body="Hi team, please translate the attached Q3 report (report_q3_en.docx) from English to French, German and Spanish.",
+        attachments=["report_q3_en.docx"], # Simplified attachment representation
+        target_languages=["French", "German", "Spanish"],
+    ),
+    dict(
         sender_email="officer2@example.com",
         subject="Request for Review the Translation (Policy Manual)",
         body="Hello team, please review the translation of the policy manual (policy_manual_fr.docx) against the English original (policy_manual_en.docx).",
-        attachments=["policy_manual_fr.docx", "policy_manual_en.docx"] # Simplified attachment representation
-    )
+        attachments=["policy_manual_fr.docx", "policy_manual_en.docx"], # Simplified attachment representation
+    ),
+]
+
+async def main():
+    # Load the document parsers once, before the first email needs them
+    warm_worker()
+
+    # Pick up anything a previous run left unfinished before taking new email
+    await resume_unfinished_workflows()
+
+    # Keep memory flat in long-running workers
+    retention_task = asyncio.create_task(session_retention.run_periodically())
+
+    # Incoming emails go through the size-aware scheduler so one huge
+    # document doesn't hold up a queue of short letters.
+    scheduler = WorkflowScheduler(run_email_workflow)
+
+    # Simulate two incoming emails
+    scheduled = [scheduler.submit(**email) for email in EXAMPLE_EMAILS]
+
+    for result in await asyncio.gather(*scheduled, return_exceptions=True):
+        if isinstance(result, SchedulerOverloaded):
+            print(f"--- Email shed by scheduler (queue over budget): {result} ---")
+
+    print("\n" + "="*50 + "\n")
+    print(f"Scheduler metrics: {scheduler.metrics_snapshot()}")
+    print(f"Session retention: {session_retention.metrics_snapshot()}")
+    print(f"Translation client: {translation_client.metrics_snapshot()}")
+    print(f"Classification batcher: {classification_batcher.metrics_snapshot()}")
+    print(f"Chunked reviewer: {chunked_reviewer.metrics_snapshot()}")
+    print(f"Document cache: {document_cache.metrics_snapshot()}")
+    print(f"Attachment spool: {attachment_spool.metrics_snapshot()}")
+    print(f"Stage deadlines: {deadline_metrics.metrics_snapshot()}")
+    print(f"Fuzzy segment reuse: {fuzzy_reuse_metrics.metrics_snapshot()}")
+    retention_task.cancel()
 
 if __name__ == "__main__":
+    # `python main.py --workers N` processes the emails with N worker processes
+    if "--workers" in sys.argv:
+        run_worker_pool(int(sys.argv[sys.argv.index("--workers") + 1]))
+        sys.exit(0)
+
     # Use asyncio.run() for top-level execution in a script
     try:
         asyncio.run(main())
@@ -0,0 +1,53 @@
+import asyncio
+
+from google.adk.artifacts import InMemoryArtifactService
+
+from email_workflow_agent.subagents.tools import attachment_handles
+from email_workflow_agent.subagents.tools.attachment_handles import (
+    AttachmentHandle,
+    AttachmentSpool,
+    InlineAttachment,
+    attachment_from_part,
+    save_attachment,
+)
+
+
+class ArtifactContext:
+    """The artifact methods of a ToolContext, bound to one session of a real artifact service."""
+
+    def __init__(self, service):
+        self.service = service
+        self.scope = {"app_name": "app", "user_id": "user", "session_id": "s1"}
+
+    async def save_artifact(self, filename, artifact):
+        return await self.service.save_artifact(filename=filename, artifact=artifact, **self.scope)
+
+    async def load_artifact(self, filename, version=None):
+        return await self.service.load_artifact(filename=filename, version=version, **self.scope)
+
+
+def test_handles_and_inline_attachments_round_trip_through_the_artifact_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachment_handles, "LARGE_ATTACHMENT_BYTES", 16)
+    monkeypatch.setattr(attachment_handles, "attachment_spool", AttachmentSpool(spool_dir=str(tmp_path / "spool")))
+    context = ArtifactContext(InMemoryArtifactService())
+    large = b"0123456789" * 10
+
+    async def run():
+        spooled, spooled_version = await save_attachment(context, "large.pdf", [large[:50], large[50:]], len(large), "application/pdf")
+        inline, inline_version = await save_attachment(context, "small.txt", [b"small"], 5, "text/plain")
+        return spooled, spooled_version, inline, inline_version, await context.load_artifact("large.pdf"), await context.load_artifact("small.txt")
+
+    spooled, spooled_version, inline, inline_version, spooled_part, inline_part = asyncio.run(run())
+
+    assert isinstance(spooled, AttachmentHandle) and isinstance(inline, InlineAttachment)
+    assert (spooled_version, inline_version) == (0, 0)
+    # The artifact only holds the handle; the bytes stay in the spool
+    assert spooled_part.inline_data.mime_type == attachment_handles.HANDLE_MIME_TYPE
+    assert large not in spooled_part.inline_data.data
+    handle = attachment_from_part(spooled_part)
+    assert (handle.path, handle.size, handle.mime_type, handle.content_hash) == (spooled.path, len(large), "application/pdf", spooled.content_hash)
+    with handle.open() as stream:
+        assert stream.read() == large
+
+    restored = attachment_from_part(inline_part)
+    assert (restored.data, restored.mime_type) == (b"small", "text/plain")
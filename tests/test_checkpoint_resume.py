@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any, AsyncGenerator, Dict
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from email_workflow_agent import agent as workflow
+from email_workflow_agent.checkpoints import CheckpointStore
+from email_workflow_agent.result_index import ResultIndex
+
+APP_NAME = "test_app"
+ARTIFACT = {"artifact_name": "translated.docx", "version": 0}
+
+
+class UnusedLlm(BaseLlm):
+    """Fails the test if a stage that has a checkpoint runs again."""
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        raise AssertionError("A checkpointed stage was run again")
+        yield
+
+
+class StageAgent(BaseAgent):
+    """Records that it ran and produces a fixed state delta."""
+
+    ran: Any # Shared list of stage names, in run order
+    state_delta: Dict = {}
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        self.ran.append(self.name)
+        yield Event(author=self.name, invocation_id=ctx.invocation_id, actions=EventActions(state_delta=self.state_delta))
+
+
+def test_interrupted_session_resumes_after_its_last_checkpoint(tmp_path, monkeypatch):
+    store = CheckpointStore(db_path=str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(workflow, "checkpoint_store", store)
+    monkeypatch.setattr(workflow, "result_index", ResultIndex())
+    ran = []
+
+    def unused_agent(name):
+        return LlmAgent(name=name, model=UnusedLlm(model="unused"))
+
+    orchestrator = workflow.EmailWorkflowOrchestrator(
+        name="Orchestrator",
+        classifier_agent=unused_agent("Classifier"),
+        initial_reply_agent=unused_agent("Reply"),
+        agent_factories={
+            "download_agent": lambda: unused_agent("Download"),
+            "extract_agent": lambda: unused_agent("Extract"),
+            "translation_workflow_agent": lambda: StageAgent(name="Translation", ran=ran, state_delta={"translated_document_artifact": ARTIFACT}),
+            "email_sender_agent": lambda: StageAgent(name="Sender", ran=ran),
+        },
+        sub_agents=[],
+    )
+    runner = InMemoryRunner(agent=orchestrator, app_name=APP_NAME)
+
+    async def run():
+        session = await runner.session_service.create_session(
+            app_name=APP_NAME, user_id="user", state={"email_sender_email": "customer@example.com"},
+        )
+        # The worker died after extraction; the session store lost everything the stages wrote
+        completed = {
+            "classify": {"email_type": "translation"},
+            "reply": {"initial_reply_text": "We are on it."},
+            "download": {"attachment_artifacts": [{"artifact_name": "contract.docx", "version": 0}], "attachment_hashes": {"contract.docx": "abc"}},
+            "extract": {"extracted_text": "Contract text", "target_language": "French"},
+        }
+        for stage, state in completed.items():
+            store.record(APP_NAME, "user", session.id, stage, workflow.WORKFLOW_STAGES.index(stage), state)
+
+        async for _ in runner.run_async(
+            user_id="user", session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text="Resume.")]),
+        ):
+            pass
+        return await runner.session_service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+
+    session = asyncio.run(run())
+
+    # Only the unfinished stages ran, with the state of the finished ones restored
+    assert ran == ["Translation", "Sender"]
+    assert session.state["email_type"] == "translation"
+    assert session.state["extracted_text"] == "Contract text"
+    assert session.state["translated_document_artifact"] == ARTIFACT
+    # The workflow finished, so nothing is left to resume
+    assert store.unfinished_sessions() == []
+
+
+def test_checkpoints_round_trip_in_stage_order(tmp_path):
+    store = CheckpointStore(db_path=str(tmp_path / "checkpoints.db"))
+    store.record("app", "user", "session", "download", 2, {"attachment_artifacts": ["a"]})
+    store.record("app", "user", "session", "classify", 0, {"email_type": "review"})
+
+    assert [checkpoint["stage"] for checkpoint in store.load("app", "user", "session")] == ["classify", "download"]
+    assert [session["last_seq"] for session in store.unfinished_sessions(app_name="app")] == [2]
+
+    store.clear("app", "user", "session")
+    assert store.load("app", "user", "session") == []
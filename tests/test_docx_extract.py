@@ -0,0 +1,74 @@
+import io
+import zipfile
+from xml.etree import ElementTree
+
+import docx
+
+from email_workflow_agent.subagents.tools.docx_extract import iter_docx_segments, paragraph_elements, paragraph_text, text_parts
+
+FOOTNOTES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:footnotes xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+    '<w:footnote w:id="1"><w:p><w:r><w:t>See the annex.</w:t></w:r></w:p></w:footnote>'
+    '</w:footnotes>'
+)
+
+
+def sample_docx() -> bytes:
+    document = docx.Document()
+    document.add_paragraph("Intro\twith a tab")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "A1"
+    table.cell(1, 1).text = "B2"
+    table.cell(1, 0).add_table(rows=1, cols=1).cell(0, 0).text = "Nested"
+    document.add_paragraph("Outro")
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "Head"
+    section.footer.paragraphs[0].text = "Foot"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    # python-docx can't write footnotes; add the part the way Word stores it
+    with zipfile.ZipFile(buffer, "a") as package:
+        package.writestr("word/footnotes.xml", FOOTNOTES_XML)
+    return buffer.getvalue()
+
+
+def test_segments_have_stable_ids_and_locations_for_tables_headers_and_notes():
+    data = sample_docx()
+    segments = [(segment.id, segment.location, segment.text) for segment in iter_docx_segments(io.BytesIO(data))]
+
+    assert segments == [
+        ("word/document.xml#0", "body", "Intro\twith a tab"),
+        ("word/document.xml#1", "table 1 row 1 cell 1", "A1"),
+        ("word/document.xml#2", "table 1 row 1 cell 2", ""),
+        ("word/document.xml#3", "table 1 row 2 cell 1", ""),
+        ("word/document.xml#4", "table 1 row 2 cell 1 / row 1 cell 1", "Nested"),
+        ("word/document.xml#5", "table 1 row 2 cell 1", ""),
+        ("word/document.xml#6", "table 1 row 2 cell 2", "B2"),
+        ("word/document.xml#7", "body", "Outro"),
+        ("word/header1.xml#0", "header1", "Head"),
+        ("word/footer1.xml#0", "footer1", "Foot"),
+        # The separator footnote is skipped
+        ("word/footnotes.xml#0", "footnote 1", "See the annex."),
+    ]
+    # The same file always gives the same IDs
+    assert [segment.id for segment in iter_docx_segments(io.BytesIO(data))] == [segment[0] for segment in segments]
+
+
+def test_segment_ids_find_the_paragraph_again():
+    data = sample_docx()
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        roots = {name: ElementTree.fromstring(package.read(name)) for name in text_parts(package.namelist())}
+
+    for segment in iter_docx_segments(io.BytesIO(data)):
+        part_name, number = segment.id.split("#")
+        assert paragraph_text(list(paragraph_elements(roots[part_name]))[int(number)]) == segment.text
+
+
+def test_text_parts_follow_words_numbering():
+    names = ["word/footer10.xml", "word/endnotes.xml", "word/header2.xml", "word/footer2.xml", "word/styles.xml", "word/document.xml", "word/header1.xml"]
+
+    assert text_parts(names) == [
+        "word/document.xml", "word/header1.xml", "word/header2.xml", "word/footer2.xml", "word/footer10.xml", "word/endnotes.xml",
+    ]
@@ -0,0 +1,43 @@
+import os
+
+import docx
+import pytest
+
+from email_workflow_agent.subagents.tools.attachment_handles import AttachmentSpool
+from email_workflow_agent.subagents.tools.docx_stream import StreamingDocxWriter
+
+SEGMENTS = ["Vertrag", "", "Preis: 5 < 7 & \"fest\"", "Spalte A\tSpalte B", "Ende\x0b"]
+
+
+def test_streamed_document_opens_in_python_docx(tmp_path):
+    writer = StreamingDocxWriter(len(SEGMENTS), spool=AttachmentSpool(spool_dir=str(tmp_path)))
+    # Batches finish out of order; only the segments after a gap wait in memory
+    for index in [1, 3, 0]:
+        writer.add(index, SEGMENTS[index])
+    assert writer.written_segments == 2
+    writer.add(2, SEGMENTS[2])
+    writer.add(4, SEGMENTS[4])
+
+    handle = writer.finish()
+
+    paragraphs = [paragraph.text for paragraph in docx.Document(handle.path).paragraphs]
+    assert paragraphs == ["Vertrag", "", "Preis: 5 < 7 & \"fest\"", "Spalte A\tSpalte B", "Ende"]
+
+
+def test_incomplete_document_is_discarded(tmp_path):
+    writer = StreamingDocxWriter(3, spool=AttachmentSpool(spool_dir=str(tmp_path)))
+    writer.add(0, "Only one")
+    with pytest.raises(ValueError, match="2 of 3 segments missing"):
+        writer.finish()
+
+    assert os.listdir(tmp_path) == [] # The partial file is gone
+
+
+def test_segments_are_added_once_and_in_range(tmp_path):
+    writer = StreamingDocxWriter(2, spool=AttachmentSpool(spool_dir=str(tmp_path)))
+    writer.add(0, "One")
+    with pytest.raises(ValueError):
+        writer.add(0, "Again")
+    with pytest.raises(IndexError):
+        writer.add(2, "Too far")
+    writer.abort()
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from google.genai import types
+
+from email_workflow_agent.file_artifact_service import FileArtifactService
+
+
+def test_save_load_list_and_delete(tmp_path):
+    service = FileArtifactService(str(tmp_path / "artifacts"))
+    scope = {"app_name": "app", "user_id": "user", "session_id": "s1"}
+
+    async def run():
+        first = await service.save_artifact(filename="report.docx", artifact=types.Part.from_bytes(data=b"v0", mime_type="application/pdf"), **scope)
+        second = await service.save_artifact(
+            filename="report.docx", artifact=types.Part.from_bytes(data=b"v1", mime_type="application/pdf"), custom_metadata={"lang": "de"}, **scope
+        )
+        await service.save_artifact(app_name="app", user_id="user", filename="user:profile", artifact=types.Part(text="hello"))
+        assert (first, second) == (0, 1)
+
+        latest = await service.load_artifact(filename="report.docx", **scope)
+        assert (latest.inline_data.data, latest.inline_data.mime_type) == (b"v1", "application/pdf")
+        assert (await service.load_artifact(filename="report.docx", version=0, **scope)).inline_data.data == b"v0"
+        assert await service.load_artifact(filename="report.docx", version=5, **scope) is None
+        assert (await service.load_artifact(app_name="app", user_id="user", filename="user:profile")).inline_data.data == b"hello"
+
+        assert await service.list_artifact_keys(**scope) == ["report.docx", "user:profile"]
+        assert await service.list_artifact_keys(app_name="app", user_id="user") == ["user:profile"]
+        assert await service.list_versions(filename="report.docx", **scope) == [0, 1]
+        assert (await service.get_artifact_version(filename="report.docx", **scope)).custom_metadata == {"lang": "de"}
+
+        await service.delete_artifact(filename="report.docx", **scope)
+        assert await service.load_artifact(filename="report.docx", **scope) is None
+        assert await service.list_artifact_keys(**scope) == ["user:profile"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("name", ["..", ".", ""])
+def test_names_that_would_leave_the_store_are_rejected(tmp_path, name):
+    service = FileArtifactService(str(tmp_path / "artifacts"))
+    part = types.Part.from_bytes(data=b"x", mime_type="text/plain")
+    with pytest.raises(ValueError):
+        asyncio.run(service.save_artifact(app_name="app", user_id="user", session_id="s1", filename=name, artifact=part))
+    with pytest.raises(ValueError):
+        asyncio.run(service.save_artifact(app_name="app", user_id=name, session_id="s1", filename="a.txt", artifact=part))
+    assert not (tmp_path / "artifacts" / "app" / "user" / "sessions").exists()
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+
+from email_workflow_agent.subagents.tools.fuzzy_memory import (
+    FUZZY_MATCH_THRESHOLD,
+    MINHASH_PRIME,
+    _mix64,
+    _mod_prime,
+    _permutation_parameters,
+    _permute,
+    _shingle_hashes,
+    match_segments,
+    minhash_signatures,
+    patch_translation,
+)
+
+
+def exact_jaccard(first: str, second: str) -> float:
+    first_shingles, second_shingles = set(_shingle_hashes(first)), set(_shingle_hashes(second))
+    return len(first_shingles & second_shingles) / len(first_shingles | second_shingles)
+
+
+def estimated_jaccard(first: str, second: str) -> float:
+    signatures = minhash_signatures([first, second])
+    return float((signatures[0] == signatures[1]).mean())
+
+
+def test_permutation_matches_exact_modular_arithmetic():
+    a, b = _permutation_parameters()
+    hashes = _mod_prime(_mix64(np.array([0, 1, 2**32 - 1, 987654321], dtype=np.uint64)))
+    expected = [[(int(a_i) * int(h) + int(b_i)) % MINHASH_PRIME for h in hashes] for a_i, b_i in zip(a[:, 0], b[:, 0])]
+    assert (_permute(a, b, hashes) == np.array(expected, dtype=np.uint64)).all()
+
+
+def test_estimates_track_exact_jaccard():
+    generator = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(40)]
+    errors = []
+    for _ in range(300):
+        shared = [generator.choice(vocabulary) for _ in range(generator.randint(0, 12))]
+        first = " ".join(shared + [generator.choice(vocabulary) for _ in range(generator.randint(1, 10))])
+        second = " ".join(shared + [generator.choice(vocabulary) for _ in range(generator.randint(1, 10))])
+        errors.append(estimated_jaccard(first, second) - exact_jaccard(first, second))
+    # 64 independent permutations: the standard error is at most 0.0625
+    assert float(np.sqrt(np.mean(np.square(errors)))) < 0.06
+
+
+def test_dissimilar_short_segments_do_not_match():
+    assert exact_jaccard("Yes.", "No.") == 0.2
+    assert estimated_jaccard("Yes.", "No.") < FUZZY_MATCH_THRESHOLD
+    memory = [{"source": "Yes.", "translations": {"German": "Ja."}}]
+    assert match_segments(["No."], memory) == {}
+
+
+def test_segments_differing_by_a_number_match_and_are_patched():
+    # Digits are folded before shingling, so these are exact duplicates by design
+    assert estimated_jaccard("Page 1", "Page 2") == 1.0
+    memory = [{"source": "Page 1", "translations": {"German": "Seite 1"}}]
+    match = match_segments(["Page 2"], memory)[0]
+    assert patch_translation("Page 2", match.source, match.translations["German"]) == "Seite 2"
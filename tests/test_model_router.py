@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+
+def test_stub_models_resolve_without_importing_the_stub_first():
+    # A fresh interpreter, so nothing has registered the stub as an import side effect yet
+    script = (
+        "import asyncio\n"
+        "from google.adk.models import LlmRequest\n"
+        "from google.genai import types\n"
+        "from email_workflow_agent.model_router import ModelRouter\n"
+        "router = ModelRouter(tiers={'fast': 'stub-fast', 'standard': 'stub-standard', 'large': 'stub-large'})\n"
+        "async def run():\n"
+        "    request = LlmRequest(model='stub-fast', contents=[types.Content(role='user', parts=[types.Part(text='Hello')])])\n"
+        "    return [r async for r in router.llm_for('reply').generate_content_async(request)]\n"
+        "responses = asyncio.run(run())\n"
+        "print(type(router.delegate('stub-fast')).__name__, bool(responses[-1].content.parts[0].text))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["StubLlm", "True"]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from email_workflow_agent.subagents.tools.qa_sampling import (
+    NUM_STRATA,
+    confidence_half_width,
+    quality_check,
+    stratified_order,
+)
+
+
+def checker(score_of):
+    """check_batch stand-in scoring each segment with `score_of`, recording what was checked."""
+    checked = []
+
+    async def check_batch(indexes):
+        checked.extend(indexes)
+        return [score_of(index) for index in indexes]
+
+    return check_batch, checked
+
+
+def test_stratified_order_is_a_permutation_that_covers_every_stratum_first():
+    indexes = list(range(1000))
+    order = stratified_order(indexes, seed=1)
+
+    assert sorted(order) == indexes
+    # The first round-robin pass takes one segment from each tenth of the document
+    assert sorted(index // 100 for index in order[:NUM_STRATA]) == list(range(NUM_STRATA))
+
+
+def test_half_width_of_an_error_free_sample_uses_the_rule_of_three():
+    assert confidence_half_width([1.0] * 100, population=10**9) == pytest.approx(3 / 100)
+    # Checking the whole population leaves no doubt
+    assert confidence_half_width([1.0] * 100, population=100) == 0.0
+    assert confidence_half_width([1.0], population=100) == 1.0
+
+
+def test_clean_document_stops_once_the_rule_of_three_bound_is_tight_enough():
+    check_batch, checked = checker(lambda index: 1.0)
+    result = asyncio.run(quality_check(range(1000), check_batch, mode="sampled", target_half_width=0.05, seed=1))
+
+    # 3/48 is still above 0.05 after the finite population correction; 3/64 is below it
+    assert result.mode == "sampled"
+    assert result.segments_checked == len(checked) == 64
+    assert result.score == 1.0
+    assert result.half_width == pytest.approx(3 / 64 * ((1000 - 64) / 999) ** 0.5)
+
+
+def test_short_documents_are_checked_in_full():
+    check_batch, checked = checker(lambda index: 1.0)
+    result = asyncio.run(quality_check(range(40), check_batch, mode="sampled", full_check_max_segments=40))
+
+    assert result.mode == "full"
+    assert checked == list(range(40))
+
+
+def test_low_sampled_score_falls_back_to_a_full_check():
+    check_batch, checked = checker(lambda index: 0.5 if index % 2 else 1.0)
+    result = asyncio.run(quality_check(range(500), check_batch, mode="sampled", full_check_below=0.8, seed=1))
+
+    assert result.mode == "sampled+full"
+    assert result.segments_checked == result.segments_total == 500
+    assert result.score == pytest.approx(0.75)
+    assert result.low_scoring_segments == list(range(1, 500, 2))
+    assert len(checked) > 500 # The sample, then every segment
+
+
+def test_noisy_scores_stop_at_the_sample_budget():
+    check_batch, checked = checker(lambda index: 0.8 if index % 3 else 1.0)
+    result = asyncio.run(quality_check(range(5000), check_batch, mode="sampled", sample_budget=100, target_half_width=0.001, seed=1))
+
+    assert result.mode == "sampled"
+    assert result.segments_checked == len(checked) == 100
+    assert result.half_width > 0.001
@@ -0,0 +1,57 @@
+import asyncio
+
+from email_workflow_agent.result_index import ResultIndex, combine_attachment_hashes, hash_attachment_bytes
+
+ENTRY = {"app_name": "app", "user_id": "user", "session_id": "first", "filename": "translated.docx", "version": 0}
+
+
+def test_second_request_waits_for_the_first_and_reuses_its_result():
+    index = ResultIndex()
+    key = ResultIndex.make_key(hash_attachment_bytes(b"contract"), "translation", "French")
+    events = []
+
+    async def first():
+        assert await index.acquire(key) is None # Owns the computation
+        events.append("first computing")
+        await asyncio.sleep(0.01)
+        index.publish(key, ENTRY)
+        events.append("first published")
+
+    async def second():
+        await asyncio.sleep(0) # Arrives while the first one is computing
+        entry = await index.acquire(key)
+        events.append("second got result")
+        return entry
+
+    async def run():
+        return await asyncio.gather(first(), second())
+
+    _, entry = asyncio.run(run())
+
+    assert entry == ENTRY
+    assert events == ["first computing", "first published", "second got result"]
+    assert (index.misses, index.coalesced, index.hits) == (1, 1, 1)
+
+
+def test_waiter_takes_over_when_the_owner_releases():
+    index = ResultIndex()
+    key = ResultIndex.make_key("hash", "translation", "de")
+
+    async def run():
+        assert await index.acquire(key) is None
+        waiter = asyncio.ensure_future(index.acquire(key))
+        await asyncio.sleep(0)
+        index.release(key) # The owner's branch failed
+        return await waiter
+
+    assert asyncio.run(run()) is None # The waiter now owns the computation
+    assert index.misses == 2
+
+
+def test_key_ignores_filenames_and_language_case():
+    hashes = {"a.docx": hash_attachment_bytes(b"one"), "b.docx": hash_attachment_bytes(b"two")}
+    renamed = {"x.docx": hashes["b.docx"], "y.docx": hashes["a.docx"]}
+
+    assert combine_attachment_hashes(hashes) == combine_attachment_hashes(renamed)
+    assert combine_attachment_hashes({}) is None
+    assert ResultIndex.make_key("h", "translation", "French") == ResultIndex.make_key("h", "translation", "french")
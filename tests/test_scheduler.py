@@ -0,0 +1,112 @@
+import asyncio
+
+from email_workflow_agent.scheduler import WorkflowScheduler
+
+
+class Workflows:
+    """Workflow stand-in: each job runs until the test releases it by subject."""
+
+    def __init__(self):
+        self.started = []
+        self._release = {}
+
+    async def run(self, sender_email, subject, body, attachments):
+        self.started.append(subject)
+        await self._release.setdefault(subject, asyncio.Event()).wait()
+        return subject
+
+    async def finish(self, subject):
+        self._release.setdefault(subject, asyncio.Event()).set()
+        for _ in range(5): # Let the job complete and the scheduler dispatch the next ones
+            await asyncio.sleep(0)
+
+
+def submit(scheduler, subject, chars, sla_class="standard"):
+    return scheduler.submit("a@example.com", subject, "", [{"filename": "doc.docx", "extracted_char_count": chars}], sla_class=sla_class)
+
+
+def test_sjf_ages_a_waiting_large_job_ahead_of_newer_small_ones():
+    workflows = Workflows()
+
+    async def run():
+        scheduler = WorkflowScheduler(workflows.run, policy="sjf", max_concurrency=1, aging_chars_per_second=1_000_000.0)
+        submit(scheduler, "blocker", 10)
+        submit(scheduler, "large", 50_000)
+        submit(scheduler, "small", 1_000)
+        await asyncio.sleep(0)
+        await workflows.finish("blocker")
+        assert workflows.started == ["blocker", "small"] # Shortest job first
+
+        await asyncio.sleep(0.1) # "large" has now waited long enough to beat a fresh small job
+        submit(scheduler, "new small", 1_000)
+        await workflows.finish("small")
+        assert workflows.started == ["blocker", "small", "large"]
+
+        await workflows.finish("large")
+        await workflows.finish("new small")
+        await scheduler.drain()
+
+    asyncio.run(run())
+    assert workflows.started[-1] == "new small"
+
+
+def test_sla_promotes_a_bulk_job_that_waited():
+    workflows = Workflows()
+
+    async def run():
+        scheduler = WorkflowScheduler(workflows.run, policy="sla", max_concurrency=1, sla_promotion_seconds=0.04)
+        submit(scheduler, "blocker", 10)
+        submit(scheduler, "bulk", 10, sla_class="bulk")
+        await asyncio.sleep(0.1) # Two and a half classes of promotion
+        submit(scheduler, "urgent", 10, sla_class="urgent")
+        await workflows.finish("blocker")
+        assert workflows.started == ["blocker", "bulk"]
+        await workflows.finish("bulk")
+        await workflows.finish("urgent")
+
+    asyncio.run(run())
+
+
+def test_head_job_keeps_its_reservation_until_it_starts():
+    workflows = Workflows()
+
+    async def run():
+        scheduler = WorkflowScheduler(workflows.run, policy="sla", max_inflight_chars=100, max_concurrency=8)
+        submit(scheduler, "running", 60)
+        head = submit(scheduler, "urgent head", 80, sla_class="urgent")
+        submit(scheduler, "small", 10)
+        await asyncio.sleep(0)
+        # "small" would fit next to "running", but the capacity is held for the head job
+        assert workflows.started == ["running"]
+        assert scheduler.metrics_snapshot()["queued"] == 2
+
+        await workflows.finish("running")
+        assert workflows.started == ["running", "urgent head", "small"]
+        await workflows.finish("urgent head")
+        await workflows.finish("small")
+        return await head
+
+    assert asyncio.run(run()) == "urgent head"
+
+
+def test_job_larger_than_the_budget_runs_alone():
+    workflows = Workflows()
+
+    async def run():
+        scheduler = WorkflowScheduler(workflows.run, policy="sjf", max_inflight_chars=100)
+        submit(scheduler, "small", 10)
+        submit(scheduler, "huge", 500)
+        await asyncio.sleep(0)
+        assert workflows.started == ["small"] # "huge" waits for the scheduler to empty
+        await workflows.finish("small")
+        assert workflows.started == ["small", "huge"]
+
+        submit(scheduler, "small after", 10)
+        await asyncio.sleep(0)
+        assert workflows.started == ["small", "huge"] # Nothing runs next to it
+        await workflows.finish("huge")
+        assert workflows.started == ["small", "huge", "small after"]
+        await workflows.finish("small after")
+        await scheduler.drain()
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from cryptography.fernet import Fernet
+from google.genai import types
+
+from email_workflow_agent.sensitive_store import SensitiveValueStore
+from email_workflow_agent.subagents.tools import callbacks
+from email_workflow_agent.subagents.tools.callbacks import handle_sensitive_after, handle_sensitive_before
+from email_workflow_agent.subagents.tools.sensitive_vault import SensitiveVault
+from email_workflow_agent.subagents.tools.tools import translate_to_languages_tool
+
+DOCUMENT = "First paragraph of the report.\n\nSecond paragraph of the report.\n\nThird paragraph."
+
+
+class TranslateOnceLlm(BaseLlm):
+    """Calls translate_to_languages once, then answers with plain text."""
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        answered = any(part.function_response for content in llm_request.contents for part in content.parts or [])
+        if answered:
+            part = types.Part(text="Done.")
+        else:
+            part = types.Part(function_call=types.FunctionCall(
+                name="translate_to_languages", args={"text": DOCUMENT, "target_languages": ["French", "German"]}
+            ))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def test_second_session_of_a_sender_reuses_the_stored_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(callbacks, "sensitive_vault", SensitiveVault(store=SensitiveValueStore(db_path=str(tmp_path / "sensitive.db"), key=Fernet.generate_key())))
+    agent = LlmAgent(
+        name="TranslatorUnderTest",
+        model=TranslateOnceLlm(model="scripted"),
+        tools=[translate_to_languages_tool],
+        before_tool_callback=handle_sensitive_before,
+        after_tool_callback=handle_sensitive_after,
+    )
+    runner = InMemoryRunner(agent=agent, app_name="test_app")
+    email_state = {"email_sender_email": "customer@example.com", "initial_attachments": ["report.docx"], "source_language": "en"}
+
+    async def translate_in_new_session():
+        session = await runner.session_service.create_session(app_name="test_app", user_id="user", state=dict(email_state))
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text="Translate it.")])):
+            pass
+        session = await runner.session_service.get_session(app_name="test_app", user_id="user", session_id=session.id)
+        return session.state["translation_reuse"]
+
+    first, second = asyncio.run(translate_in_new_session()), asyncio.run(translate_in_new_session())
+
+    assert first["segments"] == second["segments"] > 0
+    assert first["reused_segments"] == 0
+    assert second["reused_segments"] == second["segments"] # Stored by the first session, read back by the second
+    assert asyncio.run(runner.artifact_service.list_versions(
+        app_name="test_app", user_id="user", filename="user:segment_memory/customer@example.com_report.docx.json"
+    )) == [0]
@@ -0,0 +1,73 @@
+import asyncio
+from typing import AsyncGenerator
+
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from cryptography.fernet import Fernet
+from google.genai import types
+
+from email_workflow_agent.sensitive_store import SensitiveValueStore
+from email_workflow_agent.subagents.tools import callbacks
+from email_workflow_agent.subagents.tools.callbacks import handle_sensitive_after, handle_sensitive_before
+from email_workflow_agent.subagents.tools.sensitive_vault import SensitiveVault
+from email_workflow_agent.subagents.tools.tools import translate_text_tool
+from email_workflow_agent.subagents.tools.translation_client import translation_client
+
+SOURCE_TEXT = "Contract Confidential Info 7 signed on 2024-01-31."
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls translate_text once, then answers with plain text."""
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        answered = any(part.function_response for content in llm_request.contents for part in content.parts or [])
+        if answered:
+            part = types.Part(text="Done.")
+        else:
+            part = types.Part(function_call=types.FunctionCall(name="translate_text", args={"text": SOURCE_TEXT, "target_language": "French"}))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def test_agent_masks_tool_arguments_and_restores_the_response(tmp_path, monkeypatch):
+    store = SensitiveValueStore(db_path=str(tmp_path / "sensitive.db"), key=Fernet.generate_key())
+    monkeypatch.setattr(callbacks, "sensitive_vault", SensitiveVault(store=store))
+    backend_calls = []
+    translate_batch = translation_client.translate_batch
+
+    async def recording_translate_batch(segments, *args, **kwargs):
+        backend_calls.append(list(segments))
+        return await translate_batch(segments, *args, **kwargs)
+
+    monkeypatch.setattr(translation_client, "translate_batch", recording_translate_batch)
+
+    agent = LlmAgent(
+        name="TranslatorUnderTest",
+        model=ScriptedLlm(model="scripted"),
+        tools=[translate_text_tool],
+        before_tool_callback=handle_sensitive_before,
+        after_tool_callback=handle_sensitive_after,
+    )
+    runner = InMemoryRunner(agent=agent, app_name="test_app")
+
+    async def run():
+        session = await runner.session_service.create_session(app_name="test_app", user_id="user")
+        events = [
+            event async for event in runner.run_async(
+                user_id="user", session_id=session.id, new_message=types.Content(role="user", parts=[types.Part(text="Translate it.")]),
+            )
+        ]
+        return session, events
+
+    session, events = asyncio.run(run())
+
+    # The translation backend only ever saw placeholders
+    assert backend_calls == [["Contract __CONFIDENTIAL_1__ signed on __DATE_2__."]]
+    # The model got the real values back in the tool response
+    responses = [part.function_response.response for event in events for part in event.content.parts or [] if part.function_response]
+    assert responses == [{"status": "success", "translated_text": f"Translated: {SOURCE_TEXT} (to French)"}]
+    # The mapping was saved, so a resumed session could still restore it
+    assert store.load_sensitive_values("test_app", "user", session.id) == {
+        "__CONFIDENTIAL_1__": "Confidential Info 7",
+        "__DATE_2__": "2024-01-31",
+    }
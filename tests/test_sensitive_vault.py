@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from email_workflow_agent.sensitive_store import SensitiveValueStore
+from email_workflow_agent.subagents.tools.sensitive_vault import SensitiveVault, UnknownPlaceholderError
+
+KEY = ("app", "user", "s1")
+
+
+def make_store(tmp_path, key=None):
+    return SensitiveValueStore(db_path=str(tmp_path / "sensitive.db"), key=key or Fernet.generate_key())
+
+
+def test_values_are_encrypted_at_rest_and_reloaded_by_another_process(tmp_path):
+    key = Fernet.generate_key()
+    vault = SensitiveVault(store=make_store(tmp_path, key))
+    placeholder = vault.session(*KEY).placeholder_for("CONFIDENTIAL", "Confidential Info 42")
+    vault.save(vault.session(*KEY))
+
+    with sqlite3.connect(str(tmp_path / "sensitive.db")) as conn:
+        stored = conn.execute("SELECT placeholder, encrypted_value FROM sensitive_values").fetchall()
+    assert [row[0] for row in stored] == [placeholder]
+    assert b"Confidential Info 42" not in stored[0][1]
+
+    # A worker with the same key restores it; one with another key can't
+    assert SensitiveVault(store=make_store(tmp_path, key)).session(*KEY).restore(placeholder) == "Confidential Info 42"
+    with pytest.raises(UnknownPlaceholderError):
+        SensitiveVault(store=make_store(tmp_path)).session(*KEY).restore(placeholder)
+
+
+def test_without_a_key_nothing_is_stored(tmp_path):
+    store = SensitiveValueStore(db_path=str(tmp_path / "sensitive.db"), key=None)
+    vault = SensitiveVault(store=store)
+    vault.session(*KEY).placeholder_for("DATE", "2024-01-31")
+    vault.save(vault.session(*KEY))
+
+    assert not store.enabled
+    assert store.load_sensitive_values(*KEY) == {}
+    assert not (tmp_path / "sensitive.db").exists()
+
+
+def test_ttl_deletes_the_stored_values(tmp_path):
+    store = make_store(tmp_path)
+    vault = SensitiveVault(store=store, ttl_seconds=0.05)
+    session_vault = vault.session(*KEY)
+    session_vault.placeholder_for("DATE", "2024-01-31")
+    vault.save(session_vault)
+    assert store.load_sensitive_values(*KEY) == {"__DATE_1__": "2024-01-31"}
+
+    time.sleep(0.1)
+    vault.session("app", "user", "s2") # Any use expires the idle sessions
+    assert store.load_sensitive_values(*KEY) == {}
+    assert vault.metrics_snapshot()["sessions_expired"] == 1
+
+
+def test_store_expires_vaults_no_process_holds(tmp_path):
+    store = make_store(tmp_path)
+    store.record_sensitive_values(*KEY, {"__DATE_1__": "2024-01-31"})
+    assert store.delete_expired(ttl_seconds=3600) == 0
+    time.sleep(0.05)
+    assert store.delete_expired(ttl_seconds=0.01) == 1
+    assert store.load_sensitive_values(*KEY) == {}
@@ -0,0 +1,79 @@
+import asyncio
+
+from email_workflow_agent.work_queue import WorkQueue
+from email_workflow_agent.worker_pool import WorkflowFailed, run_worker
+
+
+def test_failing_job_is_requeued_then_marked_failed(tmp_path):
+    queue = WorkQueue(db_path=str(tmp_path / "queue.db"), max_attempts=2)
+    queue.enqueue({"session_id": "s1"})
+    runs = []
+
+    async def failing_workflow(session_id):
+        runs.append(queue.counts())
+        raise WorkflowFailed(f"Session {session_id} failed")
+
+    completed = asyncio.run(run_worker(failing_workflow, queue=queue, worker_id="worker", exit_when_idle=True))
+
+    assert completed == 0
+    assert runs == [{"leased": 1}, {"leased": 1}] # Redelivered once after the first failure
+    assert queue.counts() == {"failed": 1}
+
+
+def test_job_that_fails_once_completes_on_redelivery(tmp_path):
+    queue = WorkQueue(db_path=str(tmp_path / "queue.db"), max_attempts=3)
+    queue.enqueue({"session_id": "s1"})
+    runs = []
+
+    async def flaky_workflow(session_id):
+        runs.append(session_id)
+        if len(runs) == 1:
+            raise WorkflowFailed(f"Session {session_id} failed")
+
+    completed = asyncio.run(run_worker(flaky_workflow, queue=queue, worker_id="worker", exit_when_idle=True))
+
+    assert completed == 1
+    assert runs == ["s1", "s1"]
+    assert queue.counts() == {"done": 1}
+
+
+def test_cancelled_workflow_is_failed_and_the_worker_goes_on(tmp_path):
+    queue = WorkQueue(db_path=str(tmp_path / "queue.db"), max_attempts=1)
+    queue.enqueue({"session_id": "cancelled"})
+    queue.enqueue({"session_id": "fine"})
+    runs = []
+
+    async def workflow(session_id):
+        runs.append(session_id)
+        if session_id == "cancelled":
+            asyncio.current_task().cancel()
+            await asyncio.sleep(1)
+
+    completed = asyncio.run(run_worker(workflow, queue=queue, worker_id="worker", exit_when_idle=True))
+
+    assert runs == ["cancelled", "fine"]
+    assert completed == 1
+    assert queue.counts() == {"failed": 1, "done": 1}
+
+
+def test_workflow_has_stopped_before_the_next_job_after_a_lost_lease(tmp_path, monkeypatch):
+    queue = WorkQueue(db_path=str(tmp_path / "queue.db"), lease_seconds=0.03)
+    queue.enqueue({"session_id": "slow"})
+    monkeypatch.setattr(queue, "heartbeat", lambda job_id, worker_id: False)
+    events = []
+
+    async def workflow(session_id):
+        events.append(f"start {session_id}")
+        if len(events) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.05) # Cleanup that takes a while
+                events.append("slow stopped")
+                raise
+
+    asyncio.run(run_worker(workflow, queue=queue, worker_id="worker", exit_when_idle=True))
+
+    # The redelivered job only starts once the abandoned run has finished cancelling
+    assert events == ["start slow", "slow stopped", "start slow"]
+    assert queue.counts() == {"done": 1}